@@ -0,0 +1,243 @@
+import argparse
+import json
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from constants import GAMERULES_BY_NAME
+from models import GameRule
+from snapshot import GameSnapshot, ResultLog
+
+# quantiles tracked for every streaming distribution
+TRACKED_QUANTILES = [0.5, 0.9, 0.99]
+
+
+class P2Quantile:
+    """ P2Quantile class estimates one quantile of a stream with the P² algorithm of Jain and Chlamtac: five markers are moved
+    along the stream, so the memory stays constant however many values are added """
+
+    def __init__(self, quantile: float) -> None:
+        super().__init__()
+        self.__quantile: float = quantile
+        self.__heights: List[float] = []
+        self.__positions: List[int] = [1, 2, 3, 4, 5]
+        self.__desired: List[float] = [1, 1 + 2 * quantile, 1 + 4 * quantile, 3 + 2 * quantile, 5]
+        self.__increments: List[float] = [0, quantile / 2, quantile, (1 + quantile) / 2, 1]
+
+    def add(self, value: float) -> None:
+        heights = self.__heights
+        if len(heights) < 5:
+            heights.append(value)
+            heights.sort()
+            return
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = max(heights[4], value)
+            cell = 3
+        else:
+            cell = next(i for i in range(4) if heights[i] <= value < heights[i + 1])
+        positions = self.__positions
+        for i in range(cell + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self.__desired[i] += self.__increments[i]
+        for i in range(1, 4):
+            offset = self.__desired[i] - positions[i]
+            if (offset >= 1 and positions[i + 1] - positions[i] > 1) or (offset <= -1 and positions[i - 1] - positions[i] < -1):
+                step = 1 if offset > 0 else -1
+                height = self.__parabolic(i, step)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = heights[i] + step * (heights[i + step] - heights[i]) / (positions[i + step] - positions[i])
+                heights[i] = height
+                positions[i] += step
+
+    def __parabolic(self, i: int, step: int) -> float:
+        heights, positions = self.__heights, self.__positions
+        return heights[i] + step / (positions[i + 1] - positions[i - 1]) * (
+            (positions[i] - positions[i - 1] + step) * (heights[i + 1] - heights[i]) / (positions[i + 1] - positions[i]) +
+            (positions[i + 1] - positions[i] - step) * (heights[i] - heights[i - 1]) / (positions[i] - positions[i - 1]))
+
+    def get_value(self) -> Optional[float]:
+        """ :return: the estimated quantile, exact while fewer than five values were added, None before any """
+        heights = self.__heights
+        if not heights:
+            return None
+        if len(heights) < 5:
+            return heights[min(len(heights) - 1, int(self.__quantile * len(heights)))]
+        return heights[2]
+
+
+class OnlineHistogram:
+    """ OnlineHistogram class counts a stream of small integers, like attempts, with the count, the mean and the streaming quantiles
+    of the values """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.__counts: Dict[int, int] = {}
+        self.__total: int = 0
+        self.__sum: float = 0.0
+        self.__quantiles: List[P2Quantile] = [P2Quantile(quantile) for quantile in TRACKED_QUANTILES]
+
+    def add(self, value: int) -> None:
+        self.__counts[value] = self.__counts.get(value, 0) + 1
+        self.__total += 1
+        self.__sum += value
+        for quantile in self.__quantiles:
+            quantile.add(value)
+
+    def get_counts(self) -> Dict[int, int]:
+        return dict(sorted(self.__counts.items()))
+
+    def get_total(self) -> int:
+        return self.__total
+
+    def get_mean(self) -> Optional[float]:
+        return self.__sum / self.__total if self.__total else None
+
+    def get_quantiles(self) -> Dict[str, Optional[float]]:
+        return {'p{:g}'.format(100 * quantile): estimator.get_value() for quantile, estimator in zip(TRACKED_QUANTILES, self.__quantiles)}
+
+
+class StreamingSummary:
+    """ StreamingSummary class keeps the count, the mean and the streaming quantiles of a stream of real values, like latencies """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.__total: int = 0
+        self.__sum: float = 0.0
+        self.__quantiles: List[P2Quantile] = [P2Quantile(quantile) for quantile in TRACKED_QUANTILES]
+
+    def add(self, value: float) -> None:
+        self.__total += 1
+        self.__sum += value
+        for quantile in self.__quantiles:
+            quantile.add(value)
+
+    def get_count(self) -> int:
+        return self.__total
+
+    def to_dict(self) -> Dict[str, Optional[float]]:
+        summary: Dict[str, Optional[float]] = {'count': self.__total, 'mean': self.__sum / self.__total if self.__total else None}
+        summary.update({'p{:g}'.format(100 * quantile): estimator.get_value()
+                        for quantile, estimator in zip(TRACKED_QUANTILES, self.__quantiles)})
+        return summary
+
+
+class RuleOutcomes:
+    """ RuleOutcomes class accumulates the outcomes of the games of one game rule: attempts used by every player, guess latency
+    per round and the feedback a winner got just before the winning guess """
+
+    def __init__(self, game_rule: GameRule) -> None:
+        super().__init__()
+        self.__game_rule: GameRule = game_rule
+        self.__games: int = 0
+        self.__attempts: OnlineHistogram = OnlineHistogram()
+        self.__winning_attempts: OnlineHistogram = OnlineHistogram()
+        self.__round_latencies: List[StreamingSummary] = [StreamingSummary() for i in range(game_rule.get_max_attempts())]
+        # feedback (black, white) of the guess before a winning guess, None when the first guess won
+        self.__before_win: Dict[Optional[Tuple[int, int]], int] = {}
+
+    def add(self, snapshot: GameSnapshot, latencies: List[int]) -> None:
+        """ add one finished game with the milliseconds every guess of its history took """
+        self.__games += 1
+        max_code_peg = self.__game_rule.get_max_code_peg()
+        rounds = [0] * len(snapshot.get_player_names())
+        previous: List[Optional[Tuple[int, int]]] = [None] * len(rounds)
+        for (player_index, guess, black, white), latency in zip(snapshot.get_history(), latencies):
+            if rounds[player_index] < len(self.__round_latencies):
+                self.__round_latencies[rounds[player_index]].add(latency)
+            rounds[player_index] += 1
+            if black == max_code_peg:
+                self.__before_win[previous[player_index]] = self.__before_win.get(previous[player_index], 0) + 1
+                self.__winning_attempts.add(rounds[player_index])
+            previous[player_index] = (black, white)
+        for attempts in rounds:
+            self.__attempts.add(attempts)
+
+    def to_dict(self, top_patterns: int) -> Dict[str, object]:
+        patterns = sorted(self.__before_win.items(), key=lambda item: -item[1])[:top_patterns]
+        return {
+            'games': self.__games,
+            'attempts': {'histogram': self.__attempts.get_counts(), 'mean': self.__attempts.get_mean(), **self.__attempts.get_quantiles()},
+            'winning_attempts': {'histogram': self.__winning_attempts.get_counts(), 'mean': self.__winning_attempts.get_mean(),
+                                 **self.__winning_attempts.get_quantiles()},
+            'latency_ms_by_round': {str(round_number): summary.to_dict()
+                                    for round_number, summary in enumerate(self.__round_latencies, 1) if summary.get_count()},
+            'feedback_before_win': [{'black': pattern[0], 'white': pattern[1], 'wins': wins} if pattern is not None else
+                                    {'black': None, 'white': None, 'wins': wins} for pattern, wins in patterns],
+        }
+
+
+class OutcomeAnalytics:
+    """ OutcomeAnalytics class computes outcome statistics over a stream of finished games in one pass. Memory depends on the number
+    of game rules and players, never on the number of games """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.__rules: Dict[str, RuleOutcomes] = {}
+        # games played and won by every player name
+        self.__players: Dict[str, List[int]] = {}
+        self.__games: int = 0
+
+    def add(self, snapshot: GameSnapshot, latencies: List[int]) -> None:
+        game_rule = snapshot.get_game_rule()
+        rule_name = get_rule_name(game_rule)
+        rule_outcomes = self.__rules.get(rule_name)
+        if rule_outcomes is None:
+            rule_outcomes = self.__rules[rule_name] = RuleOutcomes(game_rule)
+        winners = {player_index: False for player_index in range(len(snapshot.get_player_names()))}
+        for player_index, guess, black, white in snapshot.get_history():
+            if black == game_rule.get_max_code_peg():
+                winners[player_index] = True
+        rule_outcomes.add(snapshot, latencies)
+        for player_index, player_name in enumerate(snapshot.get_player_names()):
+            record = self.__players.setdefault(player_name, [0, 0])
+            record[0] += 1
+            record[1] += winners[player_index]
+        self.__games += 1
+
+    def add_all(self, results: Iterable[Tuple[GameSnapshot, List[int]]]) -> "OutcomeAnalytics":
+        for snapshot, latencies in results:
+            self.add(snapshot, latencies)
+        return self
+
+    def get_game_count(self) -> int:
+        return self.__games
+
+    def report(self, top_patterns: int = 5, top_players: Optional[int] = None) -> Dict[str, object]:
+        """ :return: the statistics of every game added so far, players with the most games first """
+        players = sorted(self.__players.items(), key=lambda item: (-item[1][0], item[0]))[:top_players]
+        return {
+            'games': self.__games,
+            'rules': {rule_name: rule_outcomes.to_dict(top_patterns) for rule_name, rule_outcomes in self.__rules.items()},
+            'players': {player_name: {'games': games, 'wins': wins, 'win_rate': wins / games} for player_name, (games, wins) in players},
+        }
+
+
+def get_rule_name(game_rule: GameRule) -> str:
+    """ :return: the name of a predefined rule, or a description of the shape of any other rule """
+    shape = (game_rule.is_computer_code_maker(), game_rule.get_max_breakers(), game_rule.get_max_attempts(), game_rule.allow_blank(),
+             game_rule.get_max_code_peg())
+    for name, known_rule in GAMERULES_BY_NAME.items():
+        if shape == (known_rule.is_computer_code_maker(), known_rule.get_max_breakers(), known_rule.get_max_attempts(),
+                     known_rule.allow_blank(), known_rule.get_max_code_peg()):
+            return name
+    return '{}p-{}pegs-{}attempts{}'.format(game_rule.get_max_breakers(), game_rule.get_max_code_peg(), game_rule.get_max_attempts(),
+                                            '-blank' if game_rule.allow_blank() else '')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compute outcome statistics over result files written by server.py --results.')
+    parser.add_argument('results', nargs='+', help='result files, streamed one game at a time')
+    parser.add_argument('--top-patterns', type=int, default=5, help='feedback patterns listed before a win, per rule')
+    parser.add_argument('--top-players', type=int, default=20, help='players listed, those with the most games first')
+    parser.add_argument('--json', help='also write the report to this file')
+    args = parser.parse_args()
+    analytics = OutcomeAnalytics()
+    for results_path in args.results:
+        analytics.add_all(ResultLog.read(results_path))
+    analytics_report = analytics.report(args.top_patterns, args.top_players)
+    print(json.dumps(analytics_report, indent=2))
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump(analytics_report, json_file, indent=2)
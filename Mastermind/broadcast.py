@@ -0,0 +1,98 @@
+import asyncio
+from typing import Callable, Dict, List, Optional
+
+# what to do with a subscriber whose socket buffer is full: drop the subscriber, or skip events until it catches up
+DROP_SLOW = 'drop'
+SKIP_SLOW = 'skip'
+
+
+class Subscriber:
+    """ Subscriber class represents one watcher of a Broadcaster, it writes the shared event bytes straight to its transport """
+
+    def __init__(self, writer: asyncio.StreamWriter, on_drop: Optional[Callable[["Subscriber"], None]] = None) -> None:
+        super().__init__()
+        self.__writer: asyncio.StreamWriter = writer
+        self.__on_drop: Optional[Callable[["Subscriber"], None]] = on_drop
+        self.__skipped: int = 0
+
+    def get_pending_bytes(self) -> int:
+        return self.__writer.transport.get_write_buffer_size()
+
+    def write(self, data: bytes) -> None:
+        self.__writer.write(data)
+
+    def skip(self) -> None:
+        self.__skipped += 1
+
+    def take_skipped(self) -> int:
+        """ :return: how many events were skipped since the last call """
+        skipped, self.__skipped = self.__skipped, 0
+        return skipped
+
+    def drop(self) -> None:
+        if self.__on_drop is not None:
+            self.__on_drop(self)
+
+    def is_closing(self) -> bool:
+        return self.__writer.is_closing()
+
+
+class Broadcaster:
+    """ Broadcaster class fans room events out to many watchers. An event is encoded once and the same bytes object is handed
+    to every subscriber, and a subscriber whose socket buffer is over max_pending_bytes is dropped or skips events, so a slow
+    watcher never makes the game loop wait """
+
+    def __init__(self, max_pending_bytes: int = 16384, slow_policy: str = DROP_SLOW,
+                 skipped_line: Callable[[int], str] = lambda count: 'SKIPPED {}'.format(count)) -> None:
+        super().__init__()
+        self.__max_pending_bytes: int = max_pending_bytes
+        self.__slow_policy: str = slow_policy
+        self.__skipped_line: Callable[[int], str] = skipped_line
+        self.__subscribers: Dict[object, Subscriber] = {}
+        self.__published: int = 0
+        self.__dropped: int = 0
+
+    def subscribe(self, key: object, writer: asyncio.StreamWriter, on_drop: Optional[Callable[[Subscriber], None]] = None) -> Subscriber:
+        subscriber = Subscriber(writer, on_drop)
+        self.__subscribers[key] = subscriber
+        return subscriber
+
+    def unsubscribe(self, key: object) -> None:
+        self.__subscribers.pop(key, None)
+
+    def publish(self, line: str) -> None:
+        """ send one protocol line to every subscriber """
+        self.publish_bytes((line + '\n').encode())
+
+    def publish_bytes(self, data: bytes) -> None:
+        """ send protocol lines already encoded to every subscriber """
+        self.__published += 1
+        slow = []
+        for key, subscriber in self.__subscribers.items():
+            if subscriber.is_closing():
+                slow.append(key)
+            elif subscriber.get_pending_bytes() > self.__max_pending_bytes:
+                if self.__slow_policy == DROP_SLOW:
+                    slow.append(key)
+                else:
+                    subscriber.skip()
+            else:
+                skipped = subscriber.take_skipped()
+                if skipped:
+                    subscriber.write((self.__skipped_line(skipped) + '\n').encode())
+                subscriber.write(data)
+        for key in slow:
+            self.__dropped += 1
+            self.__subscribers.pop(key).drop()
+
+    def get_subscriber_count(self) -> int:
+        return len(self.__subscribers)
+
+    def get_subscriber_keys(self) -> List[object]:
+        return list(self.__subscribers)
+
+    def get_published_count(self) -> int:
+        return self.__published
+
+    def get_dropped_count(self) -> int:
+        return self.__dropped
@@ -0,0 +1,141 @@
+import itertools
+import random
+from typing import Dict, List, Optional, Tuple
+
+from models import Code, GameRule, Peg
+from scoring import PEG_INDEX, CodeValues, count_pegs, decode_code
+
+COLOUR_VALUES: List[int] = [index for peg, index in PEG_INDEX.items() if peg != Peg.BLANK]
+BLANK_VALUE: int = PEG_INDEX[Peg.BLANK]
+
+# spaces up to this size keep the enumerated list of codes so sampling is a single random.choices call
+MAX_ENUMERATED_SIZE = 1 << 20
+
+# decoding a drawn index costs about as much as enumerating this many codes, a space is only enumerated for a draw of at least
+# its size divided by it
+DECODE_COST_IN_CODES = 8
+
+
+class CodeSpace:
+    """ CodeSpace class represents every valid code of a game rule, each code is addressed by its index in the space.
+    Indexes below colours^pegs are the codes without blank written in base colours, the remaining ones hold exactly one blank """
+
+    __spaces: Dict[Tuple[int, bool], "CodeSpace"] = {}
+
+    def __init__(self, max_code_peg: int, allow_blank: bool) -> None:
+        super().__init__()
+        self.__max_code_peg: int = max_code_peg
+        self.__allow_blank: bool = allow_blank
+        self.__no_blank_size: int = len(COLOUR_VALUES) ** max_code_peg
+        self.__per_blank_size: int = len(COLOUR_VALUES) ** (max_code_peg - 1)
+        self.__size: int = self.__no_blank_size + (max_code_peg * self.__per_blank_size if allow_blank else 0)
+        self.__all_values: Optional[List[CodeValues]] = None
+        self.__all_counts: Optional[List[CodeValues]] = None
+
+    @staticmethod
+    def of(game_rule: GameRule) -> "CodeSpace":
+        """ :return: the shared CodeSpace of the game rule, rules with the same code shape share one space """
+        key = (game_rule.get_max_code_peg(), game_rule.allow_blank())
+        space = CodeSpace.__spaces.get(key)
+        if space is None:
+            space = CodeSpace.__spaces.setdefault(key, CodeSpace(*key))
+        return space
+
+    @staticmethod
+    def get_loaded() -> Dict[Tuple[int, bool], "CodeSpace"]:
+        """ :return: the spaces created so far by code shape """
+        return dict(CodeSpace.__spaces)
+
+    def size(self) -> int:
+        return self.__size
+
+    def get_max_code_peg(self) -> int:
+        return self.__max_code_peg
+
+    def allow_blank(self) -> bool:
+        return self.__allow_blank
+
+    def decode_index(self, index: int) -> CodeValues:
+        """ :param: index: position of the code in the space
+        :return: the code values at that index """
+        colours = len(COLOUR_VALUES)
+        if index < self.__no_blank_size:
+            digits_count, blank_position = self.__max_code_peg, None
+        else:
+            blank_position, index = divmod(index - self.__no_blank_size, self.__per_blank_size)
+            digits_count = self.__max_code_peg - 1
+        digits = [0] * digits_count
+        for i in range(digits_count - 1, -1, -1):
+            index, digit = divmod(index, colours)
+            digits[i] = COLOUR_VALUES[digit]
+        if blank_position is not None:
+            digits.insert(blank_position, BLANK_VALUE)
+        return tuple(digits)
+
+    def encode_values(self, values: CodeValues) -> int:
+        """ :param: values: the code values
+        :return: the index of the code in the space """
+        colours = len(COLOUR_VALUES)
+        offset = 0
+        if BLANK_VALUE in values:
+            blank_position = values.index(BLANK_VALUE)
+            offset = self.__no_blank_size + blank_position * self.__per_blank_size
+            values = values[:blank_position] + values[blank_position + 1:]
+        index = 0
+        for value in values:
+            index = index * colours + COLOUR_VALUES.index(value)
+        return offset + index
+
+    def get_all_values(self) -> List[CodeValues]:
+        """ :return: every code of the space in index order, enumerated on first use """
+        if self.__all_values is None:
+            all_values = list(itertools.product(COLOUR_VALUES, repeat=self.__max_code_peg))
+            if self.__allow_blank:
+                for blank_position in range(self.__max_code_peg):
+                    for values in itertools.product(COLOUR_VALUES, repeat=self.__max_code_peg - 1):
+                        all_values.append(values[:blank_position] + (BLANK_VALUE,) + values[blank_position:])
+            self.__all_values = all_values
+        return self.__all_values
+
+    def get_all_counts(self) -> List[CodeValues]:
+        """ :return: the peg counts of every code of the space in index order """
+        if self.__all_counts is None:
+            self.__all_counts = [count_pegs(values) for values in self.get_all_values()]
+        return self.__all_counts
+
+    def sample_values(self, count: int, rng: random.Random) -> List[CodeValues]:
+        """ draw codes uniformly from the whole space
+        :param: count: how many codes to draw, rng: the random stream to draw from
+        :return: the list of drawn code values """
+        if self.__all_values is not None or (self.__size <= MAX_ENUMERATED_SIZE and count * DECODE_COST_IN_CODES >= self.__size):
+            return rng.choices(self.get_all_values(), k=count)
+        return [self.decode_index(rng.randrange(self.__size)) for i in range(count)]
+
+    def sample_codes(self, count: int, rng: random.Random) -> List[Code]:
+        """ same as sample_values, but return Code objects """
+        return [decode_code(values) for values in self.sample_values(count, rng)]
+
+
+class SecretStream:
+    """ SecretStream class represents a reproducible supply of secrets for one worker, streams with the same seed but different
+    stream ids are independent """
+
+    def __init__(self, game_rule: GameRule, seed: int, stream_id: int = 0) -> None:
+        super().__init__()
+        self.__code_space: CodeSpace = CodeSpace.of(game_rule)
+        # string seeds are hashed with sha512, so neighbouring stream ids give unrelated generators
+        self.__rng = random.Random('{}/{}'.format(seed, stream_id))
+
+    @staticmethod
+    def spawn(game_rule: GameRule, seed: int, stream_count: int) -> List["SecretStream"]:
+        """ :return: one independent stream per worker """
+        return [SecretStream(game_rule, seed, stream_id) for stream_id in range(stream_count)]
+
+    def next_values(self, count: int) -> List[CodeValues]:
+        return self.__code_space.sample_values(count, self.__rng)
+
+    def next_codes(self, count: int) -> List[Code]:
+        return self.__code_space.sample_codes(count, self.__rng)
+
+    def get_rng(self) -> random.Random:
+        return self.__rng
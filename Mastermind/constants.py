@@ -1,6 +1,19 @@
+from typing import Dict
+
 from models import GameRule
 
-# all predefined game rules
+# rules of the built in games, when they are not chosen from the rules file
 ORIGINAL_1P_GAMERULE = GameRule(True, 1, 12, False, 4)
 ORIGINAL_2P_GAMERULE = GameRule(False, 1, 12, False, 4)
-MASTERMIND_GAMERULE = GameRule(True, 4, 5, True, 5)
\ No newline at end of file
+MASTERMIND_GAMERULE = GameRule(True, 4, 5, True, 5)
+MULTI_SECRET_GAMERULE = GameRule(True, 1, 12, False, 4)
+
+
+def __getattr__(name: str) -> Dict[str, GameRule]:
+    """ GAMERULES_BY_NAME, the game rules addressable by name from the command line tools, is every variant of the rules file.
+    The file is only read by the first module that uses it, so importing the games does not depend on it """
+    if name != 'GAMERULES_BY_NAME':
+        raise AttributeError('module {} has no attribute {}'.format(__name__, name))
+    from rules import get_rule_registry
+    game_rules = globals()[name] = get_rule_registry().get_game_rules()
+    return game_rules
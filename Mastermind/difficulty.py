@@ -0,0 +1,200 @@
+import argparse
+import mmap
+import os
+import random
+import struct
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+import messages
+from codespace import CodeSpace
+from models import Code, ComputerCodeMaker, GameRule
+from scoring import decode_code
+from utils import MasterMindException
+
+# directory holding one difficulty table per code shape, next to this module unless set
+DIFFICULTY_DIR_ENV = 'MASTERMIND_DIFFICULTY_DIR'
+
+TABLE_MAGIC = b'MMDT'
+TABLE_VERSION = 1
+TABLE_HEADER = struct.Struct('<4sBB?BI16s')
+
+# depth stored for a secret the reference breaker did not break
+UNSOLVED_DEPTH = 255
+
+# named bands as the share of secrets they cover, from the easiest secrets to the hardest
+DIFFICULTY_BANDS: Dict[str, Tuple[float, float]] = {
+    'easy': (0.0, 1 / 3),
+    'medium': (1 / 3, 2 / 3),
+    'hard': (2 / 3, 1.0),
+}
+
+
+def get_table_path(max_code_peg: int, allow_blank: bool) -> str:
+    """ :return: the file of the difficulty table of codes of that shape """
+    directory = os.environ.get(DIFFICULTY_DIR_ENV) or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tables')
+    return os.path.join(directory, 'difficulty-{}{}.bin'.format(max_code_peg, '-blank' if allow_blank else ''))
+
+
+class DifficultyTable:
+    """ DifficultyTable class represents how many guesses a reference breaker needs for every secret of a code shape. The file
+    holds the depth of every secret and the secrets ordered from the easiest to the hardest, and is mapped into memory rather than
+    read, so loading it costs no time. Every band is a slice of that order found once at load, and a secret of a band is drawn
+    with one random number """
+
+    __loaded: Dict[Tuple[int, bool], "DifficultyTable"] = {}
+
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        with open(path, 'rb') as table_file:
+            self.__map: mmap.mmap = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self.__map)
+        if len(view) < TABLE_HEADER.size:
+            raise MasterMindException(messages.DIFFICULTY_TABLE_INVALID.format(path=path))
+        magic, version, max_code_peg, allow_blank, max_depth, secret_count, breaker_name = TABLE_HEADER.unpack_from(view)
+        offsets_end = TABLE_HEADER.size + 4 * (max_depth + 3)
+        depths_end = offsets_end + secret_count
+        order_start = depths_end + -depths_end % 4
+        if magic != TABLE_MAGIC or version != TABLE_VERSION or len(view) != order_start + 4 * secret_count:
+            raise MasterMindException(messages.DIFFICULTY_TABLE_INVALID.format(path=path))
+        self.__max_code_peg: int = max_code_peg
+        self.__allow_blank: bool = allow_blank
+        self.__breaker_name: str = breaker_name.rstrip(b'\0').decode()
+        # the secrets of depth d are order[offsets[d]:offsets[d + 1]], unbroken secrets come last
+        self.__offsets: memoryview = view[TABLE_HEADER.size:offsets_end].cast('I')
+        self.__depths: memoryview = view[offsets_end:depths_end]
+        self.__order: memoryview = view[order_start:].cast('I')
+        solved_count = self.__offsets[max_depth + 1]
+        self.__bands: Dict[str, Tuple[int, int]] = {name: (round(low * solved_count), round(high * solved_count))
+                                                    for name, (low, high) in DIFFICULTY_BANDS.items()}
+
+    @staticmethod
+    def of(game_rule: GameRule) -> "DifficultyTable":
+        """ :return: the table of the code shape of the game rule, loaded once per process """
+        key = (game_rule.get_max_code_peg(), game_rule.allow_blank())
+        table = DifficultyTable.__loaded.get(key)
+        if table is None:
+            path = get_table_path(*key)
+            if not os.path.exists(path):
+                from constants import GAMERULES_BY_NAME
+                rule_names = [name for name, rule in GAMERULES_BY_NAME.items() if (rule.get_max_code_peg(), rule.allow_blank()) == key]
+                raise MasterMindException(messages.DIFFICULTY_TABLE_MISSING.format(path=path, rule=(rule_names or ['original'])[0]))
+            table = DifficultyTable.__loaded[key] = DifficultyTable(path)
+        return table
+
+    @staticmethod
+    def get_loaded() -> Dict[Tuple[int, bool], "DifficultyTable"]:
+        """ :return: the tables loaded so far by code shape """
+        return dict(DifficultyTable.__loaded)
+
+    @staticmethod
+    def write(path: str, game_rule: GameRule, breaker_name: str, depths: Dict[int, int], seed: int = 0) -> None:
+        """ write the table of the depths found for every secret, secrets missing from depths were not broken. Secrets of the same
+        depth are shuffled so a band edge inside a depth takes a random part of it """
+        secret_count = CodeSpace.of(game_rule).size()
+        all_depths = bytes(min(depths.get(secret, UNSOLVED_DEPTH), UNSOLVED_DEPTH) for secret in range(secret_count))
+        max_depth = max((depth for depth in all_depths if depth != UNSOLVED_DEPTH), default=0)
+        by_depth: List[List[int]] = [[] for _ in range(max_depth + 2)]
+        for secret, depth in enumerate(all_depths):
+            by_depth[min(depth, max_depth + 1)].append(secret)
+        rng = random.Random(seed)
+        order, offsets = array('I'), array('I')
+        for secrets in by_depth:
+            offsets.append(len(order))
+            rng.shuffle(secrets)
+            order.extend(secrets)
+        offsets.append(len(order))
+        header = TABLE_HEADER.pack(TABLE_MAGIC, TABLE_VERSION, game_rule.get_max_code_peg(), game_rule.allow_blank(), max_depth,
+                                   secret_count, breaker_name.encode())
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'wb') as table_file:
+            table_file.write(header)
+            table_file.write(offsets.tobytes())
+            table_file.write(all_depths)
+            table_file.write(b'\0' * (-(len(header) + 4 * len(offsets) + len(all_depths)) % 4))
+            table_file.write(order.tobytes())
+        os.replace(temporary_path, path)
+
+    def get_secret_at(self, rank: int) -> int:
+        """ :return: the code space index of the secret of that rank, from the easiest to the hardest """
+        return self.__order[rank]
+
+    def get_depth(self, secret: int) -> int:
+        """ :return: the guesses the reference breaker needs for the secret, UNSOLVED_DEPTH when it did not break it """
+        return self.__depths[secret]
+
+    def get_band(self, band: str) -> Tuple[int, int]:
+        """ :return: the first and last + 1 rank of the secrets of a named band """
+        if band not in self.__bands:
+            raise MasterMindException(messages.UNKNOWN_DIFFICULTY_BAND.format(band=band, bands=', '.join(DIFFICULTY_BANDS)))
+        return self.__bands[band]
+
+    def get_depth_band(self, min_depth: int, max_depth: int) -> Tuple[int, int]:
+        """ :return: the first and last + 1 rank of the secrets broken in min_depth to max_depth guesses """
+        last_depth = len(self.__offsets) - 2
+        return self.__offsets[max(0, min(min_depth, last_depth))], self.__offsets[max(0, min(max_depth + 1, last_depth))]
+
+    def sample(self, band: Tuple[int, int], rng: random.Random) -> int:
+        """ :return: the code space index of a secret drawn uniformly from the band """
+        first, last = band
+        if last <= first:
+            raise MasterMindException(messages.DIFFICULTY_BAND_EMPTY)
+        return self.__order[first + rng.randrange(last - first)]
+
+    def get_depth_counts(self) -> Dict[int, int]:
+        """ :return: how many secrets the reference breaker broke in every number of guesses """
+        return {depth: self.__offsets[depth + 1] - self.__offsets[depth] for depth in range(len(self.__offsets) - 2)
+                if self.__offsets[depth + 1] > self.__offsets[depth]}
+
+    def get_breaker_name(self) -> str:
+        return self.__breaker_name
+
+
+class DifficultyCodeMaker(ComputerCodeMaker):
+    """ DifficultyCodeMaker class is a computer code maker that draws its secrets from one difficulty band of the DifficultyTable
+    of the game rule, instead of uniformly """
+
+    def __init__(self, band: str, rng: Optional[random.Random] = None) -> None:
+        super().__init__(rng)
+        self.__band: str = band
+
+    def make_new_final_code(self, game_rule: GameRule) -> Code:
+        table = DifficultyTable.of(game_rule)
+        secret = table.sample(table.get_band(self.__band), self._rng)
+        self._final_code = decode_code(CodeSpace.of(game_rule).decode_index(secret))
+        return self._final_code
+
+
+def build_table(rule_name: str, breaker_name: str = 'minimax', workers: Optional[int] = None, seed: int = 0) -> str:
+    """ play the reference breaker against every secret of the rule and write its difficulty table
+    :return: the path of the table """
+    from constants import GAMERULES_BY_NAME
+    from verifier import StrategyVerifier
+    game_rule = GAMERULES_BY_NAME[rule_name]
+    result, elapsed = StrategyVerifier(breaker_name, rule_name, workers=workers, seed=seed, keep_depths=True).run()
+    path = get_table_path(game_rule.get_max_code_peg(), game_rule.allow_blank())
+    DifficultyTable.write(path, game_rule, breaker_name, result.get_depths(), seed)
+    return path
+
+
+if __name__ == "__main__":
+    from constants import GAMERULES_BY_NAME
+    from strategies import BREAKER_STRATEGIES
+    parser = argparse.ArgumentParser(description='Build the table of how hard every secret of a game rule is to break.')
+    parser.add_argument('--rule', default='original', choices=sorted(GAMERULES_BY_NAME.keys()))
+    parser.add_argument('--breaker', default='minimax', choices=sorted(BREAKER_STRATEGIES.keys()), help='reference breaker')
+    parser.add_argument('--workers', type=int, help='worker processes, all cores by default')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    table_path = build_table(args.rule, args.breaker, args.workers, args.seed)
+    difficulty_table = DifficultyTable(table_path)
+    print('{} written, {} on {}'.format(table_path, difficulty_table.get_breaker_name(), args.rule))
+    print('{:>6} {:>10}'.format('depth', 'secrets'))
+    for solve_depth, secret_total in difficulty_table.get_depth_counts().items():
+        print('{:>6} {:>10}'.format(solve_depth, secret_total))
+    for band_name in DIFFICULTY_BANDS:
+        band_first, band_last = difficulty_table.get_band(band_name)
+        print('{:<8} {:>6} secrets, {} to {} guesses'.format(
+            band_name, band_last - band_first, difficulty_table.get_depth(difficulty_table.get_secret_at(band_first)),
+            difficulty_table.get_depth(difficulty_table.get_secret_at(band_last - 1))))
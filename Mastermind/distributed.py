@@ -0,0 +1,250 @@
+import argparse
+import importlib
+import multiprocessing
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Callable, Deque, Iterator, List, Optional, Tuple
+
+import messages
+from utils import MasterMindException
+
+DISTRIBUTED_SCRIPT = os.path.abspath(__file__)
+
+# key shared by a coordinator and its workers, connections that do not know it are refused
+WORK_KEY_ENV = 'MASTERMIND_WORK_KEY'
+
+# a worker that holds a task this long without answering is taken as lost, and its task goes to another worker
+TASK_LEASE_SECONDS = 600.0
+
+# how long a starting worker keeps trying to reach a coordinator that is not listening yet
+CONNECT_RETRY_SECONDS = 30.0
+
+# seconds the coordinator waits for its local workers to exit once it is closed
+LOCAL_WORKER_EXIT_SECONDS = 5.0
+
+# a task as (function, arguments), the function is found again by module and name on the worker so it must be module level
+Task = Tuple[Callable[..., object], tuple]
+
+
+def get_function_name(function: Callable[..., object]) -> str:
+    """ :return: the module and name a worker imports the function by, a function of the script that was started is named
+    after its file, the worker has no such script as its main module """
+    module_name = function.__module__
+    if module_name == '__main__':
+        module_name = os.path.splitext(os.path.basename(sys.modules['__main__'].__file__))[0]
+    return '{}:{}'.format(module_name, function.__qualname__)
+
+
+def find_function(function_name: str) -> Callable[..., object]:
+    module_name, _, name = function_name.partition(':')
+    return getattr(importlib.import_module(module_name), name)
+
+
+def get_work_key() -> bytes:
+    """ :return: the key of the work queue from the environment, a fresh random key when none is set """
+    return os.environ.get(WORK_KEY_ENV, '').encode() or os.urandom(16).hex().encode()
+
+
+class Coordinator:
+    """ Coordinator class hands tasks out to workers connected over TCP, one task at a time per connection, and streams their
+    results back. A task whose worker disconnects or holds it past the lease goes back to the front of the queue for the next
+    free worker, and a result that comes back twice is only counted once. Workers stay connected across runs until it is closed """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, authkey: Optional[bytes] = None,
+                 lease_seconds: float = TASK_LEASE_SECONDS) -> None:
+        super().__init__()
+        self.__authkey: bytes = authkey or get_work_key()
+        self.__listener: Listener = Listener((host, port), authkey=self.__authkey)
+        self.__lease_seconds: float = lease_seconds
+        self.__condition: threading.Condition = threading.Condition()
+        self.__tasks: List[Tuple[str, tuple]] = []
+        self.__pending: Deque[int] = deque()
+        self.__done: List[bool] = []
+        # (failed, result or error message) of every finished task, in the order they finish
+        self.__results: "queue.Queue[Tuple[bool, object]]" = queue.Queue()
+        self.__closed: bool = False
+        self.__local_workers: List[subprocess.Popen] = []
+        threading.Thread(target=self.__accept, daemon=True).start()
+
+    def get_address(self) -> Tuple[str, int]:
+        return self.__listener.address
+
+    def get_authkey(self) -> bytes:
+        return self.__authkey
+
+    def start_local_workers(self, count: int) -> None:
+        """ start count worker processes on this machine, connected to the coordinator """
+        host, port = self.get_address()
+        environment = dict(os.environ, **{WORK_KEY_ENV: self.__authkey.decode()})
+        for _ in range(count):
+            self.__local_workers.append(subprocess.Popen([sys.executable, DISTRIBUTED_SCRIPT, '--connect', '{}:{}'.format(host, port),
+                                                          '--processes', '1'], env=environment))
+
+    def get_local_workers(self) -> List[subprocess.Popen]:
+        return self.__local_workers
+
+    def run(self, tasks: List[Task]) -> Iterator[object]:
+        """ hand the tasks out to the connected workers and those still to come
+        :return: the results of the tasks in the order they finish """
+        with self.__condition:
+            self.__tasks = [(get_function_name(function), arguments) for function, arguments in tasks]
+            self.__pending = deque(range(len(tasks)))
+            self.__done = [False] * len(tasks)
+            self.__condition.notify_all()
+        for _ in range(len(tasks)):
+            failed, result = self.__results.get()
+            if failed:
+                raise MasterMindException(result)
+            yield result
+
+    def close(self) -> None:
+        """ tell the workers to stop, stop listening and wait for the local workers """
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+        self.__listener.close()
+        for process in self.__local_workers:
+            try:
+                process.wait(LOCAL_WORKER_EXIT_SECONDS)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+    def __accept(self) -> None:
+        while True:
+            try:
+                connection = self.__listener.accept()
+            except multiprocessing.AuthenticationError:
+                continue
+            except OSError:
+                return
+            threading.Thread(target=self.__serve, args=(connection,), daemon=True).start()
+
+    def __serve(self, connection: Connection) -> None:
+        """ feed one worker connection a task at a time until the coordinator is closed or the worker is lost """
+        task_id = None
+        try:
+            while True:
+                task_id = self.__next_task()
+                if task_id is None:
+                    connection.send(None)
+                    return
+                connection.send(self.__tasks[task_id])
+                if not connection.poll(self.__lease_seconds):
+                    return
+                failed, result = connection.recv()
+                self.__finish(task_id, failed, result)
+                task_id = None
+        except (EOFError, OSError):
+            pass
+        finally:
+            if task_id is not None:
+                self.__requeue(task_id)
+            connection.close()
+
+    def __next_task(self) -> Optional[int]:
+        """ :return: the next task to run, waiting while there is none, None once the coordinator is closed """
+        with self.__condition:
+            while not self.__pending and not self.__closed:
+                self.__condition.wait()
+            return None if self.__closed else self.__pending.popleft()
+
+    def __finish(self, task_id: int, failed: bool, result: object) -> None:
+        with self.__condition:
+            if self.__done[task_id]:
+                return
+            self.__done[task_id] = True
+        self.__results.put((failed, result))
+
+    def __requeue(self, task_id: int) -> None:
+        with self.__condition:
+            if not self.__closed and not self.__done[task_id]:
+                self.__pending.appendleft(task_id)
+                self.__condition.notify()
+
+
+def serve_tasks(address: Tuple[str, int], authkey: bytes) -> None:
+    """ run the tasks of the coordinator one at a time until it tells the worker to stop or goes away """
+    deadline = time.monotonic() + CONNECT_RETRY_SECONDS
+    while True:
+        try:
+            connection = Client(address, authkey=authkey)
+            break
+        except ConnectionRefusedError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.5)
+    with connection:
+        while True:
+            try:
+                task = connection.recv()
+            except (EOFError, OSError):
+                return
+            if task is None:
+                return
+            function_name, arguments = task
+            try:
+                connection.send((False, find_function(function_name)(*arguments)))
+            except Exception:
+                connection.send((True, messages.DISTRIBUTED_TASK_FAILED.format(task=function_name, error=traceback.format_exc())))
+
+
+def run_tasks(tasks: List[Task], workers: Optional[int] = None, coordinator: Optional[Coordinator] = None) -> Iterator[object]:
+    """ run the tasks over the workers of the coordinator, or over a pool of worker processes of this machine without one
+    :return: the results of the tasks in the order they finish """
+    if coordinator is not None:
+        yield from coordinator.run(tasks)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(function, *arguments) for function, arguments in tasks]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def add_coordinator_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--listen', help='hand the tasks out to workers connecting to this host:port instead of a local pool')
+    parser.add_argument('--local-workers', type=int, help='start this many workers on this machine connected to the work queue')
+
+
+def create_coordinator(args: argparse.Namespace) -> Optional[Coordinator]:
+    """ :return: the coordinator asked for on the command line, None to run on the local process pool """
+    if args.listen is None and args.local_workers is None:
+        return None
+    host, _, port = (args.listen or '127.0.0.1:0').rpartition(':')
+    coordinator = Coordinator(host, int(port))
+    if args.listen is not None:
+        host, port = coordinator.get_address()
+        print(messages.DISTRIBUTED_LISTENING.format(host=host, port=port, env=WORK_KEY_ENV, key=coordinator.get_authkey().decode()),
+              file=sys.stderr, flush=True)
+    if args.local_workers:
+        coordinator.start_local_workers(args.local_workers)
+    return coordinator
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run tasks of a tournament.py or verifier.py coordinator on this machine.')
+    parser.add_argument('--connect', required=True, help='host:port the coordinator listens on')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='tasks run at once, one per core by default')
+    args = parser.parse_args()
+    coordinator_host, _, coordinator_port = args.connect.rpartition(':')
+    coordinator_address = (coordinator_host, int(coordinator_port))
+    work_key = os.environ.get(WORK_KEY_ENV, '').encode()
+    if not work_key:
+        parser.error(messages.DISTRIBUTED_MISSING_KEY.format(env=WORK_KEY_ENV))
+    if args.processes == 1:
+        serve_tasks(coordinator_address, work_key)
+    else:
+        worker_processes = [multiprocessing.Process(target=serve_tasks, args=(coordinator_address, work_key))
+                            for _ in range(args.processes)]
+        for worker_process in worker_processes:
+            worker_process.start()
+        for worker_process in worker_processes:
+            worker_process.join()
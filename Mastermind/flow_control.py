@@ -0,0 +1,183 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import messages
+
+# lines a session may send per second, and how many it may send at once after being idle
+SESSION_RATE = 20.0
+SESSION_BURST = 40.0
+
+# lines all the sessions of one address may send together, clients opening many connections share it
+ADDRESS_RATE = 1000.0
+ADDRESS_BURST = 2000.0
+
+# addresses whose buckets are kept, the one idle the longest is forgotten first
+MAX_TRACKED_ADDRESSES = 10000
+
+# tokens taken by a line of each command, a command missing here takes one
+COMMAND_COSTS: Dict[str, float] = {
+    'QUIT': 0.0,
+    'HINT': 5.0,
+    'MEMORY': 20.0,
+}
+
+# commands refused while the event loop lags, they start new work where the others continue a running race. A JOIN of a player
+# rejoining a running race continues it and is not refused
+SHED_COMMANDS = frozenset(['JOIN', 'WATCH', 'HINT', 'MEMORY'])
+
+# event loop lag in seconds over which shedding starts, and how often the lag is measured
+MAX_LOOP_LAG = 0.1
+LAG_SAMPLE_SECONDS = 0.05
+
+# bytes of input read from a connection and not processed yet, reading pauses past twice that so a client that floods the server
+# is held back by TCP. It is also the longest line accepted
+INPUT_BUFFER_BYTES = 4096
+
+# bytes of output queued to a client that does not read them, past that the client is disconnected
+MAX_OUTPUT_BYTES = 1 << 18
+
+# hint requests of a session waiting for their answer
+MAX_PENDING_HINTS = 1
+
+# lines of a session refused in a row after which it is disconnected, a client that keeps sending while refused is flooding
+MAX_REFUSALS_IN_A_ROW = 50
+
+
+class TokenBucket:
+    """ TokenBucket class lets through rate lines per second on average, and up to burst lines at once """
+
+    def __init__(self, rate: float, burst: float) -> None:
+        super().__init__()
+        self.__rate: float = rate
+        self.__burst: float = burst
+        self.__tokens: float = burst
+        self.__updated: float = time.monotonic()
+
+    def has(self, cost: float) -> bool:
+        """ :return: whether cost tokens can be taken now """
+        now = time.monotonic()
+        self.__tokens = min(self.__burst, self.__tokens + (now - self.__updated) * self.__rate)
+        self.__updated = now
+        return self.__tokens >= cost
+
+    def take(self, cost: float) -> None:
+        self.__tokens -= cost
+
+
+class LoopLagMonitor:
+    """ LoopLagMonitor class measures how late the event loop wakes up a task that sleeps LAG_SAMPLE_SECONDS, which is how long
+    every ready callback waits its turn. A spike is kept and decays by half every sample, so shedding does not flap """
+
+    def __init__(self, interval: float = LAG_SAMPLE_SECONDS) -> None:
+        super().__init__()
+        self.__interval: float = interval
+        self.__lag: float = 0.0
+        self.__task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """ start measuring on the running loop, once """
+        if self.__task is None:
+            self.__task = asyncio.ensure_future(self.__run())
+
+    async def __run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.__interval
+            await asyncio.sleep(self.__interval)
+            self.__lag = max(loop.time() - expected, self.__lag / 2)
+
+    def get_lag(self) -> float:
+        return self.__lag
+
+    def stop(self) -> None:
+        if self.__task is not None:
+            self.__task.cancel()
+            self.__task = None
+
+
+class FlowControl:
+    """ FlowControl class decides whether the server takes a line of a session: within the token buckets of the session and of
+    its address, and, while the event loop lags, only when it continues a running race. A rate of 0 turns that limit off """
+
+    def __init__(self, session_rate: float = SESSION_RATE, session_burst: float = SESSION_BURST, address_rate: float = ADDRESS_RATE,
+                 address_burst: float = ADDRESS_BURST, max_loop_lag: float = MAX_LOOP_LAG) -> None:
+        super().__init__()
+        self.__session_rate: float = session_rate
+        self.__session_burst: float = session_burst
+        self.__address_rate: float = address_rate
+        self.__address_burst: float = address_burst
+        self.__max_loop_lag: float = max_loop_lag
+        self.__session_buckets: Dict[object, TokenBucket] = {}
+        self.__address_buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.__refusals: Dict[object, int] = {}
+        self.__lag_monitor: LoopLagMonitor = LoopLagMonitor()
+        self.__session_limited: int = 0
+        self.__address_limited: int = 0
+        self.__shed: int = 0
+
+    def start(self) -> None:
+        """ start measuring the lag of the running loop, once """
+        if self.__max_loop_lag > 0:
+            self.__lag_monitor.start()
+
+    def admit(self, session: object, address: str, command: str, continues_race: bool = False) -> Optional[str]:
+        """ take the tokens of a line of the session
+        :param: continues_race: whether the line continues a running race, then it is not shed while the event loop lags
+        :return: None when the line is taken, otherwise the reason it is refused """
+        refusal = self.__admit(session, address, command, continues_race)
+        if refusal is None:
+            self.__refusals.pop(session, None)
+        else:
+            self.__refusals[session] = self.__refusals.get(session, 0) + 1
+        return refusal
+
+    def is_flooding(self, session: object) -> bool:
+        """ :return: whether the session had MAX_REFUSALS_IN_A_ROW lines refused in a row """
+        return self.__refusals.get(session, 0) >= MAX_REFUSALS_IN_A_ROW
+
+    def __admit(self, session: object, address: str, command: str, continues_race: bool) -> Optional[str]:
+        cost = COMMAND_COSTS.get(command, 1.0)
+        if cost == 0:
+            return None
+        if (self.__max_loop_lag > 0 and command in SHED_COMMANDS and not continues_race
+                and self.__lag_monitor.get_lag() > self.__max_loop_lag):
+            self.__shed += 1
+            return messages.SERVER_OVERLOADED.format(command=command)
+        session_bucket = None
+        if self.__session_rate > 0:
+            session_bucket = self.__session_buckets.get(session)
+            if session_bucket is None:
+                session_bucket = self.__session_buckets[session] = TokenBucket(self.__session_rate, self.__session_burst)
+            if not session_bucket.has(cost):
+                self.__session_limited += 1
+                return messages.SERVER_RATE_LIMITED.format(rate=self.__session_rate)
+        if self.__address_rate > 0:
+            address_bucket = self.__get_address_bucket(address)
+            if not address_bucket.has(cost):
+                self.__address_limited += 1
+                return messages.SERVER_ADDRESS_RATE_LIMITED.format(address=address, rate=self.__address_rate)
+            address_bucket.take(cost)
+        if session_bucket is not None:
+            session_bucket.take(cost)
+        return None
+
+    def __get_address_bucket(self, address: str) -> TokenBucket:
+        bucket = self.__address_buckets.get(address)
+        if bucket is None:
+            bucket = self.__address_buckets[address] = TokenBucket(self.__address_rate, self.__address_burst)
+            if len(self.__address_buckets) > MAX_TRACKED_ADDRESSES:
+                self.__address_buckets.popitem(last=False)
+        else:
+            self.__address_buckets.move_to_end(address)
+        return bucket
+
+    def remove_session(self, session: object) -> None:
+        self.__session_buckets.pop(session, None)
+        self.__refusals.pop(session, None)
+
+    def get_stats(self) -> Dict[str, float]:
+        """ :return: how many lines were refused by each limit and the current event loop lag """
+        return {'session_limited': self.__session_limited, 'address_limited': self.__address_limited, 'shed': self.__shed,
+                'loop_lag_ms': round(1000 * self.__lag_monitor.get_lag(), 1)}
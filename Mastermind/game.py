@@ -1,22 +1,44 @@
 import os
 import random
+import time
 from abc import ABC, abstractmethod
-from typing import Optional, List
+from typing import TYPE_CHECKING, Dict, Optional, List, Tuple, Type
 
 import messages
-from constants import ORIGINAL_1P_GAMERULE, ORIGINAL_2P_GAMERULE, MASTERMIND_GAMERULE
+from constants import ORIGINAL_1P_GAMERULE, ORIGINAL_2P_GAMERULE, MASTERMIND_GAMERULE, MULTI_SECRET_GAMERULE
 from messages import MessageBankInterface
 from models import CodeBreaker, GameRule, Code, CodeMaker, ComputerCodeMaker, HumanCodeMaker, AttemptFeedback, Peg
 from utils import prompt, MasterMindException, CodeParsingException
 
+# hints, multi-secret games and snapshots are loaded on first use, a plain interactive launch does not need them
+if TYPE_CHECKING:
+    from hints import CandidateTracker
+    from multisecret import SecretBatch
+    from snapshot import GameSnapshot, ResultLog
+    from strategies import TeamBreaker
+
 
 class Game(MessageBankInterface, ABC):
     """ Game generic class that acts as a central point to perform all game logic """
 
-    def __init__(self, game_rule: GameRule) -> None:
+    def __init__(self, game_rule: GameRule, show_hints: bool = False, results: Optional["ResultLog"] = None,
+                 difficulty: Optional[str] = None) -> None:
         super().__init__()
         self._game_rule: GameRule = game_rule
         self._current_round: int = 1
+        self._show_hints: bool = show_hints
+        # finished games are appended there when they are recorded
+        self._results: Optional["ResultLog"] = results
+        # difficulty band the secrets of a computer code maker are drawn from, uniformly drawn when None
+        self._difficulty: Optional[str] = difficulty
+        self._hint_trackers: Dict[CodeBreaker, "CandidateTracker"] = {}
+        # state of the game being played, kept on the game so it can be snapshotted at any time
+        self._final_code: Optional[Code] = None
+        self._code_breakers: List[CodeBreaker] = []
+        self._revealed_positions: Dict[CodeBreaker, int] = {}
+        self._history: List[Tuple[CodeBreaker, Code, AttemptFeedback]] = []
+        # milliseconds every attempt of the history took the breaker
+        self._latencies: List[int] = []
         self._start_game()
 
     def _start_game(self):
@@ -24,17 +46,26 @@ class Game(MessageBankInterface, ABC):
          a winner or max attempts reached, prompt to continue to play or quit the game """
         while self._prompt_game_start():
             self._current_round = 1
+            self._revealed_positions = {}
+            self._history = []
+            self._latencies = []
             code_maker, code_breakers = self._create_players()
+            self._code_breakers = code_breakers
             print(self._get_code_maker_guide_mssg(code_maker.get_name(), code_breakers[0].get_name()))
             final_code: Code = code_maker.make_new_final_code(self._game_rule)
+            self._final_code = final_code
+            self._create_hint_trackers(code_breakers)
             self._reveal_code(code_breakers, final_code)
             game_over = False
             print(self._get_attempt_start_mssg(code_breakers[0].get_name()))
+            if self._show_hints:
+                print(messages.HINT_GUIDE)
             while not game_over:
                 winner: CodeBreaker = self._prompt_breakers_guessing(code_breakers, final_code)
                 game_over = winner is not None or self._current_round == self._game_rule.get_max_attempts()
                 if game_over:
                     self._game_over(winner, final_code)
+                    self._record_result()
                 self._current_round = self._current_round + 1
         print(messages.QUIT_MESSAGE)
 
@@ -55,18 +86,71 @@ class Game(MessageBankInterface, ABC):
 
     def _process_prompt_breaker_guessing(self, code_breaker: CodeBreaker, final_code: Code) -> AttemptFeedback:
         """ prompt breaker to input the code, then return the the feedback of his attempt """
+        started = time.monotonic()
+        attempt_code: Code = self._prompt_attempt_code(code_breaker)
+        feedback: AttemptFeedback = code_breaker.make_a_guess(attempt_code, final_code)
+        self._history.append((code_breaker, attempt_code, feedback))
+        self._latencies.append(int(1000 * (time.monotonic() - started)))
+        if code_breaker in self._hint_trackers:
+            self._hint_trackers[code_breaker].add_feedback(attempt_code, feedback)
+        return feedback
+
+    def _prompt_attempt_code(self, code_breaker: Optional[CodeBreaker] = None) -> Code:
+        """ prompt breaker to input the code until it can be parsed, then return the parsed code. When hints are on,
+        the breaker can ask for a suggested guess instead """
         attempt_code: Optional[Code] = None
         while attempt_code is None:
             attempt_input: str = prompt()
+            if attempt_input == messages.HINT_REQUEST and code_breaker in self._hint_trackers:
+                print(messages.HINT_SUGGESTION.format(code=str(self._hint_trackers[code_breaker].suggest_guess())))
+                continue
             try:
                 attempt_code = Code.parse(attempt_input, self._game_rule)
             except CodeParsingException:
                 print(MessageBankInterface.get_unparsable_token_mssg(self._game_rule.get_max_code_peg(), self._game_rule.allow_blank()))
-        return code_breaker.make_a_guess(attempt_code, final_code)
+        return attempt_code
+
+    def _create_hint_trackers(self, code_breakers: List[CodeBreaker]) -> None:
+        """ start tracking the possible codes of every breaker when hints are on """
+        if self._show_hints:
+            from hints import CandidateTracker
+            self._hint_trackers = {code_breaker: CandidateTracker(self._game_rule) for code_breaker in code_breakers}
+
+    def _record_revealed_peg(self, code_breaker: CodeBreaker, position: int, peg: Peg) -> None:
+        """ remember the peg revealed to the breaker, and let the hints of that breaker know about it """
+        self._revealed_positions[code_breaker] = position
+        if code_breaker in self._hint_trackers:
+            self._hint_trackers[code_breaker].reveal_peg(position, peg)
+
+    def _print_hint(self, code_breaker: CodeBreaker) -> None:
+        """ print how many codes are still possible for the breaker when hints are on """
+        if code_breaker in self._hint_trackers:
+            print(messages.HINT_REMAINING.format(candidate_count=self._hint_trackers[code_breaker].get_candidate_count()))
+
+    def snapshot(self, session_id: str) -> "GameSnapshot":
+        """ return the compact snapshot of the game being played, for games with a single final code """
+        from codespace import CodeSpace
+        from scoring import encode_code
+        from snapshot import GameSnapshot
+        code_space = CodeSpace.of(self._game_rule)
+        player_indexes = {code_breaker: index for index, code_breaker in enumerate(self._code_breakers)}
+        history = [(player_indexes[code_breaker], code_space.encode_values(encode_code(attempt_code)), feedback.get_black_count(),
+                    feedback.get_white_count()) for code_breaker, attempt_code, feedback in self._history]
+        return GameSnapshot(session_id, self._game_rule, [code_breaker.get_name() for code_breaker in self._code_breakers],
+                            code_space.encode_values(encode_code(self._final_code)),
+                            [self._revealed_positions.get(code_breaker) for code_breaker in self._code_breakers], history)
+
+    def _record_result(self) -> None:
+        """ append the finished game to the result log when games are recorded """
+        if self._results is not None:
+            self._results.record(self.snapshot('local-{:08x}'.format(random.getrandbits(32))), self._latencies)
 
     def _create_code_maker(self, is_computer_code_maker: bool) -> CodeMaker:
         """ return a new code maker based on the game rule, whether its a computer or human """
         if is_computer_code_maker:
+            if self._difficulty is not None:
+                from difficulty import DifficultyCodeMaker
+                return DifficultyCodeMaker(self._difficulty)
             return ComputerCodeMaker()
         return HumanCodeMaker(self._prompt_player_name(1))
 
@@ -117,8 +201,9 @@ class Original(Game, ABC):
         else:
             print(messages.GAME_OVER.format(attempt=self._game_rule.get_max_attempts(), final_code=str(final_code)))
 
-    def __init__(self, game_rule: GameRule) -> None:
-        super().__init__(game_rule)
+    def __init__(self, game_rule: GameRule, show_hints: bool = False, results: Optional["ResultLog"] = None,
+                 difficulty: Optional[str] = None) -> None:
+        super().__init__(game_rule, show_hints, results, difficulty)
 
     def _reveal_code(self, code_breakers: List[CodeBreaker], final_code: Code) -> None:
         pass
@@ -132,6 +217,7 @@ class Original(Game, ABC):
             feedback: AttemptFeedback = self._process_prompt_breaker_guessing(code_breaker, final_code)
             print(self._get_attempt_feedback_mssg(self._current_round, code_breaker.get_name())
                   + str(feedback))
+            self._print_hint(code_breaker)
             if feedback.is_winning_state(self._game_rule.get_max_code_peg()):
                 return code_breaker
         return None
@@ -140,8 +226,9 @@ class Original(Game, ABC):
 class Original1P(Original):
     """ Game Original1P class that acts as a central point to perform game logic that corresponding to original mastermind for 1 player game type """
 
-    def __init__(self) -> None:
-        super().__init__(ORIGINAL_1P_GAMERULE)
+    def __init__(self, show_hints: bool = False, results: Optional["ResultLog"] = None, difficulty: Optional[str] = None,
+                 game_rule: GameRule = ORIGINAL_1P_GAMERULE) -> None:
+        super().__init__(game_rule, show_hints, results, difficulty)
 
     def _get_code_maker_guide_mssg(self, code_maker_name: str = None, code_breaker_name: str = None) -> str:
         return messages.ORIGINAL_1P_CODE_MAKER_GUIDE
@@ -150,8 +237,10 @@ class Original1P(Original):
 class Original2P(Original):
     """ Game Original2P class that acts as a central point to perform game logic that corresponding to original mastermind for 2 players game type """
 
-    def __init__(self) -> None:
-        super().__init__(ORIGINAL_2P_GAMERULE)
+    def __init__(self, show_hints: bool = False, results: Optional["ResultLog"] = None, difficulty: Optional[str] = None,
+                 game_rule: GameRule = ORIGINAL_2P_GAMERULE) -> None:
+        # the secret is picked by a player, there is no difficulty to draw it from
+        super().__init__(game_rule, show_hints, results)
 
     def _get_code_maker_guide_mssg(self, code_maker_name: str, code_breaker_name: str) -> str:
         if code_maker_name is None:
@@ -159,12 +248,66 @@ class Original2P(Original):
         return messages.ORIGINAL_2P_CODE_MAKER_GUIDE.format(code_maker_name=code_maker_name, code_breaker_name=code_breaker_name,
                                                             max_code_length=self._game_rule.get_max_code_peg())
 
+    def _game_over(self, winner: Optional[CodeBreaker], final_code: Code) -> None:
+        super()._game_over(winner, final_code)
+        # the secrets people pick teach the prior of the breaker strategies, recorded when MASTERMIND_SECRET_PRIOR is set
+        from prior import SecretPrior
+        SecretPrior.record_secret(final_code)
+
+
+class OriginalMultiSecret(Original):
+    """ Game OriginalMultiSecret class that acts as a central point to perform game logic that corresponding to multi-secret mastermind game type,
+    where the computer creates K final codes and every guess is checked against all of them """
+
+    def __init__(self, show_hints: bool = False, results: Optional["ResultLog"] = None, difficulty: Optional[str] = None,
+                 game_rule: GameRule = MULTI_SECRET_GAMERULE) -> None:
+        self.__secret_count: int = self.__prompt_secret_count()
+        # a guess breaks at most one distinct code, so every extra code earns one extra attempt. The secrets are drawn by
+        # the multi-secret code maker and the feedback is per secret, so hints, results and difficulty do not apply
+        super().__init__(GameRule(True, 1, game_rule.get_max_attempts() + self.__secret_count - 1,
+                                  game_rule.allow_blank(), game_rule.get_max_code_peg()))
+
+    @staticmethod
+    def __prompt_secret_count() -> int:
+        """ prompt user to input how many final codes to break, return the number """
+        print(messages.MULTI_SECRET_COUNT_PROMPT)
+        while True:
+            secret_count_input = prompt()
+            if secret_count_input.isdigit() and int(secret_count_input) > 0:
+                print()
+                return int(secret_count_input)
+            print(messages.INVALID_SECRET_COUNT)
+
+    def _create_code_maker(self, is_computer_code_maker: bool) -> CodeMaker:
+        from multisecret import MultiSecretCodeMaker
+        return MultiSecretCodeMaker(self.__secret_count)
+
+    def _get_code_maker_guide_mssg(self, code_maker_name: str = None, code_breaker_name: str = None) -> str:
+        return messages.MULTI_SECRET_CODE_MAKER_GUIDE.format(secret_count=self.__secret_count)
+
+    def _prompt_breakers_guessing(self, code_breakers: List[CodeBreaker], final_code: "SecretBatch") -> Optional[CodeBreaker]:
+        for code_breaker in code_breakers:
+            print(messages.ORIGINAL_ATTEMPT.format(current_round=self._current_round))
+            broken_before = [final_code.is_broken(i) for i in range(len(final_code))]
+            all_feedback: List[AttemptFeedback] = final_code.evaluate(self._prompt_attempt_code())
+            print(self._get_attempt_feedback_mssg(self._current_round, code_breaker.get_name()))
+            for index, feedback in enumerate(all_feedback):
+                if broken_before[index]:
+                    print(messages.MULTI_SECRET_BROKEN.format(index=index + 1))
+                else:
+                    print(messages.MULTI_SECRET_FEEDBACK.format(index=index + 1, feedback=str(feedback)))
+            print(messages.MULTI_SECRET_PROGRESS.format(broken=final_code.get_broken_count(), secret_count=len(final_code)))
+            if final_code.is_all_broken():
+                return code_breaker
+        return None
+
 
 class Mastermind44(Game):
     """ Game Original2P class that acts as a central point to perform game logic that corresponding to Mastermind44 game type """
 
-    def __init__(self) -> None:
-        super().__init__(MASTERMIND_GAMERULE)
+    def __init__(self, show_hints: bool = False, results: Optional["ResultLog"] = None, difficulty: Optional[str] = None,
+                 game_rule: GameRule = MASTERMIND_GAMERULE) -> None:
+        super().__init__(game_rule, show_hints, results, difficulty)
 
     def _get_code_maker_guide_mssg(self, code_maker_name: str = None, code_breaker_name: str = None) -> str:
         return messages.MASTERMIND_CODE_MAKER_GUIDE
@@ -197,6 +340,7 @@ class Mastermind44(Game):
             random_index_to_reveal: int = indexes_random_able[index_of_indexes_random_able]
             indexes_random_able.pop(index_of_indexes_random_able)
             revealed_peg: Peg = final_code_pegs[random_index_to_reveal]
+            self._record_revealed_peg(code_breaker, random_index_to_reveal, revealed_peg)
             print(messages.MASTERMIND_REVEAL_PEG.format(position=random_index_to_reveal + 1, color=revealed_peg.value))
             print(messages.MASTERMIND_CLEAR_SCREEN)
             prompt()
@@ -208,7 +352,75 @@ class Mastermind44(Game):
                                                          max_code_length=self._game_rule.get_max_code_peg()))
             feedback: AttemptFeedback = self._process_prompt_breaker_guessing(code_breaker, final_code)
             print(self._get_attempt_feedback_mssg(self._current_round, code_breaker.get_name())
-                  + str(feedback) + '\n')
+                  + str(feedback))
+            self._print_hint(code_breaker)
+            print()
+            if feedback.is_winning_state(self._game_rule.get_max_code_peg()):
+                return code_breaker
+        return None
+
+
+class Mastermind44Team(Mastermind44):
+    """ Game Mastermind44Team class plays Mastermind44 with four computer breakers as a team. They share one TeamBreaker that
+    combines the pegs revealed to every teammate and the feedback of every guess, so each guess is picked for the whole team """
+
+    def __init__(self, show_hints: bool = False, results: Optional["ResultLog"] = None, difficulty: Optional[str] = None,
+                 game_rule: GameRule = MASTERMIND_GAMERULE) -> None:
+        self.__team: Optional["TeamBreaker"] = None
+        self.__guess_index: int = 0
+        super().__init__(show_hints, results, difficulty, game_rule)
+
+    def _get_code_maker_guide_mssg(self, code_maker_name: str = None, code_breaker_name: str = None) -> str:
+        return messages.TEAM_CODE_MAKER_GUIDE
+
+    def _create_players(self) -> (CodeMaker, List[CodeBreaker]):
+        from strategies import TeamBreaker
+        self.__team = TeamBreaker(self._game_rule, random.Random())
+        code_breakers = [CodeBreaker(messages.TEAM_PLAYER_NAME.format(player_number=player_number + 1))
+                         for player_number in range(self._game_rule.get_max_breakers())]
+        return self._create_code_maker(True), code_breakers
+
+    def _reveal_code(self, code_breakers: List[CodeBreaker], final_code: Code) -> None:
+        # every teammate sees a different position, the team index narrows down with all of them
+        final_code_pegs: List[Peg] = final_code.get_pegs()
+        for code_breaker, position in zip(code_breakers, random.sample(range(len(final_code_pegs)), len(code_breakers))):
+            self._record_revealed_peg(code_breaker, position, final_code_pegs[position])
+            self.__team.reveal_peg(position, final_code_pegs[position])
+            print(messages.TEAM_REVEAL_PEG.format(player_name=code_breaker.get_name(), position=position + 1,
+                                                  color=final_code_pegs[position].value))
+        print()
+
+    def _prompt_attempt_code(self, code_breaker: Optional[CodeBreaker] = None) -> Code:
+        """ the team picks the guess of the breaker instead of prompting for it """
+        from codespace import CodeSpace
+        from scoring import decode_code
+        self.__guess_index = self.__team.next_guess()
+        attempt_code = decode_code(CodeSpace.of(self._game_rule).decode_index(self.__guess_index))
+        print(messages.TEAM_GUESS.format(player_name=code_breaker.get_name(), current_round=self._current_round, code=str(attempt_code)))
+        return attempt_code
+
+    def _process_prompt_breaker_guessing(self, code_breaker: CodeBreaker, final_code: Code) -> AttemptFeedback:
+        feedback: AttemptFeedback = super()._process_prompt_breaker_guessing(code_breaker, final_code)
+        # one update of the shared index per guess, for the whole team
+        self.__team.observe(self.__guess_index, (feedback.get_black_count(), feedback.get_white_count()))
+        return feedback
+
+    def _prompt_breakers_guessing(self, code_breakers: List[CodeBreaker], final_code: Code) -> Optional[CodeBreaker]:
+        for code_breaker in code_breakers:
+            feedback: AttemptFeedback = self._process_prompt_breaker_guessing(code_breaker, final_code)
+            print(self._get_attempt_feedback_mssg(self._current_round, code_breaker.get_name()) + str(feedback))
             if feedback.is_winning_state(self._game_rule.get_max_code_peg()):
                 return code_breaker
+            print(messages.TEAM_REMAINING.format(candidate_count=self.__team.get_candidate_count()))
         return None
+
+
+# game classes by the name the game field of a rule in rules.json gives them, they all take
+# (show_hints, results, difficulty, game_rule)
+GAME_TYPES: Dict[str, Type[Game]] = {
+    'original-1p': Original1P,
+    'original-2p': Original2P,
+    'multi-secret': OriginalMultiSecret,
+    'mastermind44': Mastermind44,
+    'mastermind44-team': Mastermind44Team,
+}
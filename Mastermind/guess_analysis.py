@@ -0,0 +1,192 @@
+import argparse
+import itertools
+import json
+import random
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from hints import SUGGESTION_BUDGET, CandidateTracker, get_entropy
+from models import GameRule
+from scoring import PEG_ORDER, decode_code
+from snapshot import GameSnapshot, ResultLog
+
+# positions kept by every worker, a game that replays a known opening starts from the kept candidates and best guess stats
+MAX_POSITIONS = 20000
+
+# a position is keyed by the code shape, the revealed peg and the (guess, black, white) steps that led to it
+PositionKey = Tuple[int, bool, Optional[Tuple[int, int]], Tuple[Tuple[int, int, int], ...]]
+
+
+class GuessQuality:
+    """ GuessQuality class represents how good one recorded guess was: how many codes were possible before and after it, and how its
+    worst case and entropy compare to the best guess found among the codes that were possible """
+
+    def __init__(self, session_id: str, player_name: str, attempt: int, guess: str, candidates_before: int, candidates_after: int,
+                 worst_case: int, best_worst_case: int, entropy: float, best_entropy: float) -> None:
+        super().__init__()
+        self.__session_id: str = session_id
+        self.__player_name: str = player_name
+        self.__attempt: int = attempt
+        self.__guess: str = guess
+        self.__candidates_before: int = candidates_before
+        self.__candidates_after: int = candidates_after
+        self.__worst_case: int = worst_case
+        self.__best_worst_case: int = best_worst_case
+        self.__entropy: float = entropy
+        self.__best_entropy: float = best_entropy
+
+    def get_player_name(self) -> str:
+        return self.__player_name
+
+    def get_worst_case_gap(self) -> int:
+        """ :return: how many more codes the guess could leave than the best guess found """
+        return self.__worst_case - self.__best_worst_case
+
+    def get_entropy_gap(self) -> float:
+        """ :return: how many bits of information the guess gave less than the best guess found """
+        return self.__best_entropy - self.__entropy
+
+    def to_dict(self) -> Dict[str, object]:
+        return {'session_id': self.__session_id, 'player': self.__player_name, 'attempt': self.__attempt, 'guess': self.__guess,
+                'candidates_before': self.__candidates_before, 'candidates_after': self.__candidates_after,
+                'worst_case': self.__worst_case, 'best_worst_case': self.__best_worst_case,
+                'entropy': round(self.__entropy, 4), 'best_entropy': round(self.__best_entropy, 4)}
+
+
+class GuessAnalyzer:
+    """ GuessAnalyzer class replays recorded games and rates every guess. Positions are kept in an LRU by the steps that led to them,
+    so games sharing an opening reuse the candidates and the best guess search of the shared part, and partition sizes are
+    shared through the partition cache of the trackers """
+
+    def __init__(self, max_positions: int = MAX_POSITIONS) -> None:
+        super().__init__()
+        self.__max_positions: int = max_positions
+        # tracker of every kept position and the best (worst case, entropy) found there once it was searched
+        self.__positions: OrderedDict = OrderedDict()
+
+    def analyse_game(self, snapshot: GameSnapshot) -> List[GuessQuality]:
+        """ :return: the quality of every guess of the game, in the order they were played """
+        game_rule = snapshot.get_game_rule()
+        player_names = snapshot.get_player_names()
+        final_values = None
+        reveals: List[Optional[Tuple[int, int]]] = [None] * len(player_names)
+        for player_index, position in enumerate(snapshot.get_revealed_positions()):
+            if position is not None:
+                if final_values is None:
+                    final_values = self.__root(game_rule, None)[0].get_code_space().decode_index(snapshot.get_final_code())
+                reveals[player_index] = (position, final_values[position])
+        paths: List[Tuple[Tuple[int, int, int], ...]] = [()] * len(player_names)
+        attempts = [0] * len(player_names)
+        qualities = []
+        for player_index, guess, black, white in snapshot.get_history():
+            tracker, best = self.__position(game_rule, reveals[player_index], paths[player_index])
+            if best is None:
+                best = self.__search_best(game_rule, reveals[player_index], paths[player_index], tracker)
+            sizes = tracker.get_partition_sizes(guess)
+            after = dict(sizes).get((black, white), 0) if black != game_rule.get_max_code_peg() else 0
+            attempts[player_index] += 1
+            qualities.append(GuessQuality(snapshot.get_session_id(), player_names[player_index], attempts[player_index],
+                                          str(decode_code(tracker.get_code_space().decode_index(guess))), tracker.get_candidate_count(),
+                                          after, max(size for feedback, size in sizes), best[0], get_entropy(sizes), best[1]))
+            paths[player_index] = paths[player_index] + ((guess, black, white),)
+        return qualities
+
+    def __root(self, game_rule: GameRule, reveal: Optional[Tuple[int, int]]) -> Tuple[CandidateTracker, Optional[Tuple[int, float]]]:
+        return self.__position(game_rule, reveal, ())
+
+    def __position(self, game_rule: GameRule, reveal: Optional[Tuple[int, int]],
+                   path: Tuple[Tuple[int, int, int], ...]) -> Tuple[CandidateTracker, Optional[Tuple[int, float]]]:
+        """ :return: the tracker of the position and its best guess stats when they were searched already, built from the
+        longest kept prefix of the path """
+        key: PositionKey = (game_rule.get_max_code_peg(), game_rule.allow_blank(), reveal, path)
+        entry = self.__positions.get(key)
+        if entry is not None:
+            self.__positions.move_to_end(key)
+            return entry
+        if path:
+            tracker = self.__position(game_rule, reveal, path[:-1])[0].copy()
+            tracker.add_feedback_index(*path[-1])
+        else:
+            tracker = CandidateTracker(game_rule)
+            if reveal is not None:
+                tracker.reveal_peg(reveal[0], PEG_ORDER[reveal[1]])
+        entry = self.__positions[key] = (tracker, None)
+        if len(self.__positions) > self.__max_positions:
+            self.__positions.popitem(last=False)
+        return entry
+
+    def __search_best(self, game_rule: GameRule, reveal: Optional[Tuple[int, int]], path: Tuple[Tuple[int, int, int], ...],
+                      tracker: CandidateTracker) -> Tuple[int, float]:
+        """ find the best worst case and the best entropy among the possible codes, sampled down to SUGGESTION_BUDGET scored pairs
+        like the hints do, and keep them with the position """
+        candidates = tracker.get_candidates()
+        pool = candidates
+        pool_size = max(1, SUGGESTION_BUDGET // max(1, len(candidates)))
+        if len(candidates) > pool_size:
+            pool = random.Random(tracker.get_fingerprint()).sample(candidates, pool_size)
+        best_worst_case, best_entropy = len(candidates), 0.0
+        for guess in pool:
+            sizes = tracker.get_partition_sizes(guess)
+            best_worst_case = min(best_worst_case, max(size for feedback, size in sizes))
+            best_entropy = max(best_entropy, get_entropy(sizes))
+        best = (best_worst_case, best_entropy)
+        key: PositionKey = (game_rule.get_max_code_peg(), game_rule.allow_blank(), reveal, path)
+        self.__positions[key] = (tracker, best)
+        return best
+
+
+# analyzer of a worker process, it lives across tasks so the positions kept by one task serve the next ones
+_worker_analyzer: Optional[GuessAnalyzer] = None
+
+
+def analyse_games(encoded_snapshots: List[bytes]) -> List[GuessQuality]:
+    """ rate every guess of a chunk of games, this is the unit of work handed to the pool workers """
+    global _worker_analyzer
+    if _worker_analyzer is None:
+        _worker_analyzer = GuessAnalyzer()
+    qualities = []
+    for encoded in encoded_snapshots:
+        qualities.extend(_worker_analyzer.analyse_game(GameSnapshot.decode(encoded)))
+    return qualities
+
+
+def stream_analysis(paths: List[str], workers: Optional[int] = None, games_per_task: int = 32,
+                    tasks_in_flight: int = 8) -> Iterator[GuessQuality]:
+    """ rate every guess of the result files over a pool of workers. Games are read and handed out a chunk at a time and the
+    ratings come back in the order of the files, with at most tasks_in_flight chunks in memory at once """
+    games = (snapshot.encode() for path in paths for snapshot, latencies in ResultLog.read(path))
+    pending: Deque[Future] = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            chunk = list(itertools.islice(games, games_per_task))
+            if chunk:
+                pending.append(executor.submit(analyse_games, chunk))
+            if pending and (len(pending) >= tasks_in_flight or not chunk):
+                yield from pending.popleft().result()
+            if not chunk and not pending:
+                return
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Rate every guess of recorded games against the best guess available.')
+    parser.add_argument('results', nargs='+', help='result files written by mastermind.py --record or server.py --results')
+    parser.add_argument('--workers', type=int, help='worker processes, all cores by default')
+    parser.add_argument('--games-per-task', type=int, default=32)
+    parser.add_argument('--out', help='write the ratings as JSON lines to this file instead of the standard output')
+    args = parser.parse_args()
+    started = time.perf_counter()
+    out_file = open(args.out, 'w') if args.out else sys.stdout
+    guess_count, worst_case_gaps = 0, 0
+    try:
+        for quality in stream_analysis(args.results, args.workers, args.games_per_task):
+            out_file.write(json.dumps(quality.to_dict()) + '\n')
+            guess_count += 1
+            worst_case_gaps += quality.get_worst_case_gap()
+    finally:
+        if args.out:
+            out_file.close()
+    print('{} guesses rated in {:.1f} s, {:.1f} codes left over the best guess on average'.format(
+        guess_count, time.perf_counter() - started, worst_case_gaps / max(1, guess_count)), file=sys.stderr)
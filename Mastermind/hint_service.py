@@ -0,0 +1,153 @@
+import asyncio
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Tuple
+
+from hints import CandidateTracker
+from memory import estimate_entries_size
+from models import GameRule
+from scoring import PEG_ORDER
+
+# hints kept in memory, the least recently asked ones are evicted first
+HINT_CACHE_ENTRIES = 10000
+
+# seconds a hint stays cached, so positions nobody reaches any more leave the cache even while it is not full
+HINT_TTL_SECONDS = 600.0
+
+# a position is keyed by the code shape, the revealed (position, value) and its sorted (guess, black, white) steps
+PositionKey = Tuple[int, bool, Optional[Tuple[int, int]], Tuple[Tuple[int, int, int], ...]]
+
+
+def get_position_key(game_rule: GameRule, reveal: Optional[Tuple[int, int]],
+                     steps: Iterable[Tuple[int, int, int]]) -> PositionKey:
+    """ :return: the canonical key of a position. The codes still possible do not depend on the order of the guesses nor on a
+    guess played twice, so histories that only differ by those are the same position """
+    return game_rule.get_max_code_peg(), game_rule.allow_blank(), reveal, tuple(sorted(set(steps)))
+
+
+class Hint:
+    """ Hint class represents the answer to a hint request: the suggested guess of a position, how many codes are still possible
+    there and how long it took to compute """
+
+    def __init__(self, guess: int, candidate_count: int, compute_seconds: float) -> None:
+        super().__init__()
+        self.__guess: int = guess
+        self.__candidate_count: int = candidate_count
+        self.__compute_seconds: float = compute_seconds
+
+    def get_guess(self) -> int:
+        """ :return: the code space index of the suggested guess """
+        return self.__guess
+
+    def get_candidate_count(self) -> int:
+        return self.__candidate_count
+
+    def get_compute_seconds(self) -> float:
+        return self.__compute_seconds
+
+
+def compute_hint(game_rule: GameRule, position: PositionKey) -> Hint:
+    """ :return: the hint of a position, replayed from the start on a fresh tracker """
+    started = time.perf_counter()
+    max_code_peg, allow_blank, reveal, steps = position
+    tracker = CandidateTracker(game_rule)
+    if reveal is not None:
+        tracker.reveal_peg(reveal[0], PEG_ORDER[reveal[1]])
+    for guess, black, white in steps:
+        tracker.add_feedback_index(guess, black, white)
+    guess = tracker.suggest_index()
+    return Hint(guess, tracker.get_candidate_count(), time.perf_counter() - started)
+
+
+class HintService:
+    """ HintService class answers the hint requests of the server. Requests for the same position share one computation: the
+    first one starts it and the ones arriving before it ends wait for it, and the hint is then cached in a bounded LRU with a
+    time to live. Hints are computed off the event loop, one at a time, so the partition cache is shared by all of them """
+
+    def __init__(self, max_entries: int = HINT_CACHE_ENTRIES, ttl_seconds: float = HINT_TTL_SECONDS,
+                 executor: Optional[Executor] = None) -> None:
+        super().__init__()
+        self.__max_entries: int = max_entries
+        self.__ttl_seconds: float = ttl_seconds
+        self.__executor: Executor = executor if executor is not None else ThreadPoolExecutor(1, thread_name_prefix='hints')
+        # (expiry time, hint) of every cached position, the least recently used first
+        self.__entries: "OrderedDict[PositionKey, Tuple[float, Hint]]" = OrderedDict()
+        self.__in_flight: Dict[PositionKey, "asyncio.Task[Hint]"] = {}
+        self.__requests: int = 0
+        self.__hits: int = 0
+        self.__coalesced: int = 0
+        self.__computed: int = 0
+        self.__expired: int = 0
+        self.__evictions: int = 0
+        self.__compute_seconds: float = 0.0
+        self.__saved_seconds: float = 0.0
+
+    async def get_hint(self, game_rule: GameRule, reveal: Optional[Tuple[int, int]],
+                       steps: Iterable[Tuple[int, int, int]]) -> Hint:
+        """ :return: the hint of the position reached by the steps, from the cache, from the computation of the same position
+        already running, or computed now """
+        key = get_position_key(game_rule, reveal, steps)
+        self.__requests += 1
+        entry = self.__entries.get(key)
+        if entry is not None:
+            expiry, hint = entry
+            if expiry > time.monotonic():
+                self.__entries.move_to_end(key)
+                self.__hits += 1
+                self.__saved_seconds += hint.get_compute_seconds()
+                return hint
+            del self.__entries[key]
+            self.__expired += 1
+        task = self.__in_flight.get(key)
+        if task is not None:
+            self.__coalesced += 1
+            hint = await asyncio.shield(task)
+            self.__saved_seconds += hint.get_compute_seconds()
+            return hint
+        # the computation is a task of its own, a requester that goes away does not cancel it for the others
+        task = self.__in_flight[key] = asyncio.ensure_future(self.__compute(game_rule, key))
+        return await asyncio.shield(task)
+
+    async def __compute(self, game_rule: GameRule, key: PositionKey) -> Hint:
+        try:
+            hint = await asyncio.get_running_loop().run_in_executor(self.__executor, compute_hint, game_rule, key)
+        finally:
+            del self.__in_flight[key]
+        self.__computed += 1
+        self.__compute_seconds += hint.get_compute_seconds()
+        self.__entries[key] = (time.monotonic() + self.__ttl_seconds, hint)
+        self.__evict_over_limit(self.__max_entries)
+        return hint
+
+    def preload(self, game_rule: GameRule, reveal: Optional[Tuple[int, int]], hint: Hint) -> None:
+        """ cache the hint of an opening position computed ahead of time, it does not expire but is evicted like any other """
+        self.__entries[get_position_key(game_rule, reveal, ())] = (float('inf'), hint)
+        self.__evict_over_limit(self.__max_entries)
+
+    def trim(self, max_entries: int) -> int:
+        """ drop the least recently used hints down to a number of hints, the cache fills up to its own limit again afterwards
+        :return: the number of hints dropped """
+        return self.__evict_over_limit(max_entries)
+
+    def __evict_over_limit(self, max_entries: int) -> int:
+        evicted = max(0, len(self.__entries) - max_entries)
+        for _ in range(evicted):
+            self.__entries.popitem(last=False)
+        self.__evictions += evicted
+        return evicted
+
+    def get_memory_size(self) -> int:
+        """ :return: an estimate of the bytes of the cached hints """
+        return estimate_entries_size(self.__entries)
+
+    def get_stats(self) -> Dict[str, float]:
+        """ :return: the request counters, the share of requests answered without a computation of their own, the time spent
+        computing hints and the time those requests would have cost """
+        return {'requests': self.__requests, 'hits': self.__hits, 'coalesced': self.__coalesced, 'computed': self.__computed,
+                'expired': self.__expired, 'evictions': self.__evictions, 'entries': len(self.__entries),
+                'hit_rate': round((self.__hits + self.__coalesced) / max(1, self.__requests), 4),
+                'compute_s': round(self.__compute_seconds, 3), 'saved_s': round(self.__saved_seconds, 3)}
+
+    def close(self) -> None:
+        self.__executor.shutdown(wait=False, cancel_futures=True)
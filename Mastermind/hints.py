@@ -0,0 +1,164 @@
+import copy
+import math
+import random
+from typing import Dict, List, Optional, Tuple
+
+import messages
+from codespace import CodeSpace
+from models import AttemptFeedback, Code, GameRule, Peg
+from partition_cache import DEFAULT_PARTITION_CACHE, PartitionCache, PartitionSizes
+from scoring import PEG_INDEX, CodeValues, decode_code, encode_code
+from scoring_backends import ScoringBackend, get_backend
+from utils import MasterMindException
+
+Partition = Dict[Tuple[int, int], List[int]]
+
+# upper bound of scored (guess, candidate) pairs when looking for a suggested guess
+SUGGESTION_BUDGET = 60000
+
+# codes no longer possible that are also tried when looking for the most informative guess
+INFORMATIVE_EXTRA_GUESSES = 200
+
+
+def get_entropy(sizes: PartitionSizes) -> float:
+    """ :return: the information in bits given by a guess that splits the candidates into those partition sizes """
+    total = sum(size for feedback, size in sizes)
+    return sum(size / total * math.log2(total / size) for feedback, size in sizes)
+
+
+class CandidateTracker:
+    """ CandidateTracker class keeps the codes that are still consistent with the history of one breaker. Every feedback only filters
+    the current candidates, partition sizes are shared with other trackers through a PartitionCache, and partitions computed for a
+    suggestion are reused when the breaker plays the suggested guess """
+
+    def __init__(self, game_rule: GameRule, partition_cache: PartitionCache = DEFAULT_PARTITION_CACHE) -> None:
+        super().__init__()
+        self.__code_space: CodeSpace = CodeSpace.of(game_rule)
+        self.__partition_cache: PartitionCache = partition_cache
+        self.__scoring: ScoringBackend = get_backend(game_rule)
+        self.__fingerprint: Optional[bytes] = None
+        self.__candidates: List[int] = list(range(self.__code_space.size()))
+        self.__candidate_values: List[CodeValues] = list(self.__code_space.get_all_values())
+        self.__candidate_counts: List[CodeValues] = list(self.__code_space.get_all_counts())
+        # partitions of the current candidates keyed by guess index, dropped whenever the candidates change
+        self.__partitions: Dict[int, Partition] = {}
+
+    def copy(self) -> "CandidateTracker":
+        """ :return: a tracker holding the same candidates that filters on its own from now on. Filtering replaces the candidate
+        lists instead of changing them, so the copy shares them until then """
+        return copy.copy(self)
+
+    def reveal_peg(self, position: int, peg: Peg) -> None:
+        """ keep only the candidates holding the revealed peg at the revealed position
+        :param: position: 0-based position of the revealed peg, peg: the revealed Peg """
+        value = PEG_INDEX[peg]
+        self.__keep([index for index, values in zip(self.__candidates, self.__candidate_values) if values[position] == value])
+
+    def add_feedback(self, guess: Code, feedback: AttemptFeedback) -> None:
+        """ keep only the candidates that would have given the same feedback to the guess
+        :param: guess: the guessed code, feedback: the feedback the breaker received """
+        self.add_feedback_index(self.__code_space.encode_values(encode_code(guess)), feedback.get_black_count(), feedback.get_white_count())
+
+    def add_feedback_index(self, guess_index: int, black: int, white: int) -> None:
+        """ same as add_feedback, with the guess given by its index in the code space and the feedback by its counts """
+        partition = self.__partitions.get(guess_index)
+        if partition is None:
+            partition = self.__partition(guess_index)
+        self.__keep(partition.get((black, white), []))
+
+    def get_candidate_count(self) -> int:
+        return len(self.__candidates)
+
+    def get_candidates(self) -> List[int]:
+        """ :return: the code space indexes of the codes still possible """
+        return self.__candidates
+
+    def get_code_space(self) -> CodeSpace:
+        return self.__code_space
+
+    def suggest_guess(self, rng: Optional[random.Random] = None) -> Code:
+        """ pick the guess that leaves the smallest worst-case number of candidates, among the candidates themselves and
+        sampled down to SUGGESTION_BUDGET scored pairs
+        :param: rng: random stream used for sampling the guesses to try, by default it is seeded from the candidates so the
+        same position always gets the same suggestion
+        :return: the suggested guess """
+        return decode_code(self.__code_space.decode_index(self.suggest_index(rng)))
+
+    def suggest_index(self, rng: Optional[random.Random] = None) -> int:
+        """ same as suggest_guess, but return the code space index of the suggested guess """
+        candidate_count = len(self.__candidates)
+        if candidate_count <= 2:
+            return self.__get_guess_pool(rng)[0]
+        best_index, best_worst_case = None, candidate_count + 1
+        for guess_index in self.__get_guess_pool(rng):
+            worst_case = max(size for feedback, size in self.get_partition_sizes(guess_index))
+            if worst_case < best_worst_case:
+                best_index, best_worst_case = guess_index, worst_case
+        return best_index
+
+    def suggest_informative_index(self, rng: Optional[random.Random] = None) -> int:
+        """ same as suggest_index, but pick the guess whose feedback is expected to tell the most, the one of highest entropy. When
+        few codes are left the budget also tries codes that are no longer possible, which can split the rest better than any
+        of them, a possible code still wins a tie as it may break the code """
+        candidate_count = len(self.__candidates)
+        if candidate_count <= 2:
+            return self.__get_guess_pool(rng)[0]
+        pool = self.__get_guess_pool(rng)
+        extra_count = min(INFORMATIVE_EXTRA_GUESSES, SUGGESTION_BUDGET // candidate_count - len(pool))
+        if extra_count > 0:
+            pool = pool + (rng or random.Random(self.get_fingerprint())).sample(range(self.__code_space.size()), extra_count)
+        best_index, best_entropy = None, -1.0
+        for guess_index in pool:
+            entropy = get_entropy(self.get_partition_sizes(guess_index))
+            if entropy > best_entropy + 1e-9:
+                best_index, best_entropy = guess_index, entropy
+        return best_index
+
+    def __get_guess_pool(self, rng: Optional[random.Random]) -> List[int]:
+        """ :return: the candidates to try as the suggested guess, sampled down to SUGGESTION_BUDGET scored pairs """
+        candidate_count = len(self.__candidates)
+        if candidate_count == 0:
+            raise MasterMindException(messages.HINT_NO_CANDIDATE)
+        pool_size = max(1, SUGGESTION_BUDGET // candidate_count)
+        if candidate_count > pool_size:
+            return (rng or random.Random(self.get_fingerprint())).sample(self.__candidates, pool_size)
+        return self.__candidates
+
+    def get_fingerprint(self) -> bytes:
+        """ :return: the fingerprint of the current candidates, computed once per candidate set """
+        if self.__fingerprint is None:
+            self.__fingerprint = PartitionCache.fingerprint(self.__candidates, self.__code_space.get_max_code_peg(),
+                                                            self.__code_space.allow_blank())
+        return self.__fingerprint
+
+    def get_partition_sizes(self, guess_index: int) -> PartitionSizes:
+        """ :return: how many current candidates give each feedback to the guess, from the partition cache when the same
+        candidates were partitioned by that guess before """
+        fingerprint = self.get_fingerprint()
+        sizes = self.__partition_cache.get(fingerprint, guess_index)
+        if sizes is None:
+            partition = self.__partitions[guess_index] = self.__partition(guess_index)
+            sizes = tuple(sorted((feedback, len(indexes)) for feedback, indexes in partition.items()))
+            self.__partition_cache.put(fingerprint, guess_index, sizes)
+        return sizes
+
+    def __partition(self, guess_index: int) -> Partition:
+        """ group the current candidates by the feedback they give to the guess """
+        partition: Partition = {}
+        guess_values = self.__code_space.decode_index(guess_index)
+        for index, feedback in zip(self.__candidates, self.__scoring.score_batch(guess_values, self.__candidate_values, self.__candidate_counts)):
+            indexes = partition.get(feedback)
+            if indexes is None:
+                partition[feedback] = [index]
+            else:
+                indexes.append(index)
+        return partition
+
+    def __keep(self, candidates: List[int]) -> None:
+        all_values = self.__code_space.get_all_values()
+        all_counts = self.__code_space.get_all_counts()
+        self.__candidates = candidates
+        self.__candidate_values = [all_values[index] for index in candidates]
+        self.__candidate_counts = [all_counts[index] for index in candidates]
+        self.__partitions = {}
+        self.__fingerprint = None
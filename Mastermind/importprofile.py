@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+from typing import List, Tuple
+
+# cold start budget of the interactive entry point, scripted games launch it as short-lived processes at high rates
+COLD_START_BUDGET_MS = 50.0
+
+# subsystems that a plain interactive launch must not load
+OPTIONAL_SUBSYSTEMS = ['codespace', 'hints', 'multisecret', 'partition_cache', 'scoring', 'snapshot', 'strategies', 'server',
+                       'broadcast', 'race', 'tournament', 'openings', 'loadtest']
+
+# one imported module as (name, self milliseconds, cumulative milliseconds, nesting depth)
+ImportCost = Tuple[str, float, float, int]
+
+
+def profile_imports(module: str = 'mastermind') -> List[ImportCost]:
+    """ import the module in a fresh interpreter with -X importtime, so the cost is the one of a cold start
+    :param: module: name of the module to import
+    :return: the cost of every module imported on the way, in import order """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module], cwd=directory, capture_output=True,
+                            text=True, check=True)
+    costs = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        costs.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000, (len(name) - len(name.lstrip()) - 1) // 2))
+    return costs
+
+
+def print_import_profile(costs: List[ImportCost], module: str = 'mastermind', top: int = 25) -> None:
+    """ print the most expensive imports, the total against the cold start budget and any optional subsystem that was loaded """
+    print('{:<30} {:>10} {:>12}'.format('module', 'self ms', 'cumulative ms'))
+    for name, self_ms, cumulative_ms, depth in sorted(costs, key=lambda cost: -cost[2])[:top]:
+        print('{:<30} {:>10.2f} {:>12.2f}'.format(name, self_ms, cumulative_ms))
+    total_ms = next((cumulative_ms for name, self_ms, cumulative_ms, depth in costs if name == module and depth == 0), 0.0)
+    print('import {} took {:.2f} ms of the {:.0f} ms cold start budget'.format(module, total_ms, COLD_START_BUDGET_MS))
+    loaded = [name for name, self_ms, cumulative_ms, depth in costs if name in OPTIONAL_SUBSYSTEMS]
+    if loaded:
+        print('optional subsystems loaded at startup: ' + ', '.join(loaded))
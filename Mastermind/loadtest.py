@@ -0,0 +1,320 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from codespace import CodeSpace
+from constants import MASTERMIND_GAMERULE
+from models import Code, GameRule, Peg
+from scoring import decode_code, encode_code
+from strategies import BREAKER_STRATEGIES, BreakerStrategy
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server.py')
+SUPERVISOR_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'supervisor.py')
+
+# lines a flooding client writes at once before waiting for the server to take them
+FLOOD_BATCH = 100
+
+
+class LoadClient:
+    """ LoadClient class represents one simulated player that plays complete Mastermind44 races against the server """
+
+    def __init__(self, name: str, strategy_name: str, think_time: float, rng: random.Random, latencies: List[float],
+                 hint_rate: float = 0.0) -> None:
+        super().__init__()
+        self.__name: str = name
+        self.__strategy_name: str = strategy_name
+        self.__think_time: float = think_time
+        # share of the turns the client plays the hint of the server instead of the guess of its strategy
+        self.__hint_rate: float = hint_rate
+        self.__rng: random.Random = rng
+        self.__latencies: List[float] = latencies
+        self.__reader: Optional[asyncio.StreamReader] = None
+        self.__writer: Optional[asyncio.StreamWriter] = None
+
+    async def connect(self, host: str, port: int) -> None:
+        self.__reader, self.__writer = await asyncio.open_connection(host, port)
+
+    async def close(self) -> None:
+        self.__send('QUIT')
+        self.__writer.close()
+        await self.__writer.wait_closed()
+
+    def __send(self, line: str) -> None:
+        self.__writer.write((line + '\n').encode())
+
+    async def __read(self) -> Tuple[str, List[str]]:
+        line = await self.__reader.readline()
+        if not line:
+            raise ConnectionError('server closed the connection')
+        command, *arguments = line.decode().split()
+        return command, arguments
+
+    async def play_game(self, room_id: str) -> None:
+        """ join the room, wait for the race to start and guess until the race is over """
+        game_rule = MASTERMIND_GAMERULE
+        code_space = CodeSpace.of(game_rule)
+        strategy: BreakerStrategy = BREAKER_STRATEGIES[self.__strategy_name](game_rule, self.__rng)
+        self.__send('JOIN {} {}'.format(room_id, self.__name))
+        command, arguments = await self.__read()
+        while command != 'REVEAL':
+            command, arguments = await self.__read()
+        strategy.reveal_peg(int(arguments[0]) - 1, Peg.get_peg_by_value(arguments[1]))
+        game_over, out_of_attempts, pending = False, False, 0
+        while not game_over:
+            if not out_of_attempts:
+                if self.__think_time > 0:
+                    await asyncio.sleep(self.__rng.expovariate(1 / self.__think_time))
+                guess = None
+                if self.__hint_rate > 0 and self.__rng.random() < self.__hint_rate:
+                    guess, game_over = await self.__ask_hint(game_rule)
+                    if game_over:
+                        break
+                if guess is None:
+                    guess = strategy.next_guess()
+                self.__send('GUESS ' + ''.join(peg.value for peg in decode_code(code_space.decode_index(guess)).get_pegs()))
+                sent = time.perf_counter()
+                pending += 1
+            while True:
+                command, arguments = await self.__read()
+                if command in ('FEEDBACK', 'ERROR'):
+                    pending -= 1
+                if command == 'ERROR' and not out_of_attempts:
+                    # the guess was refused, it is played again after thinking
+                    break
+                if command == 'FEEDBACK':
+                    self.__latencies.append(time.perf_counter() - sent)
+                    attempt, black, white = map(int, arguments)
+                    if black == game_rule.get_max_code_peg() or attempt == game_rule.get_max_attempts():
+                        out_of_attempts = True
+                    else:
+                        strategy.observe(guess, (black, white))
+                        break
+                elif command == 'GAME_OVER':
+                    game_over = True
+                if game_over and pending == 0:
+                    break
+
+    async def __ask_hint(self, game_rule: GameRule) -> Tuple[Optional[int], bool]:
+        """ :return: the code space index of the guess the server suggests, None when it has none, and whether the race ended
+        while the client waited for it """
+        self.__send('HINT')
+        game_over = False
+        command, arguments = await self.__read()
+        while command not in ('HINT', 'ERROR'):
+            game_over = game_over or command == 'GAME_OVER'
+            command, arguments = await self.__read()
+        if command == 'ERROR':
+            return None, game_over
+        return CodeSpace.of(game_rule).encode_values(encode_code(Code.parse(arguments[0], game_rule))), game_over
+
+    async def read_stats(self) -> Dict[str, float]:
+        """ :return: the hint service counters of the server """
+        self.__send('STATS')
+        command, arguments = await self.__read()
+        return {name: float(value) for name, value in (argument.split('=') for argument in arguments)}
+
+
+class FloodClient:
+    """ FloodClient class represents a hostile client that joins a room and sends guesses and hint requests as fast as the server
+    takes them, reading its replies only to throw them away """
+
+    def __init__(self, name: str, rng: random.Random) -> None:
+        super().__init__()
+        self.__name: str = name
+        self.__rng: random.Random = rng
+
+    async def flood(self, host: str, port: int, room_id: str, stopped: asyncio.Event) -> int:
+        """ flood the server, connecting again every time it disconnects the client
+        :return: the lines sent until stopped """
+        sent = 0
+        while not stopped.is_set():
+            sent += await self.__flood_connection(host, port, room_id, stopped)
+        return sent
+
+    async def __flood_connection(self, host: str, port: int, room_id: str, stopped: asyncio.Event) -> int:
+        code_space = CodeSpace.of(MASTERMIND_GAMERULE)
+        reader, writer = await asyncio.open_connection(host, port)
+        discarding = asyncio.ensure_future(self.__discard(reader))
+        writer.write('JOIN {} {}\n'.format(room_id, self.__name).encode())
+        sent = 0
+        try:
+            while not stopped.is_set() and not discarding.done():
+                guesses = [''.join(peg.value for peg in decode_code(code_space.decode_index(self.__rng.randrange(code_space.size()))).get_pegs())
+                           for _ in range(FLOOD_BATCH // 2)]
+                writer.write(''.join('GUESS {}\nHINT\n'.format(guess) for guess in guesses).encode())
+                await writer.drain()
+                sent += FLOOD_BATCH
+        except ConnectionError:
+            pass
+        finally:
+            discarding.cancel()
+            writer.close()
+        return sent
+
+    @staticmethod
+    async def __discard(reader: asyncio.StreamReader) -> None:
+        while await reader.read(1 << 16):
+            pass
+
+
+class LoadTest:
+    """ LoadTest class starts N simulated clients that each play complete Mastermind44 races against the server, and measures
+    turn latency, throughput and server memory per session """
+
+    def __init__(self, client_count: int, games_per_client: int, think_time: float, strategy_name: str, seed: int = 0,
+                 hint_rate: float = 0.0, flooder_count: int = 0) -> None:
+        super().__init__()
+        players_per_room = MASTERMIND_GAMERULE.get_max_breakers()
+        self._client_count: int = client_count - client_count % players_per_room
+        self._games_per_client: int = games_per_client
+        self._think_time: float = think_time
+        self._strategy_name: str = strategy_name
+        self._seed: int = seed
+        self._hint_rate: float = hint_rate
+        self._flooder_count: int = flooder_count - flooder_count % players_per_room
+
+    async def run(self, host: str, port: int, server_pid: Optional[int] = None) -> Dict[str, object]:
+        """ play every game, sampling the server memory while the clients are connected
+        :return: the report of the run """
+        latencies: List[float] = []
+        clients = [LoadClient('p{}'.format(i), self._strategy_name, self._think_time, random.Random('{}/{}'.format(self._seed, i)),
+                              latencies, self._hint_rate) for i in range(self._client_count)]
+        baseline_rss = read_rss(server_pid)
+        await asyncio.gather(*(client.connect(host, port) for client in clients))
+        peak_rss = [read_rss(server_pid)]
+        sampler = asyncio.ensure_future(sample_rss(server_pid, peak_rss))
+        players_per_room = MASTERMIND_GAMERULE.get_max_breakers()
+        flooding_stopped = asyncio.Event()
+        flooding = asyncio.gather(*(FloodClient('f{}'.format(i), random.Random('{}/f{}'.format(self._seed, i))).flood(
+            host, port, 'flood-{}'.format(i // players_per_room), flooding_stopped) for i in range(self._flooder_count)))
+        started = time.perf_counter()
+        await asyncio.gather(*(self.__play(client, i // players_per_room) for i, client in enumerate(clients)))
+        elapsed = time.perf_counter() - started
+        flooding_stopped.set()
+        flood_lines = sum(await flooding)
+        sampler.cancel()
+        # behind the supervisor this only reads the hint service of the worker the first client is on
+        hint_stats = await clients[0].read_stats() if clients else None
+        await asyncio.gather(*(client.close() for client in clients))
+        latencies.sort()
+        memory_per_session = None
+        if baseline_rss is not None and peak_rss[0] is not None:
+            memory_per_session = (peak_rss[0] - baseline_rss) / self._client_count
+        return {
+            'version': read_version(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'clients': self._client_count,
+            'games_per_client': self._games_per_client,
+            'think_time_s': self._think_time,
+            'strategy': self._strategy_name,
+            'turns': len(latencies),
+            'elapsed_s': elapsed,
+            'throughput_turns_per_s': len(latencies) / elapsed,
+            'p50_ms': 1000 * percentile(latencies, 0.50),
+            'p99_ms': 1000 * percentile(latencies, 0.99),
+            'server_memory_per_session_bytes': memory_per_session,
+            'hint_rate': self._hint_rate,
+            'flooders': self._flooder_count,
+            'flood_lines': flood_lines,
+            'hint_stats': hint_stats,
+        }
+
+    async def __play(self, client: LoadClient, room_number: int) -> None:
+        for game in range(self._games_per_client):
+            await client.play_game('load-{}-{}'.format(game, room_number))
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def read_rss(pid: Optional[int]) -> Optional[int]:
+    """ :return: the resident memory of the process in bytes, None when it cannot be read on this platform """
+    if pid is None:
+        return None
+    try:
+        with open('/proc/{}/status'.format(pid)) as status_file:
+            for line in status_file:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+async def sample_rss(pid: Optional[int], peak_rss: List[Optional[int]]) -> None:
+    """ keep the highest resident memory of the server seen while the clients play in peak_rss[0] """
+    while peak_rss[0] is not None:
+        await asyncio.sleep(0.1)
+        rss = read_rss(pid)
+        if rss is not None:
+            peak_rss[0] = max(peak_rss[0], rss)
+
+
+def read_version() -> str:
+    """ :return: the git revision of the tree under test, so reports can be compared across versions """
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=os.path.dirname(SERVER_SCRIPT), capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def start_local_server(worker_count: Optional[int] = None) -> Tuple[subprocess.Popen, int]:
+    """ start server.py on a free local port in its own process, or supervisor.py with that many workers
+    :return: the server process and its port """
+    arguments = [SERVER_SCRIPT] if worker_count is None else [SUPERVISOR_SCRIPT, '--workers', str(worker_count)]
+    process = subprocess.Popen([sys.executable] + arguments + ['--port', '0'], stdout=subprocess.PIPE, text=True)
+    port = int(process.stdout.readline().strip().rsplit(':', 1)[1])
+    return process, port
+
+
+def print_comparison(report: Dict[str, object], previous: Dict[str, object]) -> None:
+    print('{:<34} {:>16} {:>16}'.format('metric', str(previous['version']), str(report['version'])))
+    for key in ('throughput_turns_per_s', 'p50_ms', 'p99_ms', 'server_memory_per_session_bytes'):
+        print('{:<34} {:>16} {:>16}'.format(key, str(previous.get(key)), str(report.get(key))))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Load test the Mastermind44 server with simulated clients.')
+    parser.add_argument('--clients', type=int, default=200, help='number of simulated clients, rounded down to full rooms')
+    parser.add_argument('--games', type=int, default=3, help='games played by every client')
+    parser.add_argument('--think-time', type=float, default=0.05, help='mean seconds a client thinks before a guess')
+    parser.add_argument('--strategy', default='random-consistent', choices=sorted(BREAKER_STRATEGIES.keys()))
+    parser.add_argument('--hint-rate', type=float, default=0.0, help='share of the turns played from a HINT of the server')
+    parser.add_argument('--flooders', type=int, default=0, help='hostile clients sending guesses and hints as fast as they can')
+    parser.add_argument('--connect', help='host:port of a running server instead of starting a local one')
+    parser.add_argument('--server-workers', type=int, help='start supervisor.py with this many workers instead of server.py')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--report', default='loadtest-report.json')
+    parser.add_argument('--compare', help='earlier report to compare this run against')
+    args = parser.parse_args()
+    server_process = None
+    if args.connect:
+        server_host, server_port = args.connect.rsplit(':', 1)
+        server_port, server_pid = int(server_port), None
+    else:
+        server_process, server_port = start_local_server(args.server_workers)
+        # the supervisor only routes connections, the sessions live in its workers
+        server_host, server_pid = '127.0.0.1', server_process.pid if args.server_workers is None else None
+    try:
+        load_test = LoadTest(args.clients, args.games, args.think_time, args.strategy, args.seed, args.hint_rate, args.flooders)
+        load_report = asyncio.run(load_test.run(server_host, server_port, server_pid))
+    finally:
+        if server_process is not None:
+            server_process.terminate()
+            server_process.wait()
+    print(json.dumps(load_report, indent=2))
+    with open(args.report, 'w') as report_file:
+        json.dump(load_report, report_file, indent=2)
+    if args.compare:
+        with open(args.compare) as previous_file:
+            print_comparison(load_report, json.load(previous_file))
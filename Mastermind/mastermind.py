@@ -1,28 +1,36 @@
-from typing import Optional
+import sys
+from typing import TYPE_CHECKING, List, Optional
 
 import messages
-from game import Game, Original1P, Original2P, Mastermind44
+from game import Game
+from rules import RuleRegistry, RuleVariant, get_rule_registry
 from utils import prompt, MasterMindException
 
+if TYPE_CHECKING:
+    from snapshot import ResultLog
+
 
 class Mastermind:
 
-    @staticmethod
-    def _select_game() -> Game:
-        selection: str = prompt()
-        selection_lower: str = selection.lower()
-        if selection_lower == 'a':
-            return Original2P()
-        elif selection_lower == 'b':
-            return Original1P()
-        elif selection_lower == 'c':
-            return Mastermind44()
-        raise MasterMindException(messages.INVALID_SELECTION)
+    def __init__(self, show_hints: bool = False, results: Optional["ResultLog"] = None, difficulty: Optional[str] = None,
+                 rules: Optional[RuleRegistry] = None) -> None:
+        super().__init__()
+        self._show_hints: bool = show_hints
+        self._results: Optional["ResultLog"] = results
+        self._difficulty: Optional[str] = difficulty
+        # the game variants of the menu, those of the rules file named by MASTERMIND_RULES by default
+        self._rules: RuleRegistry = rules if rules is not None else get_rule_registry()
+
+    def _select_game(self) -> Game:
+        variant: Optional[RuleVariant] = self._rules.get_by_key(prompt())
+        if variant is None:
+            raise MasterMindException(messages.INVALID_SELECTION)
+        return variant.create_game(self._show_hints, self._results, self._difficulty)
 
     def play(self) -> None:
         print(messages.WELCOME_MESSAGE.format(my_name="Tran Luong"))
         game: Optional[Game] = None
-        print(messages.GAME_OPTIONS)
+        print(self._rules.get_menu())
         while game is None:
             try:
                 game = self._select_game()
@@ -30,6 +38,38 @@ class Mastermind:
                 print(e)
 
 
+def parse_arguments(argv: List[str]):
+    """ parse the command line, argparse is only loaded when there is something to parse so a plain launch starts fast
+    :param: argv: the command line arguments without the program name
+    :return: the parsed options """
+    import argparse
+    parser = argparse.ArgumentParser(description='Play Mastermind in the terminal.')
+    parser.add_argument('--hints', action='store_true', help='show how many codes are still possible after each attempt')
+    parser.add_argument('--record', help='append every finished game to this result file, for analytics.py and guess_analysis.py')
+    parser.add_argument('--difficulty', choices=['easy', 'medium', 'hard'],
+                        help='draw the computer secrets from that band of the table built by difficulty.py')
+    parser.add_argument('--rules', help='read the game variants of the menu from this file instead of rules.json')
+    parser.add_argument('--warm-up', action='store_true',
+                        help='build the tables and opening hints of the rules marked warm_up while the menu is shown')
+    parser.add_argument('--profile-imports', action='store_true', help='list the import cost of every module at startup and exit')
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    m = Mastermind()
+    show_hints, results, difficulty, rules = False, None, None, None
+    if len(sys.argv) > 1:
+        args = parse_arguments(sys.argv[1:])
+        if args.profile_imports:
+            from importprofile import print_import_profile, profile_imports
+            print_import_profile(profile_imports())
+            sys.exit()
+        show_hints, difficulty = args.hints, args.difficulty
+        if args.record:
+            from snapshot import ResultLog
+            results = ResultLog(args.record)
+        rules = RuleRegistry.load(args.rules) if args.rules else get_rule_registry()
+        if args.warm_up:
+            from warmup import start_warm_up
+            start_warm_up([variant for variant in rules.get_variants() if variant.is_warm_up()])
+    m = Mastermind(show_hints, results, difficulty, rules)
     m.play()
@@ -0,0 +1,279 @@
+import argparse
+import mmap
+import os
+import random
+import sys
+import time
+import tracemalloc
+from array import array
+from collections import deque
+from typing import Callable, Dict, List, Mapping, Optional, Set, Tuple
+
+# walked objects are the containers and the objects of the classes of this directory, any other object is a leaf so a
+# report does not wander into the event loop or the interpreter through a stream writer or a lock
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+MIB = 1 << 20
+
+# entries of a cache measured to estimate the size of all of them
+MEMORY_SAMPLE_ENTRIES = 64
+
+# the budget is enforced at most once per this many seconds, reading the process memory is a system call
+MEMORY_CHECK_SECONDS = 1.0
+
+# share of its entries a cache keeps every time the process is over its memory budget
+CACHE_EVICTION_FRACTION = 0.5
+
+# frames kept per traced allocation when tracemalloc is started on demand
+TRACEMALLOC_FRAMES = 1
+
+CONTAINER_TYPES = (list, tuple, set, frozenset, dict, deque)
+LEAF_TYPES = (int, float, bool, str, bytes, bytearray, array, type(None))
+
+
+# whether every module seen so far is one of this directory
+_package_modules: Dict[str, bool] = {}
+
+
+def is_package_object(obj: object) -> bool:
+    module_name = type(obj).__module__
+    is_package = _package_modules.get(module_name)
+    if is_package is None:
+        module_file = getattr(sys.modules.get(module_name), '__file__', None)
+        is_package = _package_modules[module_name] = module_file is not None and os.path.dirname(os.path.abspath(module_file)) == PACKAGE_DIR
+    return is_package
+
+
+def get_deep_size(obj: object, seen: Optional[Set[int]] = None) -> int:
+    """ :param: obj: the object to measure, seen: ids of the objects already counted, they are skipped and obj adds its own
+    :return: the bytes held by the object, its containers and the objects of this package it references. A mapped file counts
+    its length, it may be read into memory at any time """
+    if seen is None:
+        seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        if isinstance(current, mmap.mmap):
+            total += len(current)
+            continue
+        total += sys.getsizeof(current)
+        if isinstance(current, LEAF_TYPES):
+            continue
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, CONTAINER_TYPES):
+            stack.extend(current)
+        elif isinstance(current, memoryview):
+            stack.append(current.obj)
+        elif is_package_object(current) and hasattr(current, '__dict__'):
+            stack.append(vars(current))
+    return total
+
+
+def estimate_entries_size(entries: Mapping, sample_size: int = MEMORY_SAMPLE_ENTRIES) -> int:
+    """ :return: the bytes of a large mapping, from the deep size of a sample of its entries """
+    if not entries:
+        return sys.getsizeof(entries)
+    keys = list(entries) if len(entries) <= sample_size else random.sample(list(entries), sample_size)
+    sampled = sum(get_deep_size(key) + get_deep_size(entries[key]) for key in keys)
+    return sys.getsizeof(entries) + sampled * len(entries) // len(keys)
+
+
+def read_rss() -> Optional[int]:
+    """ :return: the resident memory of this process in bytes, None when it cannot be read on this platform """
+    try:
+        with open('/proc/self/statm') as statm_file:
+            return int(statm_file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def get_process_memory() -> Optional[int]:
+    """ :return: the bytes allocated by Python when tracemalloc traces them, it goes down when memory is freed, otherwise
+    the resident memory of the process """
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0]
+    return read_rss()
+
+
+def get_table_roots() -> Dict[str, object]:
+    """ :return: the code shape tables loaded in this process by name: code spaces, scoring tables and difficulty tables """
+    from codespace import CodeSpace
+    from difficulty import DifficultyTable
+    from scoring_backends import get_backend_instances
+    roots: Dict[str, object] = {}
+    for (max_code_peg, allow_blank), code_space in CodeSpace.get_loaded().items():
+        roots['codespace:{}{}'.format(max_code_peg, '-blank' if allow_blank else '')] = code_space
+    for (name, max_code_peg, allow_blank), backend in get_backend_instances().items():
+        roots['scoring-{}:{}{}'.format(name, max_code_peg, '-blank' if allow_blank else '')] = backend
+    for (max_code_peg, allow_blank), table in DifficultyTable.get_loaded().items():
+        roots['difficulty:{}{}'.format(max_code_peg, '-blank' if allow_blank else '')] = table
+    return roots
+
+
+class MemoryBudget:
+    """ MemoryBudget class represents the limits of a process: the memory of the whole process, over which caches are evicted
+    and new sessions refused, and the memory of the caches, over which they are evicted down to it. None is no limit """
+
+    def __init__(self, max_bytes: Optional[int] = None, max_cache_bytes: Optional[int] = None) -> None:
+        super().__init__()
+        self.__max_bytes: Optional[int] = max_bytes
+        self.__max_cache_bytes: Optional[int] = max_cache_bytes
+
+    def get_max_bytes(self) -> Optional[int]:
+        return self.__max_bytes
+
+    def get_max_cache_bytes(self) -> Optional[int]:
+        return self.__max_cache_bytes
+
+
+class MemoryAccountant:
+    """ MemoryAccountant class reports the bytes held by every code shape table, every cache and every live session of a
+    process and enforces its MemoryBudget. Caches are objects with get_memory_size(), get_stats()['entries'] and
+    trim(max_entries) returning the number of entries evicted, sessions are read from a callback when they are measured. An
+    object reachable from several roots is only counted once, under the first root that reaches it """
+
+    def __init__(self, budget: Optional[MemoryBudget] = None,
+                 sessions: Optional[Callable[[], Dict[str, object]]] = None) -> None:
+        super().__init__()
+        from partition_cache import DEFAULT_PARTITION_CACHE
+        self.__budget: MemoryBudget = budget if budget is not None else MemoryBudget()
+        self.__sessions: Callable[[], Dict[str, object]] = sessions if sessions is not None else dict
+        self.__caches: Dict[str, object] = {'partition': DEFAULT_PARTITION_CACHE}
+        self.__next_check: float = 0.0
+        self.__refusing: bool = False
+        self.__evictions: int = 0
+        # highest resident memory read so far, and the bytes of the caches and sessions when it was read
+        self.__peak_rss: int = 0
+        self.__peak_accounted: int = 0
+        self.__last_snapshot: Optional[tracemalloc.Snapshot] = None
+
+    def add_cache(self, name: str, cache: object) -> None:
+        self.__caches[name] = cache
+
+    def is_refusing(self) -> bool:
+        """ :return: whether the last check found the process over its budget once the caches were evicted """
+        return self.__refusing
+
+    def report(self) -> Dict[str, Dict[str, int]]:
+        """ :return: the bytes of every table, cache and session by name, and the process memory and budget under 'process' """
+        tables = get_table_roots()
+        sessions = self.__sessions()
+        seen = {id(root) for roots in (tables, self.__caches, sessions) for root in roots.values()}
+        report: Dict[str, Dict[str, int]] = {
+            'tables': {name: self.__measure(root, seen) for name, root in tables.items()},
+            'caches': {name: cache.get_memory_size() for name, cache in self.__caches.items()},
+            'sessions': {name: self.__measure(root, seen) for name, root in sessions.items()},
+        }
+        report['process'] = {'memory': get_process_memory() or 0, 'budget': self.__budget.get_max_bytes() or 0,
+                             'cache_budget': self.__budget.get_max_cache_bytes() or 0, 'evictions': self.__evictions,
+                             'refusing': int(self.__refusing)}
+        return report
+
+    @staticmethod
+    def __measure(root: object, seen: Set[int]) -> int:
+        seen.discard(id(root))
+        return get_deep_size(root, seen)
+
+    def get_cache_bytes(self) -> int:
+        return sum(cache.get_memory_size() for cache in self.__caches.values())
+
+    def get_session_bytes(self, sample_size: int = MEMORY_SAMPLE_ENTRIES) -> int:
+        """ :return: an estimate of the bytes of the live sessions from the deep size of a sample of them, without the tables and
+        caches they reference, so checking the budget takes the same time however many sessions are live """
+        sessions = self.__sessions()
+        if not sessions:
+            return 0
+        names = list(sessions) if len(sessions) <= sample_size else random.sample(list(sessions), sample_size)
+        seen = {id(root) for roots in (get_table_roots(), self.__caches) for root in roots.values()}
+        sampled = sum(self.__measure(sessions[name], seen) for name in names)
+        return sampled * len(sessions) // len(names)
+
+    def __read_memory(self) -> Optional[int]:
+        """ :return: the memory of the process the budget is checked against. Traced memory goes down when memory is freed,
+        the resident memory does not as the freed memory is kept for later allocations, so the bytes of caches and sessions
+        freed since it last grew are taken off it """
+        if tracemalloc.is_tracing():
+            return tracemalloc.get_traced_memory()[0]
+        rss = read_rss()
+        if rss is None:
+            return None
+        accounted = self.get_cache_bytes() + self.get_session_bytes()
+        if rss > self.__peak_rss:
+            self.__peak_rss, self.__peak_accounted = rss, accounted
+        return rss - max(0, self.__peak_accounted - accounted)
+
+    def check(self) -> bool:
+        """ evict caches over the cache budget, and all of them while the process is over its budget, at most once per
+        MEMORY_CHECK_SECONDS
+        :return: whether new sessions are refused, the process is still over its budget once the caches were evicted """
+        now = time.monotonic()
+        if now < self.__next_check:
+            return self.__refusing
+        self.__next_check = now + MEMORY_CHECK_SECONDS
+        max_cache_bytes = self.__budget.get_max_cache_bytes()
+        if max_cache_bytes is not None:
+            cache_bytes = self.get_cache_bytes()
+            if cache_bytes > max_cache_bytes:
+                self.__evict(max_cache_bytes / cache_bytes)
+        max_bytes = self.__budget.get_max_bytes()
+        if max_bytes is not None:
+            process_bytes = self.__read_memory()
+            if process_bytes is not None and process_bytes > max_bytes and self.__evict(CACHE_EVICTION_FRACTION):
+                process_bytes = self.__read_memory()
+            self.__refusing = process_bytes is not None and process_bytes > max_bytes
+        return self.__refusing
+
+    def __evict(self, fraction: float) -> int:
+        """ trim every cache to a share of its entries, the limits the caches were made with are kept
+        :return: the number of entries evicted, an eviction that frees nothing is not counted """
+        evicted = sum(cache.trim(int(cache.get_stats()['entries'] * fraction)) for cache in self.__caches.values())
+        if evicted:
+            self.__evictions += 1
+        return evicted
+
+    def take_snapshot(self, limit: int = 10) -> List[Tuple[str, int, int, int]]:
+        """ take a tracemalloc snapshot, tracing starts with the first one so that one only sees what was allocated since
+        :return: the (source line, bytes, bytes since the previous snapshot, blocks) of the lines holding the most memory """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        if self.__last_snapshot is None:
+            lines = [(stat.traceback, stat.size, stat.size, stat.count) for stat in snapshot.statistics('lineno')]
+        else:
+            lines = [(stat.traceback, stat.size, stat.size_diff, stat.count)
+                     for stat in snapshot.compare_to(self.__last_snapshot, 'lineno')]
+        self.__last_snapshot = snapshot
+        return [('{}:{}'.format(os.path.basename(traceback[0].filename), traceback[0].lineno), size, size_diff, count)
+                for traceback, size, size_diff, count in lines[:limit]]
+
+
+def print_report(report: Dict[str, Dict[str, int]]) -> None:
+    for category in ('tables', 'caches', 'sessions'):
+        for name, size in sorted(report[category].items(), key=lambda item: -item[1]):
+            print('{:<10} {:<28} {:>14,}'.format(category, name, size))
+    print('{:<10} {:<28} {:>14,}'.format('process', 'memory', report['process']['memory']))
+
+
+if __name__ == "__main__":
+    from constants import GAMERULES_BY_NAME
+    from strategies import BREAKER_STRATEGIES
+    from verifier import verify_secrets
+    parser = argparse.ArgumentParser(description='Report the memory held by the tables and caches of games of a rule.')
+    parser.add_argument('--rule', default='original', choices=sorted(GAMERULES_BY_NAME.keys()))
+    parser.add_argument('--breaker', default='minimax', choices=sorted(BREAKER_STRATEGIES.keys()))
+    parser.add_argument('--games', type=int, default=50, help='games played by the breaker before the report')
+    parser.add_argument('--top', type=int, default=10, help='also list the source lines that allocated the most')
+    args = parser.parse_args()
+    accountant = MemoryAccountant()
+    if args.top:
+        accountant.take_snapshot(0)
+    verify_secrets(args.breaker, args.rule, None, 0, args.games, str(args.games))
+    print_report(accountant.report())
+    for where, size, size_diff, count in (accountant.take_snapshot(args.top) if args.top else []):
+        print('{:<40} {:>14,} {:>10,} blocks'.format(where, size, count))
@@ -1,11 +1,9 @@
 from abc import ABC, abstractmethod
 from typing import Optional
 
-GAME_OPTIONS = 'Select which game you want to play: \n' \
-               '   (A) Original Mastermind for 2 Players\n' \
-               '   (B) Original Mastermind for 1 Player\n' \
-               '   (C) Mastermind44 for 4 Players\n' \
-               '*Enter A, B, or C to continue*'
+GAME_OPTIONS_HEADER = 'Select which game you want to play: '
+GAME_OPTION = '   ({key}) {title}'
+GAME_OPTIONS_PROMPT = '*Enter {keys} to continue*'
 
 WELCOME_MESSAGE = 'Welcome to Mastermind!\n' \
                   'Developed by {my_name}\n' \
@@ -41,6 +39,13 @@ MASTERMIND_PLAYER_TURN = '{player_name}, Attempt #{current_round}: Enter {max_co
 MASTERMIND_START_GUESSING = 'Each player can now start to guess the code.'
 MASTERMIND_ATTEMPT_FEEDBACK = "Feedback on {who}, Attempt #{attempt}: "
 
+TEAM_CODE_MAKER_GUIDE = 'Welcome to Mastermind44 for a computer team! The computer will create the secret code and reveal four of ' \
+                        'the five positions to four computer players, who share what they see and everything they learn.'
+TEAM_PLAYER_NAME = 'Computer {player_number}'
+TEAM_REVEAL_PEG = '{player_name} sees position {position} colour {color}'
+TEAM_GUESS = '{player_name}, Attempt #{current_round}: {code}'
+TEAM_REMAINING = 'The team has {candidate_count} possible codes left.'
+
 INVALID_SELECTION = "Invalid selection."
 
 ORIGINAL_2P_CODE_MAKER_GUIDE = "Welcome {code_maker_name}, you need to create a code that consists of {max_code_length} pegs. " \
@@ -58,8 +63,84 @@ MASTERMIND_CODE_MAKER_GUIDE = 'Welcome to Masermind44! The computer will create
                               'revealing each position only the requested player should look at the ' \
                               'screen. (R)ed, b(L)ue, (G)reen, (Y)ellow, (W)hite, or (B)lack'
 
+MULTI_SECRET_COUNT_PROMPT = 'How many secret codes do you want to break at once?'
+MULTI_SECRET_CODE_MAKER_GUIDE = 'Welcome to Multi-secret Mastermind! The computer will create {secret_count} secret codes that consist of four pegs. ' \
+                                'Every guess is checked against all of them and the game is won when all codes are broken. ' \
+                                'Each peg can be of the colour (R)ed, B(L)ue, (G)reen, (Y)ellow, (W)hite, or (B)lack.'
+MULTI_SECRET_FEEDBACK = 'Code #{index}: {feedback}'
+MULTI_SECRET_BROKEN = 'Code #{index}: broken'
+MULTI_SECRET_PROGRESS = '{broken} of {secret_count} codes broken.'
+INVALID_SECRET_COUNT = 'The number of secret codes must be a positive whole number.'
+
+HINT_REQUEST = '?'
+HINT_GUIDE = 'Hints are on: enter ? instead of a guess to get a suggested next guess.'
+HINT_REMAINING = 'Hint: {candidate_count} possible codes remain.'
+HINT_SUGGESTION = 'Hint: try {code}'
+HINT_NO_CANDIDATE = 'No code matches the feedback received so far.'
+
+RULES_INVALID = 'Cannot read the game rules of {path}: {error}'
+UNKNOWN_GAME_TYPE = 'Unknown game {game} for rule {name}, choose one of: {games}.'
+WARM_UP_DONE = 'Warmed up rule {name} in {seconds:.2f}s: {codes} codes, {openings} opening hints.'
+
+DIFFICULTY_TABLE_MISSING = 'There is no difficulty table at {path} yet, build it with: python difficulty.py --rule {rule}'
+DIFFICULTY_TABLE_INVALID = '{path} is not a difficulty table.'
+UNKNOWN_DIFFICULTY_BAND = 'Unknown difficulty {band}, choose one of: {bands}.'
+DIFFICULTY_BAND_EMPTY = 'No secret falls in the requested difficulty band.'
+
 REENTER_CODE_VALUES_NOT_MATCH = 'Re-enter code value does not match'
 
+RACE_UNKNOWN_PLAYER = 'Player {player_name} is not part of this race.'
+RACE_NO_ATTEMPTS_LEFT = 'Player {player_name} has used all {attempt} attempts.'
+RACE_OVER = 'The race is over, the code was already broken.'
+RACE_ROOM_EXISTS = 'Room {room_id} already exists.'
+RACE_ROOM_NOT_FOUND = 'Room {room_id} does not exist.'
+RACE_ALREADY_WON = 'Player {player_name} already broke the code and finished in place {rank}.'
+
+SERVER_LISTENING = 'Mastermind server listening on {host}:{port}'
+SERVER_UNKNOWN_COMMAND = 'Unknown command {command}.'
+SERVER_NOT_IN_ROOM = 'Join a room before guessing.'
+SERVER_ALREADY_IN_ROOM = 'You already joined room {room_id}.'
+SERVER_ROOM_FULL = 'Room {room_id} is full.'
+SERVER_NAME_TOO_LONG = 'Room ids and player names are limited to {limit} bytes.'
+SERVER_NAME_TAKEN = 'Name {player_name} is already used in room {room_id}.'
+SERVER_RESUME_TOKEN_INVALID = 'The race of room {room_id} is running, {player_name} rejoins it with the token sent in START.'
+SERVER_RACE_NOT_STARTED = 'The race has not started yet, waiting for more players.'
+SERVER_ALREADY_WATCHING = 'You are already watching room {room_id}.'
+SERVER_MEMORY_FULL = 'The server is out of memory for new players, try again later.'
+SERVER_RATE_LIMITED = 'Too many commands, at most {rate:g} per second are taken from one player.'
+SERVER_ADDRESS_RATE_LIMITED = 'Too many commands from {address}, at most {rate:g} per second are taken from one address.'
+SERVER_OVERLOADED = 'The server is busy, {command} is refused for now, try again in a moment.'
+SERVER_HINT_PENDING = 'Your previous hint is still being computed, wait for it before asking again.'
+SERVER_FLOODING = 'Too many commands were refused in a row, closing the connection.'
+SERVER_LINE_TOO_LONG = 'Lines are limited to {limit} bytes, closing the connection.'
+SUPERVISOR_WORKERS = 'Serving with {count} worker processes.'
+SUPERVISOR_WORKER_EXITED = 'Server worker {index} exited with code {code}, starting a new one.'
+SUPERVISOR_DRAINING = 'Draining {count} server workers, waiting for their games to finish.'
+
+DISTRIBUTED_LISTENING = 'Work queue listening on {host}:{port}, start workers with {env}={key} python distributed.py --connect {host}:{port}'
+DISTRIBUTED_MISSING_KEY = 'Set {env} to the key printed by the coordinator.'
+DISTRIBUTED_TASK_FAILED = 'Task {task} failed on a worker:\n{error}'
+
+UNKNOWN_SCORING_BACKEND = 'Unknown scoring backend {name}, choose one of: {names}.'
+SCORING_BACKEND_UNAVAILABLE = 'The scoring backend {name} is not available for codes of {max_code_peg} pegs on this machine.'
+
+# lines of the line-based server protocol, one event per line
+PROTOCOL_JOINED = 'JOINED {room_id} {player_count}/{max_breakers}'
+PROTOCOL_START = 'START {room_id} {max_code_length} {max_attempts} {token}'
+PROTOCOL_REVEAL = 'REVEAL {position} {color}'
+PROTOCOL_FEEDBACK = 'FEEDBACK {attempt} {black} {white}'
+PROTOCOL_WINNER = 'WINNER {who} {attempt} {rank}'
+PROTOCOL_GAME_OVER = 'GAME_OVER {final_code}'
+PROTOCOL_GUESSED = 'GUESSED {who} {attempt} {code} {black} {white}'
+PROTOCOL_WATCHING = 'WATCHING {room_id} {player_count}/{max_breakers}'
+PROTOCOL_SKIPPED = 'SKIPPED {count}'
+PROTOCOL_HINT = 'HINT {code} {candidates}'
+PROTOCOL_STATS = 'STATS {stats}'
+PROTOCOL_MEMORY = 'MEMORY {sizes}'
+PROTOCOL_ALLOCATIONS = 'ALLOCATIONS {count}'
+PROTOCOL_ALLOCATION = 'ALLOCATION {where} {size} {size_diff} {blocks}'
+PROTOCOL_ERROR = 'ERROR {message}'
+
 
 class MessageBankInterface(ABC):
     """ MessageBankInterface interface class for defining some messages to be used across different game type """
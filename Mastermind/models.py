@@ -2,7 +2,7 @@ import copy
 import random
 from abc import abstractmethod, ABC
 from enum import Enum
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 import messages
 from messages import MessageBankInterface
@@ -95,11 +95,34 @@ class CodeBreaker:
 
 
 class AttemptFeedback:
-    """ AttemptFeedback class represents a feedback after evaluating a guess code and the final code """
+    """ AttemptFeedback class represents a feedback after evaluating a guess code and the final code, as its number of black and
+    white values. Only a few dozen feedbacks exist for a code length, so each one is created once by AttemptFeedback.of and shared,
+    with its text and win flag computed up front """
 
-    def __init__(self, feedback: List[FeedBackValue]) -> None:
+    __slots__ = ('__black', '__white', '__max_code_peg', '__text', '__is_win', '__hash')
+
+    __interned: Dict[Tuple[int, int, int], "AttemptFeedback"] = {}
+
+    def __init__(self, black: int, white: int, max_code_peg: int) -> None:
         super().__init__()
-        self.__feedback_values: List[FeedBackValue] = feedback
+        self.__black: int = black
+        self.__white: int = white
+        self.__max_code_peg: int = max_code_peg
+        feedback_values = [FeedBackValue.BLACK.value] * black + [FeedBackValue.WHITE.value] * white
+        self.__text: str = ' '.join(feedback_values) if feedback_values else "Nothing."
+        self.__is_win: bool = black == max_code_peg
+        self.__hash: int = hash((black, white, max_code_peg))
+
+    @staticmethod
+    def of(black: int, white: int, max_code_peg: int) -> "AttemptFeedback":
+        """ :param: black: number of correct pegs in correct position, white: number of correct pegs in wrong position,
+        max_code_peg: length of the scored codes
+        :return: the shared AttemptFeedback holding those values """
+        key = (black, white, max_code_peg)
+        feedback = AttemptFeedback.__interned.get(key)
+        if feedback is None:
+            feedback = AttemptFeedback.__interned.setdefault(key, AttemptFeedback(black, white, max_code_peg))
+        return feedback
 
     @staticmethod
     def __fill_in_black_feedback(current_feedback: List[FeedBackValue], guess_pegs: List[Peg], final_code_pegs: List[Peg]) -> (List[FeedBackValue or None], List[Peg]):
@@ -135,7 +158,19 @@ class AttemptFeedback:
 
     @staticmethod
     def evaluate(guess: Code, final_code: Code) -> "AttemptFeedback":
-        """ creation method to evaluate the guess code with the final code
+        """ creation method to evaluate the guess code with the final code, scored by the backend chosen for codes of that shape
+         :param: guess code and final code
+         :return the AttemptFeedback object corresponding to the guess """
+        from scoring import encode_code
+        from scoring_backends import get_backend_for_shape
+        guess_values, final_values = encode_code(guess), encode_code(final_code)
+        allow_blank = Peg.BLANK in guess.get_pegs() or Peg.BLANK in final_code.get_pegs()
+        black, white = get_backend_for_shape(len(final_values), allow_blank, False).score(guess_values, final_values)
+        return AttemptFeedback.of(black, white, len(final_values))
+
+    @staticmethod
+    def evaluate_reference(guess: Code, final_code: Code) -> "AttemptFeedback":
+        """ evaluate the guess code with the final code peg by peg, every scoring backend must agree with it
          :param: guess code and final code
          :return the AttemptFeedback object corresponding to the guess """
         guess_pegs = guess.get_pegs()
@@ -146,21 +181,43 @@ class AttemptFeedback:
         filled_black_feedback, remaining_final_pegs_checkable = AttemptFeedback.__fill_in_black_feedback(initial_feedback, guess_pegs, final_pegs)
         # check for white
         filled_white_feedback = AttemptFeedback.__fill_in_white_feedback(filled_black_feedback, guess_pegs, remaining_final_pegs_checkable)
-        # filter out the None value
-        final_feedback = list(filter(lambda peg: peg is not None, filled_white_feedback))
-        return AttemptFeedback(final_feedback)
+        return AttemptFeedback.of(filled_white_feedback.count(FeedBackValue.BLACK), filled_white_feedback.count(FeedBackValue.WHITE),
+                                  len(final_pegs))
+
+    def get_black_count(self) -> int:
+        return self.__black
+
+    def get_white_count(self) -> int:
+        return self.__white
+
+    def get_max_code_peg(self) -> int:
+        return self.__max_code_peg
+
+    def is_win(self) -> bool:
+        """ :return whether every peg of the code is black """
+        return self.__is_win
 
     def is_winning_state(self, required_correct_values: int) -> bool:
         """ :param: required_correct_values: number of black feedback value required to be considered sufficient to win
         check whether feedback returns all Black for each of the value corresponding to the required correct values
         :return whether it's sufficient to win """
-        return len(list(filter(lambda feedback_value: feedback_value == FeedBackValue.BLACK, self.__feedback_values))) == required_correct_values
+        return self.__black == required_correct_values
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, AttemptFeedback):
+            return NotImplemented
+        return self is other or (self.__black, self.__white, self.__max_code_peg) == (other.__black, other.__white, other.__max_code_peg)
+
+    def __hash__(self) -> int:
+        return self.__hash
+
+    def __reduce__(self):
+        # unpickled feedbacks are interned again
+        return AttemptFeedback.of, (self.__black, self.__white, self.__max_code_peg)
 
     def __str__(self) -> str:
         """ display feedback values """
-        if len(self.__feedback_values) == 0:
-            return "Nothing."
-        return ' '.join(list(map(lambda feedback: feedback.value, self.__feedback_values)))
+        return self.__text
 
 
 class CodeMaker(ABC):
@@ -217,22 +274,17 @@ class HumanCodeMaker(CodeMaker):
 
 class ComputerCodeMaker(CodeMaker):
 
-    def __init__(self) -> None:
+    def __init__(self, rng: Optional[random.Random] = None) -> None:
         super().__init__(None)
+        self._rng: random.Random = rng if rng is not None else random.Random()
 
     def make_new_final_code(self, game_rule: "GameRule") -> Code:
-        """ computer ganerates random final code
+        """ computer ganerates random final code, drawn uniformly from every code that follows the game rule
         :param: game_rule: to check whether the final code follow the game rule
         :return: the final code object"""
-        max_code_pegs: int = game_rule.get_max_code_peg()
-        code_pegs: List[Peg] = []
-        for i in range(max_code_pegs):
-            peg: Peg = Peg.generate_random_peg()
-            while (not game_rule.allow_blank() or Peg.BLANK in code_pegs) and peg == Peg.BLANK:
-                peg: Peg = Peg.generate_random_peg()
-            code_pegs.append(peg)
-        print(code_pegs)
-        self._final_code = Code(code_pegs)
+        # codespace depends on this module, import it on use
+        from codespace import CodeSpace
+        self._final_code = CodeSpace.of(game_rule).sample_codes(1, self._rng)[0]
         return self._final_code
 
 
@@ -0,0 +1,88 @@
+import random
+import sys
+import time
+from typing import List, Optional
+
+from codespace import CodeSpace
+from models import AttemptFeedback, Code, ComputerCodeMaker, GameRule
+from scoring import CodeValues, count_pegs, encode_code, score_batch
+
+
+class SecretBatch:
+    """ SecretBatch class represents the K final codes of a multi-secret game, every guess is scored against all of them at once """
+
+    def __init__(self, codes: List[Code]) -> None:
+        super().__init__()
+        self.__codes: List[Code] = codes
+        self.__values: List[CodeValues] = [encode_code(code) for code in codes]
+        self.__counts: List[CodeValues] = [count_pegs(values) for values in self.__values]
+        self.__broken: List[bool] = [False] * len(codes)
+
+    def evaluate(self, guess: Code) -> List[AttemptFeedback]:
+        """ score the guess against every final code and mark the codes it breaks
+        :param: guess: the guessed code
+        :return: the list of AttemptFeedback, one per final code in the batch order """
+        guess_values = encode_code(guess)
+        max_code_peg = len(guess_values)
+        feedback = []
+        for index, (black, white) in enumerate(score_batch(guess_values, self.__values, self.__counts)):
+            if black == max_code_peg:
+                self.__broken[index] = True
+            feedback.append(AttemptFeedback.of(black, white, max_code_peg))
+        return feedback
+
+    def get_codes(self) -> List[Code]:
+        return self.__codes
+
+    def is_broken(self, index: int) -> bool:
+        return self.__broken[index]
+
+    def get_broken_count(self) -> int:
+        return sum(self.__broken)
+
+    def is_all_broken(self) -> bool:
+        return all(self.__broken)
+
+    def __len__(self) -> int:
+        return len(self.__codes)
+
+    def __str__(self) -> str:
+        return ', '.join(str(code) for code in self.__codes)
+
+
+class MultiSecretCodeMaker(ComputerCodeMaker):
+    """ MultiSecretCodeMaker class represents a computer CodeMaker that creates K final codes at once """
+
+    def __init__(self, secret_count: int, rng: Optional[random.Random] = None) -> None:
+        super().__init__(rng)
+        self.__secret_count: int = secret_count
+
+    def make_new_final_code(self, game_rule: GameRule) -> SecretBatch:
+        """ computer generates K random final codes in one draw
+        :param: game_rule: to check whether the final codes follow the game rule
+        :return: the SecretBatch holding all final codes"""
+        return SecretBatch(CodeSpace.of(game_rule).sample_codes(self.__secret_count, self._rng))
+
+    def get_secret_count(self) -> int:
+        return self.__secret_count
+
+
+def benchmark(game_rule: GameRule, secret_count: int, guess_count: int, seed: Optional[int] = None) -> float:
+    """ score random guesses against a batch of random secrets to measure the scoring throughput
+    :param: game_rule: rule of the codes, secret_count: K, guess_count: number of guesses to score, seed: random seed
+    :return: number of scored (guess, secret) pairs per second """
+    rng = random.Random(seed)
+    batch = MultiSecretCodeMaker(secret_count, rng).make_new_final_code(game_rule)
+    guesses = CodeSpace.of(game_rule).sample_codes(guess_count, rng)
+    started = time.perf_counter()
+    for guess in guesses:
+        batch.evaluate(guess)
+    elapsed = time.perf_counter() - started
+    return secret_count * guess_count / elapsed
+
+
+if __name__ == "__main__":
+    from constants import ORIGINAL_1P_GAMERULE
+    k = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    guesses = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    print('{:.0f} scores/s with K={}'.format(benchmark(ORIGINAL_1P_GAMERULE, k, guesses, 0), k))
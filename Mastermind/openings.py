@@ -0,0 +1,153 @@
+import argparse
+import json
+import math
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+from codespace import BLANK_VALUE, CodeSpace
+from constants import GAMERULES_BY_NAME
+from models import GameRule
+from scoring import decode_code
+from scoring_backends import get_backend
+
+SORT_KEYS: Dict[str, Callable[["OpeningStats"], tuple]] = {
+    'worst': lambda stats: (stats.get_worst_case(), stats.get_expected_size(), -stats.get_entropy()),
+    'expected': lambda stats: (stats.get_expected_size(), stats.get_worst_case(), -stats.get_entropy()),
+    'entropy': lambda stats: (-stats.get_entropy(), stats.get_expected_size(), stats.get_worst_case()),
+    'partitions': lambda stats: (-stats.get_partition_count(), stats.get_expected_size(), stats.get_worst_case()),
+}
+
+
+class OpeningStats:
+    """ OpeningStats class represents how well one opening guess splits the whole code space of a game rule """
+
+    def __init__(self, guess: int, class_size: int, partition_sizes: List[int]) -> None:
+        super().__init__()
+        total = sum(partition_sizes)
+        self.__guess: int = guess
+        self.__class_size: int = class_size
+        self.__worst_case: int = max(partition_sizes)
+        self.__expected_size: float = sum(size * size for size in partition_sizes) / total
+        self.__entropy: float = -sum(size / total * math.log2(size / total) for size in partition_sizes)
+        self.__partition_count: int = len(partition_sizes)
+
+    def get_guess(self) -> int:
+        return self.__guess
+
+    def get_class_size(self) -> int:
+        """ :return: how many guesses are equivalent to this one by swapping colours and positions """
+        return self.__class_size
+
+    def get_worst_case(self) -> int:
+        return self.__worst_case
+
+    def get_expected_size(self) -> float:
+        return self.__expected_size
+
+    def get_entropy(self) -> float:
+        return self.__entropy
+
+    def get_partition_count(self) -> int:
+        return self.__partition_count
+
+
+def analyse_guesses(max_code_peg: int, allow_blank: bool, guesses: List[int], class_sizes: List[int]) -> List[OpeningStats]:
+    """ partition the whole code space by every guess of a shard, this is the unit of work handed to the pool workers
+    :param: max_code_peg, allow_blank: shape of the codes, guesses: code space indexes to analyse, class_sizes: their class sizes
+    :return: the OpeningStats of every guess """
+    game_rule = GameRule(True, 1, 1, allow_blank, max_code_peg)
+    code_space = CodeSpace.of(game_rule)
+    scoring = get_backend(game_rule)
+    all_values = code_space.get_all_values()
+    all_counts = code_space.get_all_counts()
+    all_stats = []
+    for guess, class_size in zip(guesses, class_sizes):
+        partition: Dict[tuple, int] = {}
+        for feedback in scoring.score_batch(all_values[guess], all_values, all_counts):
+            partition[feedback] = partition.get(feedback, 0) + 1
+        all_stats.append(OpeningStats(guess, class_size, list(partition.values())))
+    return all_stats
+
+
+def get_distinct_openings(code_space: CodeSpace) -> Dict[int, int]:
+    """ group the openings that are the same up to swapping colours and positions, the first guess of the game cannot tell them apart
+    :return: code space index of one guess per group mapped to the size of the group """
+    representatives: Dict[tuple, int] = {}
+    class_sizes: Dict[int, int] = {}
+    for index, values in enumerate(code_space.get_all_values()):
+        colour_repeats = sorted((values.count(value) for value in set(values) if value != BLANK_VALUE), reverse=True)
+        key = (tuple(colour_repeats), values.count(BLANK_VALUE))
+        representative = representatives.setdefault(key, index)
+        class_sizes[representative] = class_sizes.get(representative, 0) + 1
+    return class_sizes
+
+
+class OpeningAnalysis:
+    """ OpeningAnalysis class ranks the opening guesses of a game rule, sharding the work over a pool of worker processes """
+
+    def __init__(self, game_rule: GameRule, use_symmetry: bool = True, workers: Optional[int] = None, shard_size: int = 64) -> None:
+        super().__init__()
+        self._game_rule: GameRule = game_rule
+        self._use_symmetry: bool = use_symmetry
+        self._workers: Optional[int] = workers
+        self._shard_size: int = shard_size
+
+    def run(self, sort_key: str = 'worst', progress: Optional[Callable[[int, int, float], None]] = None) -> List[OpeningStats]:
+        """ :param: sort_key: one of SORT_KEYS, progress: called after every shard with (done guesses, total guesses, elapsed seconds)
+        :return: the OpeningStats of every distinct opening, best first """
+        code_space = CodeSpace.of(self._game_rule)
+        if self._use_symmetry:
+            openings = get_distinct_openings(code_space)
+        else:
+            openings = {index: 1 for index in range(code_space.size())}
+        guesses = list(openings.keys())
+        all_stats: List[OpeningStats] = []
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=self._workers) as executor:
+            futures = []
+            for first in range(0, len(guesses), self._shard_size):
+                shard = guesses[first:first + self._shard_size]
+                futures.append(executor.submit(analyse_guesses, code_space.get_max_code_peg(), code_space.allow_blank(),
+                                               shard, [openings[guess] for guess in shard]))
+            for future in as_completed(futures):
+                all_stats.extend(future.result())
+                if progress is not None:
+                    progress(len(all_stats), len(guesses), time.perf_counter() - started)
+        return sorted(all_stats, key=SORT_KEYS[sort_key])
+
+
+def print_progress(done: int, total: int, elapsed: float, code_space_size: int) -> None:
+    """ print the progress and the scoring throughput of the analysis on stderr """
+    print('\r{}/{} openings, {:.0f} scores/s'.format(done, total, done * code_space_size / max(elapsed, 1e-9)), end='', file=sys.stderr)
+    if done == total:
+        print(file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Rank the opening guesses of a game rule.')
+    parser.add_argument('--rule', default='mastermind44', choices=sorted(GAMERULES_BY_NAME.keys()))
+    parser.add_argument('--pegs', type=int, help='analyse a custom rule with this many pegs instead')
+    parser.add_argument('--blank', action='store_true', help='allow one blank peg in the custom rule')
+    parser.add_argument('--all', action='store_true', help='analyse every guess instead of one per colour/position pattern')
+    parser.add_argument('--sort', default='worst', choices=sorted(SORT_KEYS.keys()))
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--workers', type=int, help='worker processes, all cores by default')
+    parser.add_argument('--json', help='also write the ranking to this file')
+    args = parser.parse_args()
+    rule = GameRule(True, 1, 1, args.blank, args.pegs) if args.pegs else GAMERULES_BY_NAME[args.rule]
+    size = CodeSpace.of(rule).size()
+    ranking = OpeningAnalysis(rule, not args.all, args.workers).run(
+        args.sort, lambda done, total, elapsed: print_progress(done, total, elapsed, size))
+    print('{:<5} {:<12} {:>7} {:>7} {:>10} {:>8} {:>10}'.format('rank', 'guess', 'class', 'worst', 'expected', 'entropy', 'partitions'))
+    for rank, stats in enumerate(ranking[:args.top], 1):
+        code = decode_code(CodeSpace.of(rule).decode_index(stats.get_guess()))
+        print('{:<5} {:<12} {:>7} {:>7} {:>10.2f} {:>8.3f} {:>10}'.format(rank, str(code), stats.get_class_size(), stats.get_worst_case(),
+                                                                         stats.get_expected_size(), stats.get_entropy(),
+                                                                         stats.get_partition_count()))
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump([{'guess': str(decode_code(CodeSpace.of(rule).decode_index(stats.get_guess()))), 'class_size': stats.get_class_size(),
+                        'worst_case': stats.get_worst_case(), 'expected_size': stats.get_expected_size(),
+                        'entropy': stats.get_entropy(), 'partitions': stats.get_partition_count()} for stats in ranking], json_file, indent=2)
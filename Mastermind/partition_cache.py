@@ -0,0 +1,118 @@
+import dbm
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from memory import estimate_entries_size
+
+# sizes of the partition of a candidate set by a guess, as ((black, white), size) pairs sorted by feedback
+PartitionSizes = Tuple[Tuple[Tuple[int, int], int], ...]
+
+
+class PartitionCache:
+    """ PartitionCache class remembers the partition sizes of candidate sets by guesses, so positions that repeat across games
+    cost a lookup. Entries live in a bounded LRU in memory, evicted entries can be spilled to a dbm file and read back on a miss """
+
+    def __init__(self, max_entries: int = 100000, spill_path: Optional[str] = None) -> None:
+        super().__init__()
+        self.__max_entries: int = max_entries
+        self.__entries: "OrderedDict[bytes, PartitionSizes]" = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__spill = dbm.open(spill_path, 'c') if spill_path is not None else None
+        self.__hits: int = 0
+        self.__disk_hits: int = 0
+        self.__misses: int = 0
+        self.__evictions: int = 0
+
+    @staticmethod
+    def fingerprint(candidates: List[int], max_code_peg: int, allow_blank: bool) -> bytes:
+        """ :param: candidates: the sorted code space indexes of a candidate set, max_code_peg, allow_blank: shape of the code
+        space they index, the same index is a different code in spaces of other shapes
+        :return: a short digest identifying the candidate set """
+        digest = hashlib.blake2b(bytes([max_code_peg, allow_blank]), digest_size=16)
+        digest.update(array('I', candidates).tobytes())
+        return digest.digest()
+
+    @staticmethod
+    def __key(fingerprint: bytes, guess: int) -> bytes:
+        return fingerprint + guess.to_bytes(4, 'little')
+
+    def get(self, fingerprint: bytes, guess: int) -> Optional[PartitionSizes]:
+        """ :return: the cached partition sizes of the candidate set by the guess, None when unknown """
+        key = PartitionCache.__key(fingerprint, guess)
+        with self.__lock:
+            sizes = self.__entries.get(key)
+            if sizes is not None:
+                self.__entries.move_to_end(key)
+                self.__hits += 1
+                return sizes
+            if self.__spill is not None and key in self.__spill:
+                sizes = PartitionCache.__unpack(self.__spill[key])
+                self.__disk_hits += 1
+                self.__store(key, sizes)
+                return sizes
+            self.__misses += 1
+            return None
+
+    def put(self, fingerprint: bytes, guess: int, sizes: PartitionSizes) -> None:
+        with self.__lock:
+            self.__store(PartitionCache.__key(fingerprint, guess), sizes)
+
+    def __store(self, key: bytes, sizes: PartitionSizes) -> None:
+        """ add an entry and evict the least recently used ones over the limit, must be called with the lock held """
+        self.__entries[key] = sizes
+        self.__entries.move_to_end(key)
+        self.__evict_over_limit(self.__max_entries)
+
+    def trim(self, max_entries: int) -> int:
+        """ spill or drop the least recently used entries kept in memory down to a number of entries, the cache fills up to its
+        own limit again afterwards
+        :return: the number of entries evicted """
+        with self.__lock:
+            return self.__evict_over_limit(max_entries)
+
+    def __evict_over_limit(self, max_entries: int) -> int:
+        """ evict the least recently used entries over a limit, must be called with the lock held
+        :return: the number of entries evicted """
+        evicted = max(0, len(self.__entries) - max_entries)
+        for _ in range(evicted):
+            evicted_key, evicted_sizes = self.__entries.popitem(last=False)
+            if self.__spill is not None:
+                self.__spill[evicted_key] = PartitionCache.__pack(evicted_sizes)
+        self.__evictions += evicted
+        return evicted
+
+    @staticmethod
+    def __pack(sizes: PartitionSizes) -> bytes:
+        return array('I', [value for (black, white), size in sizes for value in (black, white, size)]).tobytes()
+
+    @staticmethod
+    def __unpack(data: bytes) -> PartitionSizes:
+        values = array('I', data)
+        return tuple(((values[i], values[i + 1]), values[i + 2]) for i in range(0, len(values), 3))
+
+    def get_stats(self) -> Dict[str, int]:
+        """ :return: the hit, miss and eviction counters and the number of entries in memory """
+        with self.__lock:
+            return {'hits': self.__hits, 'disk_hits': self.__disk_hits, 'misses': self.__misses,
+                    'evictions': self.__evictions, 'entries': len(self.__entries)}
+
+    def get_memory_size(self) -> int:
+        """ :return: an estimate of the bytes of the entries kept in memory """
+        with self.__lock:
+            return estimate_entries_size(self.__entries)
+
+    def close(self) -> None:
+        """ write the entries still in memory to the spill file and close it, a cache opened on that file later has them all """
+        with self.__lock:
+            if self.__spill is not None:
+                for key, sizes in self.__entries.items():
+                    self.__spill[key] = PartitionCache.__pack(sizes)
+                self.__spill.close()
+                self.__spill = None
+
+
+# cache shared by the breaker strategies and the hints of this process
+DEFAULT_PARTITION_CACHE = PartitionCache()
@@ -0,0 +1,118 @@
+import os
+import struct
+from array import array
+from typing import Dict, List, Optional
+
+from models import Code
+from scoring import PEG_ORDER, CodeValues, encode_code
+
+# file the secrets of human code makers are recorded to and the shared priors are loaded from, recording is off when unset
+PRIOR_PATH_ENV = 'MASTERMIND_SECRET_PRIOR'
+
+PRIOR_HEADER = struct.Struct('<BI')
+
+# the prior starts a new epoch when it has seen this much more secrets than at the start of the current epoch
+EPOCH_GROWTH = 2.0
+
+
+class SecretPrior:
+    """ SecretPrior class learns how code makers pick their secrets, as the count of every colour at every position and the count
+    of repeated pegs of the secrets seen so far. A code is weighted by the product of those frequencies, smoothed so that a code
+    never seen is still possible and an empty prior weights every code the same """
+
+    __shared: Dict[int, "SecretPrior"] = {}
+
+    def __init__(self, max_code_peg: int) -> None:
+        super().__init__()
+        self.__max_code_peg: int = max_code_peg
+        self.__position_counts: array = array('I', [0] * (max_code_peg * len(PEG_ORDER)))
+        self.__repeat_counts: array = array('I', [0] * max_code_peg)
+        self.__secret_count: int = 0
+        self.__epoch: int = 0
+        self.__epoch_secret_count: int = 0
+
+    @staticmethod
+    def shared(max_code_peg: int) -> "SecretPrior":
+        """ :return: the prior shared by every breaker of the process for codes of that length, it starts from the recorded
+        prior file when there is one """
+        prior = SecretPrior.__shared.get(max_code_peg)
+        if prior is None:
+            path = os.environ.get(PRIOR_PATH_ENV)
+            loaded = SecretPrior.load(path) if path and os.path.exists(path) else None
+            if loaded is None or loaded.get_max_code_peg() != max_code_peg:
+                loaded = SecretPrior(max_code_peg)
+            prior = SecretPrior.__shared.setdefault(max_code_peg, loaded)
+        return prior
+
+    @staticmethod
+    def record_secret(final_code: Code) -> None:
+        """ add the secret of a code maker to the shared prior and to the prior file when recording is on """
+        values = encode_code(final_code)
+        prior = SecretPrior.shared(len(values))
+        prior.observe_secret(values)
+        path = os.environ.get(PRIOR_PATH_ENV)
+        if path:
+            prior.save(path)
+
+    def observe_secret(self, values: CodeValues) -> None:
+        """ update the count tables with one more secret """
+        colours = len(PEG_ORDER)
+        for position, value in enumerate(values):
+            self.__position_counts[position * colours + value] += 1
+        self.__repeat_counts[len(values) - len(set(values))] += 1
+        self.__secret_count += 1
+        if self.__secret_count >= EPOCH_GROWTH * self.__epoch_secret_count:
+            self.__epoch += 1
+            self.__epoch_secret_count = self.__secret_count
+
+    def weight(self, values: CodeValues) -> float:
+        """ :return: how likely the code is to be picked as a secret, relative to other codes of the same length """
+        colours = len(PEG_ORDER)
+        counts = self.__position_counts
+        weight = float(self.__repeat_counts[len(values) - len(set(values))] + 1)
+        for position, value in enumerate(values):
+            weight *= counts[position * colours + value] + 1
+        return weight
+
+    def weights(self, all_values: List[CodeValues]) -> List[float]:
+        return list(map(self.weight, all_values))
+
+    def get_max_code_peg(self) -> int:
+        return self.__max_code_peg
+
+    def get_secret_count(self) -> int:
+        return self.__secret_count
+
+    def get_epoch(self) -> int:
+        """ :return: a number that only changes when the prior has noticeably changed, so choices made with it can be kept until then """
+        return self.__epoch
+
+    def save(self, path: str) -> None:
+        """ write the count tables to the file, the file is replaced at once so readers never see half of it """
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'wb') as prior_file:
+            prior_file.write(PRIOR_HEADER.pack(self.__max_code_peg, self.__secret_count))
+            prior_file.write(self.__position_counts.tobytes())
+            prior_file.write(self.__repeat_counts.tobytes())
+        os.replace(temporary_path, path)
+
+    @staticmethod
+    def load(path: str) -> Optional["SecretPrior"]:
+        """ :return: the prior saved in the file, None when the file is not a prior """
+        with open(path, 'rb') as prior_file:
+            data = prior_file.read()
+        if len(data) < PRIOR_HEADER.size:
+            return None
+        max_code_peg, secret_count = PRIOR_HEADER.unpack_from(data, 0)
+        prior = SecretPrior(max_code_peg)
+        table_size = prior.__position_counts.itemsize * (len(prior.__position_counts) + len(prior.__repeat_counts))
+        if len(data) != PRIOR_HEADER.size + table_size:
+            return None
+        position_end = PRIOR_HEADER.size + prior.__position_counts.itemsize * len(prior.__position_counts)
+        prior.__position_counts = array('I')
+        prior.__position_counts.frombytes(data[PRIOR_HEADER.size:position_end])
+        prior.__repeat_counts = array('I')
+        prior.__repeat_counts.frombytes(data[position_end:])
+        prior.__secret_count = secret_count
+        prior.__epoch_secret_count = secret_count
+        return prior
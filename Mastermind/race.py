@@ -0,0 +1,161 @@
+import itertools
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import messages
+from models import AttemptFeedback, Code, GameRule
+from utils import MasterMindException
+
+
+class RaceGuessResult:
+    """ RaceGuessResult class represents the outcome of one guess submitted to a race room """
+
+    def __init__(self, player_name: str, attempt: int, feedback: AttemptFeedback, arrival: int, rank: Optional[int]) -> None:
+        super().__init__()
+        self.__player_name: str = player_name
+        self.__attempt: int = attempt
+        self.__feedback: AttemptFeedback = feedback
+        self.__arrival: int = arrival
+        self.__rank: Optional[int] = rank
+
+    def get_player_name(self) -> str:
+        return self.__player_name
+
+    def get_attempt(self) -> int:
+        return self.__attempt
+
+    def get_feedback(self) -> AttemptFeedback:
+        return self.__feedback
+
+    def get_arrival(self) -> int:
+        return self.__arrival
+
+    def get_rank(self) -> Optional[int]:
+        """ :return: the finishing place of the player if this guess broke the code, None otherwise """
+        return self.__rank
+
+    def is_winning(self) -> bool:
+        return self.__rank is not None
+
+
+class RaceRoom:
+    """ RaceRoom class holds the shared state of a Mastermind44 race, where all breakers guess the same final code concurrently.
+    Every room owns its lock, so guesses in different rooms never wait on each other """
+
+    def __init__(self, room_id: str, game_rule: GameRule, final_code: Code, player_names: List[str], podium_size: int = 1) -> None:
+        super().__init__()
+        self._room_id: str = room_id
+        self._game_rule: GameRule = game_rule
+        self._final_code: Code = final_code
+        self._podium_size: int = min(podium_size, len(player_names))
+        self._lock = threading.Lock()
+        self._arrivals = itertools.count(1)
+        self._attempts: Dict[str, int] = {player_name: 0 for player_name in player_names}
+        self._winners: List[RaceGuessResult] = []
+        self._finished: bool = False
+
+    def submit_guess(self, player_name: str, guess: Code) -> RaceGuessResult:
+        """ score a guess of a player and record it, the winners are ranked by the order their guesses arrived in the room
+        :param: player_name: the breaker submitting the guess, guess: the guessed code
+        :return: the RaceGuessResult of the guess
+        :except: unknown player, player already on the podium, attempts used up, or the race is already over"""
+        if player_name not in self._attempts:
+            raise MasterMindException(messages.RACE_UNKNOWN_PLAYER.format(player_name=player_name))
+        # scoring does not touch any shared state, keep it outside of the lock
+        feedback: AttemptFeedback = AttemptFeedback.evaluate(guess, self._final_code)
+        with self._lock:
+            if self._finished:
+                raise MasterMindException(messages.RACE_OVER)
+            for winner in self._winners:
+                if winner.get_player_name() == player_name:
+                    raise MasterMindException(messages.RACE_ALREADY_WON.format(player_name=player_name, rank=winner.get_rank()))
+            attempt = self._attempts[player_name]
+            if attempt == self._game_rule.get_max_attempts():
+                raise MasterMindException(messages.RACE_NO_ATTEMPTS_LEFT.format(player_name=player_name, attempt=attempt))
+            attempt = attempt + 1
+            self._attempts[player_name] = attempt
+            rank: Optional[int] = None
+            if feedback.is_winning_state(self._game_rule.get_max_code_peg()):
+                rank = len(self._winners) + 1
+            result = RaceGuessResult(player_name, attempt, feedback, next(self._arrivals), rank)
+            if rank is not None:
+                self._winners.append(result)
+            self._finished = len(self._winners) == self._podium_size or self.__players_done(self._attempts)
+            return result
+
+    def finish_if_done(self, player_names: Iterable[str]) -> bool:
+        """ end the race when every one of the players has won or used up all attempts, the players of the race missing from
+        them have left and are not waited for
+        :return: whether the race is finished """
+        with self._lock:
+            if not self._finished:
+                self._finished = self.__players_done(player_names)
+            return self._finished
+
+    def __players_done(self, player_names: Iterable[str]) -> bool:
+        """ check whether every one of the players who has not won yet has used up all attempts, must be called with the lock held """
+        winner_names = {winner.get_player_name() for winner in self._winners}
+        max_attempts = self._game_rule.get_max_attempts()
+        return all(self._attempts[player_name] == max_attempts or player_name in winner_names for player_name in player_names)
+
+    def get_room_id(self) -> str:
+        return self._room_id
+
+    def get_game_rule(self) -> GameRule:
+        return self._game_rule
+
+    def get_final_code(self) -> Code:
+        return self._final_code
+
+    def get_player_names(self) -> List[str]:
+        return list(self._attempts.keys())
+
+    def get_attempts(self, player_name: str) -> int:
+        return self._attempts[player_name]
+
+    def get_winners(self) -> List[RaceGuessResult]:
+        with self._lock:
+            return list(self._winners)
+
+    def is_finished(self) -> bool:
+        return self._finished
+
+
+class RaceRoomRegistry:
+    """ RaceRoomRegistry class keeps all running race rooms of a server. The registry lock is only taken to add or remove a room,
+    looking a room up and guessing in it never goes through it """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._rooms: Dict[str, RaceRoom] = {}
+        self._lock = threading.Lock()
+
+    def create_room(self, room_id: str, game_rule: GameRule, final_code: Code, player_names: List[str], podium_size: int = 1) -> RaceRoom:
+        """ create and register a new race room
+        :param: room_id: unique id of the room, game_rule: rule of the race, final_code: shared final code, player_names: the breakers,
+        podium_size: how many winners are ranked before the race ends
+        :return: the created RaceRoom
+        :except: room id already used"""
+        room = RaceRoom(room_id, game_rule, final_code, player_names, podium_size)
+        with self._lock:
+            if room_id in self._rooms:
+                raise MasterMindException(messages.RACE_ROOM_EXISTS.format(room_id=room_id))
+            self._rooms[room_id] = room
+        return room
+
+    def get_room(self, room_id: str) -> RaceRoom:
+        room: Optional[RaceRoom] = self._rooms.get(room_id)
+        if room is None:
+            raise MasterMindException(messages.RACE_ROOM_NOT_FOUND.format(room_id=room_id))
+        return room
+
+    def remove_room(self, room_id: str) -> None:
+        with self._lock:
+            self._rooms.pop(room_id, None)
+
+    def submit_guess(self, room_id: str, player_name: str, guess: Code) -> RaceGuessResult:
+        """ submit a guess of a player to the room it belongs to """
+        return self.get_room(room_id).submit_guess(player_name, guess)
+
+    def get_room_count(self) -> int:
+        return len(self._rooms)
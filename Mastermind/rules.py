@@ -0,0 +1,156 @@
+import json
+import os
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+import messages
+from models import GameRule
+from utils import MasterMindException
+
+if TYPE_CHECKING:
+    from game import Game
+    from snapshot import ResultLog
+
+# file the rules are read from, rules.json next to this module unless set
+RULES_PATH_ENV = 'MASTERMIND_RULES'
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rules.json')
+
+# fields every rule of the file must have, with their type
+RULE_FIELDS = {
+    'name': str,
+    'key': str,
+    'title': str,
+    'game': str,
+    'computer_code_maker': bool,
+    'max_breakers': int,
+    'max_attempts': int,
+    'allow_blank': bool,
+    'max_code_peg': int,
+}
+
+# a game snapshot writes the breakers, the attempts and the pegs of its rule in one byte each, and every code as a 4 byte index
+# into the code space of the rule
+MAX_RULE_FIELD = 255
+MAX_CODE_SPACE_SIZE = 1 << 32
+
+
+class RuleVariant:
+    """ RuleVariant class represents one game variant of the rules file: the GameRule, the game class that plays it, named in
+    game.GAME_TYPES, the key that selects it in the menu, and whether it is warmed up before the first game """
+
+    def __init__(self, name: str, key: str, title: str, game_type: str, game_rule: GameRule, warm_up: bool = False) -> None:
+        super().__init__()
+        self.__name: str = name
+        self.__key: str = key
+        self.__title: str = title
+        self.__game_type: str = game_type
+        self.__game_rule: GameRule = game_rule
+        self.__warm_up: bool = warm_up
+
+    def get_name(self) -> str:
+        return self.__name
+
+    def get_key(self) -> str:
+        return self.__key
+
+    def get_title(self) -> str:
+        return self.__title
+
+    def get_game_type(self) -> str:
+        return self.__game_type
+
+    def get_game_rule(self) -> GameRule:
+        return self.__game_rule
+
+    def is_warm_up(self) -> bool:
+        return self.__warm_up
+
+    def create_game(self, show_hints: bool = False, results: Optional["ResultLog"] = None, difficulty: Optional[str] = None) -> "Game":
+        """ start a game of the variant, the game class is only imported now
+        :except: game type missing from game.GAME_TYPES """
+        from game import GAME_TYPES
+        game_class = GAME_TYPES.get(self.__game_type)
+        if game_class is None:
+            raise MasterMindException(messages.UNKNOWN_GAME_TYPE.format(game=self.__game_type, name=self.__name,
+                                                                        games=', '.join(GAME_TYPES)))
+        return game_class(show_hints, results, difficulty, self.__game_rule)
+
+
+class RuleRegistry:
+    """ RuleRegistry class holds the game variants read from a rules file, by name and by menu key """
+
+    def __init__(self, variants: List[RuleVariant]) -> None:
+        super().__init__()
+        self.__variants: Dict[str, RuleVariant] = {variant.get_name(): variant for variant in variants}
+        self.__by_key: Dict[str, RuleVariant] = {variant.get_key().lower(): variant for variant in variants}
+
+    @staticmethod
+    def load(path: str) -> "RuleRegistry":
+        """ :return: the registry of the variants of a rules file
+        :except: file missing, not JSON, or a rule with a missing, mistyped or out of range field, or a name or key used twice """
+        from codespace import CodeSpace
+        try:
+            with open(path) as rules_file:
+                rules = json.load(rules_file)['rules']
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            raise MasterMindException(messages.RULES_INVALID.format(path=path, error=e))
+        variants: List[RuleVariant] = []
+        for rule in rules:
+            for field, field_type in RULE_FIELDS.items():
+                if type(rule.get(field)) is not field_type:
+                    raise MasterMindException(messages.RULES_INVALID.format(
+                        path=path, error='{} of rule {} must be a {}'.format(field, rule.get('name'), field_type.__name__)))
+            for field in ('max_breakers', 'max_attempts', 'max_code_peg'):
+                if not 1 <= rule[field] <= MAX_RULE_FIELD:
+                    raise MasterMindException(messages.RULES_INVALID.format(
+                        path=path, error='{} of rule {} must be from 1 to {}'.format(field, rule['name'], MAX_RULE_FIELD)))
+            if CodeSpace(rule['max_code_peg'], rule['allow_blank']).size() > MAX_CODE_SPACE_SIZE:
+                raise MasterMindException(messages.RULES_INVALID.format(
+                    path=path, error='rule {} has more than {} codes, use fewer pegs'.format(rule['name'], MAX_CODE_SPACE_SIZE)))
+            # every rule can be played in races, which reveal a different peg position to every breaker like Mastermind44 does
+            if rule['max_breakers'] > rule['max_code_peg']:
+                raise MasterMindException(messages.RULES_INVALID.format(
+                    path=path, error='max_breakers of rule {} must not exceed its max_code_peg, every breaker is revealed a '
+                                     'different peg'.format(rule['name'])))
+            variants.append(RuleVariant(rule['name'], rule['key'], rule['title'], rule['game'],
+                                        GameRule(rule['computer_code_maker'], rule['max_breakers'], rule['max_attempts'],
+                                                 rule['allow_blank'], rule['max_code_peg']), rule.get('warm_up') is True))
+        registry = RuleRegistry(variants)
+        if len(registry.__variants) != len(variants) or len(registry.__by_key) != len(variants):
+            raise MasterMindException(messages.RULES_INVALID.format(path=path, error='names and keys must be unique'))
+        return registry
+
+    def get(self, name: str) -> Optional[RuleVariant]:
+        return self.__variants.get(name)
+
+    def get_by_key(self, key: str) -> Optional[RuleVariant]:
+        """ :return: the variant selected by a menu key, in any case """
+        return self.__by_key.get(key.lower())
+
+    def get_variants(self) -> List[RuleVariant]:
+        """ :return: the variants in the order of the menu keys """
+        return sorted(self.__variants.values(), key=lambda variant: variant.get_key())
+
+    def get_game_rules(self) -> Dict[str, GameRule]:
+        """ :return: the game rule of every variant by name, in the order of the file """
+        return {name: variant.get_game_rule() for name, variant in self.__variants.items()}
+
+    def get_menu(self) -> str:
+        """ :return: the game selection menu listing every variant """
+        variants = self.get_variants()
+        keys = [variant.get_key() for variant in variants]
+        if len(keys) > 2:
+            keys = [', '.join(keys[:-1]) + ',', keys[-1]]
+        return '\n'.join([messages.GAME_OPTIONS_HEADER]
+                         + [messages.GAME_OPTION.format(key=variant.get_key(), title=variant.get_title()) for variant in variants]
+                         + [messages.GAME_OPTIONS_PROMPT.format(keys=' or '.join(keys))])
+
+
+_registry: Optional[RuleRegistry] = None
+
+
+def get_rule_registry() -> RuleRegistry:
+    """ :return: the registry of the rules file of MASTERMIND_RULES or of the default one, loaded once """
+    global _registry
+    if _registry is None:
+        _registry = RuleRegistry.load(os.environ.get(RULES_PATH_ENV) or DEFAULT_RULES_PATH)
+    return _registry
@@ -0,0 +1,55 @@
+import operator
+from typing import Dict, List, Sequence, Tuple
+
+from models import Code, Peg
+
+# every peg is scored by its position in this list, BLANK included since it is compared like any other colour
+PEG_ORDER: List[Peg] = list(Peg)
+PEG_INDEX: Dict[Peg, int] = {peg: index for index, peg in enumerate(PEG_ORDER)}
+
+CodeValues = Tuple[int, ...]
+
+
+def encode_code(code: Code) -> CodeValues:
+    """ convert a Code to the tuple of peg indexes used by the scoring functions
+    :param: code: the Code object
+    :return: tuple of peg indexes """
+    return tuple(PEG_INDEX[peg] for peg in code.get_pegs())
+
+
+def decode_code(values: Sequence[int]) -> Code:
+    """ convert a tuple of peg indexes back to the Code object
+    :param: values: tuple of peg indexes
+    :return: the Code object """
+    return Code([PEG_ORDER[value] for value in values])
+
+
+def count_pegs(values: Sequence[int]) -> CodeValues:
+    """ :return: how many times every peg of PEG_ORDER appears in the code values """
+    counts = [0] * len(PEG_ORDER)
+    for value in values:
+        counts[value] += 1
+    return tuple(counts)
+
+
+def score(guess: CodeValues, secret: CodeValues) -> Tuple[int, int]:
+    """ score a single guess with the same semantics as AttemptFeedback.evaluate
+    :param: guess: encoded guess values, secret: encoded secret values
+    :return: tuple of black and white counts """
+    black = sum(map(operator.eq, guess, secret))
+    matched = sum(map(min, count_pegs(guess), count_pegs(secret)))
+    return black, matched - black
+
+
+def score_batch(guess: CodeValues, secrets: Sequence[CodeValues], secret_counts: Sequence[CodeValues]) -> List[Tuple[int, int]]:
+    """ score one guess against many secrets in a single pass, the peg counts of the secrets are computed once by the caller
+    so the per secret cost is two C-level reductions
+    :param: guess: encoded guess values, secrets: encoded secret values, secret_counts: count_pegs of every secret
+    :return: list of black and white counts, one per secret """
+    eq = operator.eq
+    guess_counts = count_pegs(guess)
+    feedback = []
+    for secret, counts in zip(secrets, secret_counts):
+        black = sum(map(eq, guess, secret))
+        feedback.append((black, sum(map(min, guess_counts, counts)) - black))
+    return feedback
@@ -0,0 +1,309 @@
+import importlib.util
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Tuple, Type
+
+import messages
+from codespace import COLOUR_VALUES, CodeSpace
+from models import AttemptFeedback, GameRule
+from scoring import CodeValues, count_pegs, decode_code, score, score_batch
+from utils import MasterMindException
+
+Feedback = Tuple[int, int]
+
+# forces one backend for every rule when set, like the override given to set_backend_override
+BACKEND_OVERRIDE_ENV = 'MASTERMIND_SCORING_BACKEND'
+
+# code spaces up to this size can be scored through a lookup table, a full table of them takes at most 4 MB
+MAX_TABLE_CODES = 2048
+
+# size of the micro-benchmark workloads, kept small because the benchmark runs the first time a rule is scored
+BENCHMARK_SECRETS = 256
+BENCHMARK_GUESSES = 16
+BENCHMARK_ROUNDS = 3
+BENCHMARK_SINGLE_SCORES = 256
+
+
+class ScoringBackend(ABC):
+    """ ScoringBackend interface for the ways of scoring guesses. Every backend scores codes of one shape with the same semantics
+    as AttemptFeedback.evaluate_reference, codes are given as the encoded values of scoring.py """
+
+    # whether the backend is worth benchmarking for one guess scored at a time, backends with a per call setup are not
+    SINGLE_SCORE: bool = True
+
+    def __init__(self, max_code_peg: int, allow_blank: bool) -> None:
+        super().__init__()
+        self._max_code_peg: int = max_code_peg
+        self._allow_blank: bool = allow_blank
+
+    def get_max_code_peg(self) -> int:
+        return self._max_code_peg
+
+    def allow_blank(self) -> bool:
+        return self._allow_blank
+
+    @staticmethod
+    def is_available(max_code_peg: int, allow_blank: bool) -> bool:
+        """ :return: whether the backend can score codes of this shape on this machine """
+        return True
+
+    @abstractmethod
+    def score(self, guess: CodeValues, secret: CodeValues) -> Feedback:
+        """ :return: the black and white counts of the guess against the secret """
+        pass
+
+    @abstractmethod
+    def score_batch(self, guess: CodeValues, secrets: Sequence[CodeValues], secret_counts: Sequence[CodeValues]) -> List[Feedback]:
+        """ :param: guess: encoded guess values, secrets: encoded secret values, secret_counts: count_pegs of every secret
+        :return: the black and white counts of the guess against every secret """
+        pass
+
+
+class ScalarBackend(ScoringBackend):
+    """ ScalarBackend class scores every pair on its own, nothing is prepared ahead so a single guess is the cheapest """
+
+    def score(self, guess: CodeValues, secret: CodeValues) -> Feedback:
+        return score(guess, secret)
+
+    def score_batch(self, guess: CodeValues, secrets: Sequence[CodeValues], secret_counts: Sequence[CodeValues]) -> List[Feedback]:
+        return [score(guess, secret) for secret in secrets]
+
+
+class BatchBackend(ScoringBackend):
+    """ BatchBackend class scores one guess against many secrets reusing the peg counts of the secrets """
+
+    def score(self, guess: CodeValues, secret: CodeValues) -> Feedback:
+        return score_batch(guess, (secret,), (count_pegs(secret),))[0]
+
+    def score_batch(self, guess: CodeValues, secrets: Sequence[CodeValues], secret_counts: Sequence[CodeValues]) -> List[Feedback]:
+        return score_batch(guess, secrets, secret_counts)
+
+
+class TableBackend(ScoringBackend):
+    """ TableBackend class looks the feedback up in a table of the whole code space. A row of the table holds the feedback of one
+    guess against every code, it is filled the first time that guess is scored, so solvers that score the same guesses again and
+    again only pay for the lookups """
+
+    SINGLE_SCORE = False
+
+    def __init__(self, max_code_peg: int, allow_blank: bool) -> None:
+        super().__init__(max_code_peg, allow_blank)
+        code_space = CodeSpace.of(GameRule(True, 1, 1, allow_blank, max_code_peg))
+        self.__all_values: List[CodeValues] = code_space.get_all_values()
+        self.__all_counts: List[CodeValues] = code_space.get_all_counts()
+        self.__indexes: Dict[CodeValues, int] = {values: index for index, values in enumerate(self.__all_values)}
+        # a feedback is stored as one byte black * (pegs + 1) + white
+        self.__feedbacks: List[Feedback] = [(black, white) for black in range(max_code_peg + 1) for white in range(max_code_peg + 1)]
+        self.__rows: Dict[int, bytes] = {}
+        self.__lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def is_available(max_code_peg: int, allow_blank: bool) -> bool:
+        return CodeSpace(max_code_peg, allow_blank).size() <= MAX_TABLE_CODES
+
+    def __row(self, guess: CodeValues) -> bytes:
+        guess_index = self.__indexes[guess]
+        row = self.__rows.get(guess_index)
+        if row is None:
+            width = self._max_code_peg + 1
+            row = bytes(black * width + white for black, white in score_batch(guess, self.__all_values, self.__all_counts))
+            with self.__lock:
+                row = self.__rows.setdefault(guess_index, row)
+        return row
+
+    def score(self, guess: CodeValues, secret: CodeValues) -> Feedback:
+        return self.__feedbacks[self.__row(guess)[self.__indexes[secret]]]
+
+    def score_batch(self, guess: CodeValues, secrets: Sequence[CodeValues], secret_counts: Sequence[CodeValues]) -> List[Feedback]:
+        row = self.__row(guess)
+        return list(map(self.__feedbacks.__getitem__, map(row.__getitem__, map(self.__indexes.__getitem__, secrets))))
+
+
+class NumpyBackend(ScoringBackend):
+    """ NumpyBackend class scores a batch as array operations, it needs numpy which is an optional dependency. The arrays of the
+    last secrets are kept, solvers score many guesses against the same candidates """
+
+    SINGLE_SCORE = False
+
+    def __init__(self, max_code_peg: int, allow_blank: bool) -> None:
+        super().__init__(max_code_peg, allow_blank)
+        import numpy
+        self.__numpy = numpy
+        self.__last_secrets: Optional[Sequence[CodeValues]] = None
+        self.__last_arrays: Optional[tuple] = None
+
+    @staticmethod
+    def is_available(max_code_peg: int, allow_blank: bool) -> bool:
+        return importlib.util.find_spec('numpy') is not None
+
+    def __arrays(self, secrets: Sequence[CodeValues], secret_counts: Sequence[CodeValues]) -> tuple:
+        arrays = self.__last_arrays
+        if self.__last_secrets is not secrets or arrays is None:
+            arrays = (self.__numpy.array(secrets, dtype=self.__numpy.int8).reshape(len(secrets), self._max_code_peg),
+                      self.__numpy.array(secret_counts, dtype=self.__numpy.int8).reshape(len(secrets), -1))
+            self.__last_secrets, self.__last_arrays = secrets, arrays
+        return arrays
+
+    def score(self, guess: CodeValues, secret: CodeValues) -> Feedback:
+        return score(guess, secret)
+
+    def score_batch(self, guess: CodeValues, secrets: Sequence[CodeValues], secret_counts: Sequence[CodeValues]) -> List[Feedback]:
+        numpy = self.__numpy
+        values, counts = self.__arrays(secrets, secret_counts)
+        black = (values == numpy.array(guess, dtype=numpy.int8)).sum(axis=1)
+        white = numpy.minimum(counts, numpy.array(count_pegs(guess), dtype=numpy.int8)).sum(axis=1) - black
+        return list(zip(black.tolist(), white.tolist()))
+
+
+SCORING_BACKENDS: Dict[str, Type[ScoringBackend]] = {
+    'scalar': ScalarBackend,
+    'batch': BatchBackend,
+    'table': TableBackend,
+    'numpy': NumpyBackend,
+}
+
+# backend chosen for every (pegs, blank, batch) and the shared instances of the backends by (name, pegs, blank)
+_selected: Dict[Tuple[int, bool, bool], ScoringBackend] = {}
+_instances: Dict[Tuple[str, int, bool], ScoringBackend] = {}
+_override: Optional[str] = None
+_selection_lock = threading.Lock()
+
+
+def set_backend_override(name: Optional[str]) -> None:
+    """ force one backend for every rule instead of the fastest one, None goes back to the automatic choice
+    :except: unknown backend name """
+    global _override
+    if name is not None and name not in SCORING_BACKENDS:
+        raise MasterMindException(messages.UNKNOWN_SCORING_BACKEND.format(name=name, names=', '.join(SCORING_BACKENDS)))
+    with _selection_lock:
+        _override = name
+        _selected.clear()
+
+
+def create_backend(name: str, max_code_peg: int, allow_blank: bool) -> ScoringBackend:
+    """ :return: the shared instance of the named backend for codes of that shape
+    :except: unknown backend, or backend not available for that shape """
+    backend_class = SCORING_BACKENDS.get(name)
+    if backend_class is None:
+        raise MasterMindException(messages.UNKNOWN_SCORING_BACKEND.format(name=name, names=', '.join(SCORING_BACKENDS)))
+    if not backend_class.is_available(max_code_peg, allow_blank):
+        raise MasterMindException(messages.SCORING_BACKEND_UNAVAILABLE.format(name=name, max_code_peg=max_code_peg))
+    key = (name, max_code_peg, allow_blank)
+    backend = _instances.get(key)
+    if backend is None:
+        backend = _instances.setdefault(key, backend_class(max_code_peg, allow_blank))
+    return backend
+
+
+def get_backend_instances() -> Dict[Tuple[str, int, bool], ScoringBackend]:
+    """ :return: the backends created so far by (name, pegs, blank) """
+    return dict(_instances)
+
+
+def get_backend(game_rule: GameRule, batch: bool = True) -> ScoringBackend:
+    """ :param: game_rule: rule of the codes to score, batch: whether the caller scores guesses against many secrets at once
+    :return: the backend to score codes of the rule with """
+    return get_backend_for_shape(game_rule.get_max_code_peg(), game_rule.allow_blank(), batch)
+
+
+def get_backend_for_shape(max_code_peg: int, allow_blank: bool, batch: bool = True) -> ScoringBackend:
+    """ :return: the backend forced by the override, otherwise the fastest one for codes of that shape, benchmarked the first
+    time the shape is scored """
+    key = (max_code_peg, allow_blank, batch)
+    backend = _selected.get(key)
+    if backend is None:
+        with _selection_lock:
+            backend = _selected.get(key)
+            if backend is None:
+                name = _override or os.environ.get(BACKEND_OVERRIDE_ENV)
+                if not name:
+                    timings = benchmark_backends(max_code_peg, allow_blank, batch)
+                    name = min(timings, key=timings.get)
+                backend = _selected[key] = create_backend(name, max_code_peg, allow_blank)
+    return backend
+
+
+def benchmark_backends(max_code_peg: int, allow_blank: bool, batch: bool = True,
+                       rng: Optional[random.Random] = None) -> Dict[str, float]:
+    """ time every backend available for codes of that shape on a small workload. The batch workload scores guesses drawn from a
+    small pool against a sample of secrets over a few rounds, like a solver does, the single workload scores random pairs one
+    at a time, like an interactive game does
+    :return: seconds per score of every backend benchmarked """
+    rng = rng if rng is not None else random.Random(0)
+    code_space = CodeSpace.of(GameRule(True, 1, 1, allow_blank, max_code_peg))
+    secrets = code_space.sample_values(BENCHMARK_SECRETS, rng)
+    secret_counts = [count_pegs(values) for values in secrets]
+    guess_pool = code_space.sample_values(BENCHMARK_GUESSES, rng)
+    timings: Dict[str, float] = {}
+    for name, backend_class in SCORING_BACKENDS.items():
+        if not backend_class.is_available(max_code_peg, allow_blank) or not (batch or backend_class.SINGLE_SCORE):
+            continue
+        backend = create_backend(name, max_code_peg, allow_blank)
+        started = time.perf_counter()
+        if batch:
+            for round_number in range(BENCHMARK_ROUNDS):
+                for guess in rng.sample(guess_pool, BENCHMARK_GUESSES // 2):
+                    backend.score_batch(guess, secrets, secret_counts)
+            score_count = BENCHMARK_ROUNDS * BENCHMARK_GUESSES // 2 * len(secrets)
+        else:
+            for guess, secret in zip(secrets[:BENCHMARK_SINGLE_SCORES], reversed(secrets)):
+                backend.score(guess, secret)
+            score_count = min(BENCHMARK_SINGLE_SCORES, len(secrets))
+        timings[name] = (time.perf_counter() - started) / score_count
+    return timings
+
+
+def check_conformance(backend: ScoringBackend, pair_count: int = 2000, rng: Optional[random.Random] = None) -> List[str]:
+    """ score random pairs with the backend, one at a time and in a batch, and compare with AttemptFeedback.evaluate_reference.
+    The pairs are biased toward repeated colours and blanks, where scoring mistakes usually hide
+    :return: a description of every mismatch, empty when the backend conforms """
+    rng = rng if rng is not None else random.Random(0)
+    max_code_peg, allow_blank = backend.get_max_code_peg(), backend.allow_blank()
+    code_space = CodeSpace.of(GameRule(True, 1, 1, allow_blank, max_code_peg))
+    guesses = code_space.sample_values(pair_count, rng)
+    secrets = code_space.sample_values(pair_count, rng)
+    # also pair guesses with a shuffle of themselves and with codes of a single colour
+    for i in range(0, pair_count - 1, 3):
+        shuffled = list(guesses[i])
+        rng.shuffle(shuffled)
+        secrets[i] = tuple(shuffled)
+        secrets[i + 1] = (rng.choice(COLOUR_VALUES),) * max_code_peg
+    mismatches = []
+    for guess, secret in zip(guesses, secrets):
+        expected_feedback = AttemptFeedback.evaluate_reference(decode_code(guess), decode_code(secret))
+        expected = (expected_feedback.get_black_count(), expected_feedback.get_white_count())
+        single = backend.score(guess, secret)
+        batch = backend.score_batch(guess, [secret, guess], [count_pegs(secret), count_pegs(guess)])
+        if single != expected or batch != [expected, (max_code_peg, 0)]:
+            mismatches.append('{} against {}: expected {}, scored {} alone and {} in a batch'.format(
+                decode_code(guess), decode_code(secret), expected, single, batch[0]))
+    return mismatches
+
+
+if __name__ == "__main__":
+    import argparse
+    from constants import GAMERULES_BY_NAME
+    parser = argparse.ArgumentParser(description='Benchmark the scoring backends and check that they score like the game does.')
+    parser.add_argument('--rule', default='mastermind44', choices=sorted(GAMERULES_BY_NAME.keys()))
+    parser.add_argument('--pairs', type=int, default=2000, help='random pairs checked for every backend')
+    args = parser.parse_args()
+    rule = GAMERULES_BY_NAME[args.rule]
+    for batch_workload in (False, True):
+        workload_timings = benchmark_backends(rule.get_max_code_peg(), rule.allow_blank(), batch_workload)
+        print('{} workload:'.format('batch' if batch_workload else 'single'))
+        for backend_name, seconds in sorted(workload_timings.items(), key=lambda item: item[1]):
+            print('  {:<8} {:>12.0f} scores/s'.format(backend_name, 1 / seconds))
+    failed = False
+    for backend_name, backend_type in SCORING_BACKENDS.items():
+        if not backend_type.is_available(rule.get_max_code_peg(), rule.allow_blank()):
+            print('{:<8} not available'.format(backend_name))
+            continue
+        backend_mismatches = check_conformance(create_backend(backend_name, rule.get_max_code_peg(), rule.allow_blank()), args.pairs)
+        print('{:<8} {}'.format(backend_name, 'conforms' if not backend_mismatches else '{} mismatches'.format(len(backend_mismatches))))
+        for mismatch in backend_mismatches[:10]:
+            print('  ' + mismatch)
+        failed = failed or bool(backend_mismatches)
+    raise SystemExit(1 if failed else 0)
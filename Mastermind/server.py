@@ -0,0 +1,589 @@
+import argparse
+import asyncio
+import hmac
+import random
+import secrets
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Set, Tuple
+
+import messages
+from broadcast import SKIP_SLOW, Broadcaster
+from codespace import CodeSpace
+from constants import MASTERMIND_GAMERULE
+from flow_control import (ADDRESS_BURST, ADDRESS_RATE, INPUT_BUFFER_BYTES, MAX_LOOP_LAG, MAX_OUTPUT_BYTES, MAX_PENDING_HINTS,
+                          SESSION_BURST, SESSION_RATE, FlowControl)
+from hint_service import HINT_CACHE_ENTRIES, HINT_TTL_SECONDS, HintService
+from memory import MIB, TRACEMALLOC_FRAMES, MemoryAccountant, MemoryBudget
+from models import Code, ComputerCodeMaker, GameRule, Peg
+from race import RaceGuessResult, RaceRoom, RaceRoomRegistry
+from scoring import decode_code, encode_code
+from snapshot import RESUME_TOKEN_BYTES, GameSnapshot, ResultLog, SnapshotJournal
+from utils import MasterMindException, CodeParsingException
+from warmup import warm_up_rule
+
+# longest room id and player name in UTF-8 bytes, they are written to the journal and the results of every game
+MAX_NAME_BYTES = 64
+
+
+class ClientSession:
+    """ ClientSession class represents one connected player of the server """
+
+    def __init__(self, writer: asyncio.StreamWriter) -> None:
+        super().__init__()
+        self.__writer: asyncio.StreamWriter = writer
+        peer = writer.get_extra_info('peername')
+        self.__address: str = peer[0] if peer else ''
+        self.__player_name: Optional[str] = None
+        self.__room: Optional["ServerRoom"] = None
+        self.__watched_room: Optional["ServerRoom"] = None
+        self.__pending_hints: int = 0
+
+    def send(self, line: str) -> None:
+        """ queue one protocol line to the client, the transport writes it out without blocking the game loop """
+        self.send_bytes((line + '\n').encode())
+
+    def send_bytes(self, data: bytes) -> None:
+        """ queue already encoded protocol lines to the client, a client that leaves more than MAX_OUTPUT_BYTES unread is
+        disconnected rather than buffered for """
+        if not self.__writer.is_closing():
+            if self.__writer.transport.get_write_buffer_size() > MAX_OUTPUT_BYTES:
+                self.__writer.close()
+                return
+            self.__writer.write(data)
+
+    def get_writer(self) -> asyncio.StreamWriter:
+        return self.__writer
+
+    def get_watched_room(self) -> Optional["ServerRoom"]:
+        return self.__watched_room
+
+    def set_watched_room(self, room: Optional["ServerRoom"]) -> None:
+        self.__watched_room = room
+
+    def get_address(self) -> str:
+        return self.__address
+
+    def get_player_name(self) -> Optional[str]:
+        return self.__player_name
+
+    def get_pending_hints(self) -> int:
+        return self.__pending_hints
+
+    def add_pending_hints(self, count: int) -> None:
+        self.__pending_hints += count
+
+    def get_room(self) -> Optional["ServerRoom"]:
+        return self.__room
+
+    def join(self, room: "ServerRoom", player_name: str) -> None:
+        self.__room = room
+        self.__player_name = player_name
+
+    def leave(self) -> None:
+        self.__room = None
+
+    def close(self) -> None:
+        self.__writer.close()
+
+
+class ServerRoom:
+    """ ServerRoom class represents a Mastermind44 room of the server, it gathers players until it is full, then runs a race
+    where they all guess the same final code concurrently """
+
+    def __init__(self, room_id: str, game_rule: GameRule) -> None:
+        super().__init__()
+        self.__room_id: str = room_id
+        self.__game_rule: GameRule = game_rule
+        self.__sessions: List[ClientSession] = []
+        self.__race: Optional[RaceRoom] = None
+        self.__snapshot: Optional[GameSnapshot] = None
+        # milliseconds every guess of the snapshot history took, from the race start or the previous feedback of that player
+        self.__latencies: List[int] = []
+        self.__last_event_times: Dict[str, float] = {}
+        self.__spectators: Broadcaster = Broadcaster(slow_policy=SKIP_SLOW,
+                                                     skipped_line=lambda count: messages.PROTOCOL_SKIPPED.format(count=count))
+
+    def add_session(self, session: ClientSession, player_name: str, resume_token: str = '') -> None:
+        """ add a player to the room waiting for the race to start, or bring a player of a running race back after a reconnect
+        or a server restart, with the resume token the race sent the player in START
+        :except: room full, name already used, or wrong resume token """
+        if any(other.get_player_name() == player_name for other in self.__sessions):
+            raise MasterMindException(messages.SERVER_NAME_TAKEN.format(player_name=player_name, room_id=self.__room_id))
+        if self.__race is not None:
+            if player_name not in self.__race.get_player_names():
+                raise MasterMindException(messages.SERVER_ROOM_FULL.format(room_id=self.__room_id))
+            tokens = self.__snapshot.get_resume_tokens()
+            # games journaled before resume tokens existed are rejoined by name
+            if tokens is not None and not hmac.compare_digest(
+                    resume_token.encode(), tokens[self.__snapshot.get_player_names().index(player_name)].hex().encode()):
+                raise MasterMindException(messages.SERVER_RESUME_TOKEN_INVALID.format(room_id=self.__room_id,
+                                                                                     player_name=player_name))
+            session.join(self, player_name)
+            self.__sessions.append(session)
+            self.__send_race_start(session)
+            return
+        if len(self.__sessions) == self.__game_rule.get_max_breakers():
+            raise MasterMindException(messages.SERVER_ROOM_FULL.format(room_id=self.__room_id))
+        session.join(self, player_name)
+        self.__sessions.append(session)
+
+    def remove_session(self, session: ClientSession) -> None:
+        if session in self.__sessions:
+            self.__sessions.remove(session)
+        session.leave()
+
+    def is_full(self) -> bool:
+        return len(self.__sessions) == self.__game_rule.get_max_breakers()
+
+    def start_race(self, registry: RaceRoomRegistry, rng: random.Random) -> RaceRoom:
+        """ create the final code, reveal a different peg position to every player like Mastermind44 does, and open the race """
+        code_space = CodeSpace.of(self.__game_rule)
+        final_code: Code = ComputerCodeMaker(rng).make_new_final_code(self.__game_rule)
+        player_names = [session.get_player_name() for session in self.__sessions]
+        positions = rng.sample(range(self.__game_rule.get_max_code_peg()), len(self.__sessions))
+        self.__snapshot = GameSnapshot(self.__room_id, self.__game_rule, player_names, code_space.encode_values(encode_code(final_code)),
+                                       list(positions), resume_tokens=[secrets.token_bytes(RESUME_TOKEN_BYTES) for _ in player_names])
+        self.__race = registry.create_room(self.__room_id, self.__game_rule, final_code, player_names)
+        self.__last_event_times = dict.fromkeys(player_names, time.monotonic())
+        for session in self.__sessions:
+            self.__send_race_start(session)
+        return self.__race
+
+    def restore_race(self, registry: RaceRoomRegistry, snapshot: GameSnapshot) -> RaceRoom:
+        """ open the race of a snapshot again and replay its guesses in their arrival order, the players join back later """
+        code_space = CodeSpace.of(self.__game_rule)
+        player_names = snapshot.get_player_names()
+        final_code = decode_code(code_space.decode_index(snapshot.get_final_code()))
+        self.__snapshot = snapshot
+        self.__race = registry.create_room(self.__room_id, self.__game_rule, final_code, player_names)
+        for player_index, guess, black, white in snapshot.get_history():
+            self.__race.submit_guess(player_names[player_index], decode_code(code_space.decode_index(guess)))
+        # the time the guesses took before the restart is lost
+        self.__latencies = [0] * len(snapshot.get_history())
+        self.__last_event_times = dict.fromkeys(player_names, time.monotonic())
+        return self.__race
+
+    def record_guess(self, player_name: str, guess: int, black: int, white: int) -> int:
+        """ add a scored guess to the snapshot of the race with the time the player took for it
+        :return: the index of the player in the snapshot """
+        now = time.monotonic()
+        player_index = self.__snapshot.get_player_names().index(player_name)
+        self.__snapshot.add_guess(player_index, guess, black, white)
+        self.__latencies.append(int(1000 * (now - self.__last_event_times[player_name])))
+        self.__last_event_times[player_name] = now
+        return player_index
+
+    def get_latencies(self) -> List[int]:
+        return self.__latencies
+
+    def get_position(self, player_name: str) -> Tuple[Optional[Tuple[int, int]], List[Tuple[int, int, int]]]:
+        """ :return: the (position, value) of the peg revealed to the player and the (guess, black, white) steps of the player """
+        player_index = self.__snapshot.get_player_names().index(player_name)
+        position = self.__snapshot.get_revealed_positions()[player_index]
+        reveal = None
+        if position is not None:
+            final_values = CodeSpace.of(self.__game_rule).decode_index(self.__snapshot.get_final_code())
+            reveal = (position, final_values[position])
+        return reveal, [(guess, black, white) for index, guess, black, white in self.__snapshot.get_history() if index == player_index]
+
+    def __send_race_start(self, session: ClientSession) -> None:
+        player_index = self.__snapshot.get_player_names().index(session.get_player_name())
+        tokens = self.__snapshot.get_resume_tokens()
+        session.send(messages.PROTOCOL_START.format(room_id=self.__room_id, max_code_length=self.__game_rule.get_max_code_peg(),
+                                                    max_attempts=self.__game_rule.get_max_attempts(),
+                                                    token=tokens[player_index].hex() if tokens is not None else '-'))
+        position = self.__snapshot.get_revealed_positions()[player_index]
+        revealed_peg: Peg = self.__race.get_final_code().get_pegs()[position]
+        session.send(messages.PROTOCOL_REVEAL.format(position=position + 1, color=revealed_peg.value))
+
+    def broadcast(self, line: str) -> None:
+        """ send a line to every player and every spectator of the room, it is encoded once for all of them """
+        data = (line + '\n').encode()
+        for session in self.__sessions:
+            session.send_bytes(data)
+        self.__spectators.publish_bytes(data)
+
+    def publish_to_spectators(self, line: str) -> None:
+        self.__spectators.publish(line)
+
+    def watch(self, session: ClientSession) -> None:
+        """ add a spectator to the room, a spectator too slow to keep up skips events until its connection drains """
+        session.set_watched_room(self)
+        self.__spectators.subscribe(session, session.get_writer(), lambda subscriber: session.close())
+        session.send(messages.PROTOCOL_WATCHING.format(room_id=self.__room_id, player_count=len(self.__sessions),
+                                                       max_breakers=self.__game_rule.get_max_breakers()))
+
+    def unwatch(self, session: ClientSession) -> None:
+        self.__spectators.unsubscribe(session)
+        session.set_watched_room(None)
+
+    def get_spectators(self) -> Broadcaster:
+        return self.__spectators
+
+    def get_room_id(self) -> str:
+        return self.__room_id
+
+    def get_game_rule(self) -> GameRule:
+        return self.__game_rule
+
+    def get_race(self) -> Optional[RaceRoom]:
+        return self.__race
+
+    def get_snapshot(self) -> Optional[GameSnapshot]:
+        return self.__snapshot
+
+    def get_sessions(self) -> List[ClientSession]:
+        return self.__sessions
+
+    def get_player_names(self) -> List[str]:
+        """ :return: the names of the players connected to the room """
+        return [session.get_player_name() for session in self.__sessions]
+
+
+class GameServer:
+    """ GameServer class hosts Mastermind44 race rooms over a line based TCP protocol. A client sends JOIN <room> <name>, then
+    GUESS <code> lines, HINT for the suggested guess of its position, or WATCH <room> to follow a room as a spectator, and
+    receives the protocol lines defined in messages.py. A player rejoins a running race with JOIN <room> <name> <token>, the
+    token is the last field of its START line. STATS, MEMORY and MEMORY SNAPSHOT report on the server itself """
+
+    def __init__(self, game_rule: GameRule = MASTERMIND_GAMERULE, rng: Optional[random.Random] = None,
+                 journal: Optional[SnapshotJournal] = None, results: Optional[ResultLog] = None,
+                 hint_service: Optional[HintService] = None, memory_budget: Optional[MemoryBudget] = None,
+                 flow_control: Optional[FlowControl] = None) -> None:
+        super().__init__()
+        self._game_rule: GameRule = game_rule
+        self._rng: random.Random = rng if rng is not None else random.Random()
+        self._rooms: Dict[str, ServerRoom] = {}
+        self._registry: RaceRoomRegistry = RaceRoomRegistry()
+        self._sessions: List[ClientSession] = []
+        self._journal: Optional[SnapshotJournal] = journal
+        self._results: Optional[ResultLog] = results
+        self._hint_service: HintService = hint_service if hint_service is not None else HintService()
+        # hint requests being answered, kept so they are not garbage collected while they wait
+        self._hint_tasks: Set[asyncio.Task] = set()
+        self._memory: MemoryAccountant = MemoryAccountant(memory_budget, lambda: dict(self._rooms))
+        self._memory.add_cache('hint', self._hint_service)
+        self._flow_control: FlowControl = flow_control if flow_control is not None else FlowControl()
+        self._warm_up_task: Optional[asyncio.Task] = None
+
+    def restore(self, snapshots: Dict[str, GameSnapshot]) -> None:
+        """ bring back every live room of the snapshots read from the journal, players resume by joining their room again """
+        for room_id, snapshot in snapshots.items():
+            room = self._rooms[room_id] = ServerRoom(room_id, snapshot.get_game_rule())
+            room.restore_race(self._registry, snapshot)
+
+    def warm_up(self, rule_name: str) -> None:
+        """ build or load the tables and the opening book of the rule of the rooms off the event loop, and cache the hints of the
+        opening positions, so the first players do not wait for them. Clients are served meanwhile """
+        if self._warm_up_task is None:
+            self._warm_up_task = asyncio.ensure_future(self._warm_up(rule_name))
+
+    async def _warm_up(self, rule_name: str) -> None:
+        book = await asyncio.get_running_loop().run_in_executor(None, warm_up_rule, rule_name, self._game_rule, True)
+        for reveal, hint in book.get_hints().items():
+            self._hint_service.preload(self._game_rule, reveal, hint)
+
+    async def start(self, host: str, port: int) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self._handle_client, host, port, limit=INPUT_BUFFER_BYTES)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, received: bytes = b'') -> None:
+        """ serve one client until it quits or disconnects
+        :param received: bytes of the connection already read before it was handed to this server, by the supervisor """
+        session = ClientSession(writer)
+        self._sessions.append(session)
+        self._flow_control.start()
+        try:
+            *lines, partial = received.split(b'\n')
+            for line in lines:
+                if not self.handle_line(session, line.decode(errors='replace').strip()):
+                    return
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # the stream reader raises it for a line longer than its limit, errors of the commands are not caught here
+                    session.send(messages.PROTOCOL_ERROR.format(
+                        message=messages.SERVER_LINE_TOO_LONG.format(limit=INPUT_BUFFER_BYTES)))
+                    break
+                if not line:
+                    break
+                if not self.handle_line(session, (partial + line).decode(errors='replace').strip()):
+                    break
+                partial = b''
+                # a line already buffered is read without giving way, other clients get their turn between two lines
+                await asyncio.sleep(0)
+        except ConnectionError:
+            pass
+        finally:
+            self._disconnect(session)
+
+    def handle_line(self, session: ClientSession, line: str) -> bool:
+        """ process one protocol line of a client
+        :return: False when the client asked to quit """
+        command, _, argument = line.partition(' ')
+        command = command.upper()
+        self._memory.check()
+        refusal = self._flow_control.admit(session, session.get_address(), command, self._continues_race(command, argument))
+        if refusal is not None:
+            session.send(messages.PROTOCOL_ERROR.format(message=refusal))
+            if self._flow_control.is_flooding(session):
+                session.send(messages.PROTOCOL_ERROR.format(message=messages.SERVER_FLOODING))
+                return False
+            return True
+        try:
+            if command == 'JOIN':
+                room_id, _, player = argument.partition(' ')
+                player_name, _, resume_token = player.strip().partition(' ')
+                self._join(session, room_id, player_name, resume_token.strip())
+            elif command == 'GUESS':
+                self._guess(session, argument.strip())
+            elif command == 'HINT':
+                self._hint(session)
+            elif command == 'STATS':
+                stats = dict(self._hint_service.get_stats(), **self._flow_control.get_stats())
+                session.send(messages.PROTOCOL_STATS.format(stats=' '.join('{}={}'.format(name, value) for name, value in stats.items())))
+            elif command == 'MEMORY':
+                self._report_memory(session, argument.strip().upper() == 'SNAPSHOT')
+            elif command == 'WATCH':
+                self._watch(session, argument.strip())
+            elif command == 'QUIT':
+                return False
+            elif command:
+                raise MasterMindException(messages.SERVER_UNKNOWN_COMMAND.format(command=command))
+        except CodeParsingException:
+            session.send(messages.PROTOCOL_ERROR.format(message=messages.MessageBankInterface.get_unparsable_token_mssg(
+                self._game_rule.get_max_code_peg(), self._game_rule.allow_blank())))
+        except MasterMindException as e:
+            session.send(messages.PROTOCOL_ERROR.format(message=str(e)))
+        return True
+
+    def _continues_race(self, command: str, argument: str) -> bool:
+        """ :return: whether the line rejoins a running race, like the memory budget the loop lag does not keep those players out """
+        if command != 'JOIN':
+            return False
+        room = self._rooms.get(argument.partition(' ')[0])
+        return room is not None and room.get_race() is not None
+
+    def _join(self, session: ClientSession, room_id: str, player_name: str, resume_token: str = '') -> None:
+        if session.get_room() is not None:
+            raise MasterMindException(messages.SERVER_ALREADY_IN_ROOM.format(room_id=session.get_room().get_room_id()))
+        if not room_id or not player_name:
+            raise MasterMindException(messages.SERVER_UNKNOWN_COMMAND.format(command='JOIN'))
+        if len(room_id.encode()) > MAX_NAME_BYTES or len(player_name.encode()) > MAX_NAME_BYTES:
+            raise MasterMindException(messages.SERVER_NAME_TOO_LONG.format(limit=MAX_NAME_BYTES))
+        room = self._rooms.get(room_id)
+        # players coming back to a running race are still let in, their session is already paid for
+        if self._memory.is_refusing() and (room is None or room.get_race() is None):
+            raise MasterMindException(messages.SERVER_MEMORY_FULL)
+        if room is None:
+            room = self._rooms[room_id] = ServerRoom(room_id, self._game_rule)
+        room.add_session(session, player_name, resume_token)
+        room.broadcast(messages.PROTOCOL_JOINED.format(room_id=room_id, player_count=len(room.get_sessions()),
+                                                       max_breakers=self._game_rule.get_max_breakers()))
+        if room.is_full() and room.get_race() is None:
+            room.start_race(self._registry, self._rng)
+            if self._journal is not None:
+                self._journal.record_start(room.get_snapshot())
+
+    def _watch(self, session: ClientSession, room_id: str) -> None:
+        if session.get_room() is not None:
+            raise MasterMindException(messages.SERVER_ALREADY_IN_ROOM.format(room_id=session.get_room().get_room_id()))
+        if session.get_watched_room() is not None:
+            raise MasterMindException(messages.SERVER_ALREADY_WATCHING.format(room_id=session.get_watched_room().get_room_id()))
+        room = self._rooms.get(room_id)
+        if room is None:
+            raise MasterMindException(messages.RACE_ROOM_NOT_FOUND.format(room_id=room_id))
+        room.watch(session)
+
+    def _guess(self, session: ClientSession, guess_input: str) -> None:
+        room = session.get_room()
+        if room is None:
+            raise MasterMindException(messages.SERVER_NOT_IN_ROOM)
+        race = room.get_race()
+        if race is None:
+            raise MasterMindException(messages.SERVER_RACE_NOT_STARTED)
+        guess = Code.parse(guess_input, room.get_game_rule())
+        result: RaceGuessResult = race.submit_guess(session.get_player_name(), guess)
+        feedback = result.get_feedback()
+        guess_index = CodeSpace.of(room.get_game_rule()).encode_values(encode_code(guess))
+        player_index = room.record_guess(session.get_player_name(), guess_index, feedback.get_black_count(), feedback.get_white_count())
+        if self._journal is not None:
+            self._journal.record_guess(room.get_room_id(), player_index, guess_index, feedback.get_black_count(),
+                                       feedback.get_white_count())
+        session.send(messages.PROTOCOL_FEEDBACK.format(attempt=result.get_attempt(), black=feedback.get_black_count(),
+                                                       white=feedback.get_white_count()))
+        room.publish_to_spectators(messages.PROTOCOL_GUESSED.format(who=result.get_player_name(), attempt=result.get_attempt(),
+                                                                   code=''.join(peg.value for peg in guess.get_pegs()),
+                                                                   black=feedback.get_black_count(), white=feedback.get_white_count()))
+        if result.is_winning():
+            room.broadcast(messages.PROTOCOL_WINNER.format(who=result.get_player_name(), attempt=result.get_attempt(),
+                                                           rank=result.get_rank()))
+        if race.finish_if_done(room.get_player_names()):
+            self._finish_room(room)
+
+    def _hint(self, session: ClientSession) -> None:
+        """ answer with the suggested guess of the position of the player once the hint service has it, other lines of the
+        client are processed meanwhile """
+        room = session.get_room()
+        if room is None:
+            raise MasterMindException(messages.SERVER_NOT_IN_ROOM)
+        if room.get_race() is None:
+            raise MasterMindException(messages.SERVER_RACE_NOT_STARTED)
+        if session.get_pending_hints() >= MAX_PENDING_HINTS:
+            raise MasterMindException(messages.SERVER_HINT_PENDING)
+        reveal, steps = room.get_position(session.get_player_name())
+        session.add_pending_hints(1)
+        task = asyncio.ensure_future(self._send_hint(session, room.get_game_rule(), reveal, steps))
+        self._hint_tasks.add(task)
+        task.add_done_callback(self._hint_tasks.discard)
+
+    async def _send_hint(self, session: ClientSession, game_rule: GameRule, reveal: Optional[Tuple[int, int]],
+                         steps: List[Tuple[int, int, int]]) -> None:
+        try:
+            hint = await self._hint_service.get_hint(game_rule, reveal, steps)
+        except MasterMindException as e:
+            session.send(messages.PROTOCOL_ERROR.format(message=str(e)))
+            return
+        finally:
+            session.add_pending_hints(-1)
+        code = decode_code(CodeSpace.of(game_rule).decode_index(hint.get_guess()))
+        session.send(messages.PROTOCOL_HINT.format(code=''.join(peg.value for peg in code.get_pegs()),
+                                                   candidates=hint.get_candidate_count()))
+
+    def _report_memory(self, session: ClientSession, snapshot: bool) -> None:
+        """ send the bytes of every table, cache and room and the process memory, or the source lines holding the most
+        memory from a tracemalloc snapshot """
+        if not snapshot:
+            session.send(messages.PROTOCOL_MEMORY.format(sizes=' '.join(
+                '{}:{}={}'.format(category, name, size) for category, sizes in self._memory.report().items()
+                for name, size in sizes.items())))
+            return
+        allocations = self._memory.take_snapshot()
+        session.send(messages.PROTOCOL_ALLOCATIONS.format(count=len(allocations)))
+        for where, size, size_diff, blocks in allocations:
+            session.send(messages.PROTOCOL_ALLOCATION.format(where=where, size=size, size_diff=size_diff, blocks=blocks))
+
+    def _finish_room(self, room: ServerRoom) -> None:
+        """ announce the final code and release the room, its players can join a new one """
+        room.broadcast(messages.PROTOCOL_GAME_OVER.format(final_code=''.join(peg.value for peg in room.get_race().get_final_code().get_pegs())))
+        if self._results is not None:
+            self._results.record(room.get_snapshot(), room.get_latencies())
+        for session in list(room.get_sessions()):
+            room.remove_session(session)
+        self._remove_room(room)
+
+    def _remove_room(self, room: ServerRoom) -> None:
+        for spectator in room.get_spectators().get_subscriber_keys():
+            room.unwatch(spectator)
+        self._rooms.pop(room.get_room_id(), None)
+        self._registry.remove_room(room.get_room_id())
+        if self._journal is not None:
+            self._journal.record_end(room.get_room_id())
+
+    def _disconnect(self, session: ClientSession) -> None:
+        room = session.get_room()
+        if room is not None:
+            room.remove_session(session)
+            if not room.get_sessions():
+                self._remove_room(room)
+            elif room.get_race() is not None and room.get_race().finish_if_done(room.get_player_names()):
+                # the players still connected are all done, the race does not wait for the one who left
+                self._finish_room(room)
+        if session.get_watched_room() is not None:
+            session.get_watched_room().unwatch(session)
+        if session in self._sessions:
+            self._sessions.remove(session)
+        self._flow_control.remove_session(session)
+        session.close()
+
+    def get_session_count(self) -> int:
+        return len(self._sessions)
+
+    def get_room_count(self) -> int:
+        return len(self._rooms)
+
+    def get_hint_service(self) -> HintService:
+        return self._hint_service
+
+    def get_memory(self) -> MemoryAccountant:
+        return self._memory
+
+
+# options of add_server_arguments, a supervisor passes them on to every worker
+SERVER_OPTIONS = ('--hint-cache', '--hint-ttl', '--memory-budget', '--cache-budget', '--session-rate', '--session-burst',
+                  '--address-rate', '--address-burst', '--max-loop-lag', '--tracemalloc')
+
+
+def add_server_arguments(parser: argparse.ArgumentParser) -> None:
+    """ add the options of the hint cache, the memory budget and the flow control of a server, listed in SERVER_OPTIONS """
+    parser.add_argument('--hint-cache', type=int, default=HINT_CACHE_ENTRIES, help='hints of this many positions are kept')
+    parser.add_argument('--hint-ttl', type=float, default=HINT_TTL_SECONDS, help='seconds a hint stays cached')
+    parser.add_argument('--memory-budget', type=float, help='MiB of memory over which caches are evicted and new players refused')
+    parser.add_argument('--cache-budget', type=float, help='MiB of memory the caches are evicted down to')
+    parser.add_argument('--session-rate', type=float, default=SESSION_RATE, help='lines per second taken from a player, 0 for no limit')
+    parser.add_argument('--session-burst', type=float, default=SESSION_BURST)
+    parser.add_argument('--address-rate', type=float, default=ADDRESS_RATE, help='lines per second taken from an address, 0 for no limit')
+    parser.add_argument('--address-burst', type=float, default=ADDRESS_BURST)
+    parser.add_argument('--max-loop-lag', type=float, default=MAX_LOOP_LAG,
+                        help='seconds of event loop lag over which new games and hints are refused, 0 to never refuse them')
+    parser.add_argument('--tracemalloc', action='store_true', help='trace allocations from the start for MEMORY SNAPSHOT')
+
+
+def get_server_arguments(args: argparse.Namespace) -> List[str]:
+    """ :return: the options of add_server_arguments with their parsed values, as command line arguments for another process """
+    arguments: List[str] = []
+    for option in SERVER_OPTIONS:
+        value = getattr(args, option[2:].replace('-', '_'))
+        if value is True:
+            arguments.append(option)
+        elif value is not None and value is not False:
+            arguments += [option, repr(value)]
+    return arguments
+
+
+def create_server_limits(args: argparse.Namespace) -> Tuple[HintService, MemoryBudget, FlowControl]:
+    """ start tracing allocations when asked
+    :return: the hint service, the memory budget and the flow control asked for by the options of add_server_arguments """
+    if args.tracemalloc:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    budget = MemoryBudget(None if args.memory_budget is None else int(args.memory_budget * MIB),
+                          None if args.cache_budget is None else int(args.cache_budget * MIB))
+    return (HintService(args.hint_cache, args.hint_ttl), budget,
+            FlowControl(args.session_rate, args.session_burst, args.address_rate, args.address_burst, args.max_loop_lag))
+
+
+async def serve(host: str, port: int, journal_path: Optional[str] = None, results_path: Optional[str] = None,
+                hint_service: Optional[HintService] = None, memory_budget: Optional[MemoryBudget] = None,
+                flow_control: Optional[FlowControl] = None, rule_name: str = 'mastermind44', warm_up: bool = False) -> None:
+    from constants import GAMERULES_BY_NAME
+    journal, snapshots = SnapshotJournal.open(journal_path) if journal_path is not None else (None, {})
+    results = ResultLog(results_path) if results_path is not None else None
+    game_server = GameServer(GAMERULES_BY_NAME[rule_name], journal=journal, results=results, hint_service=hint_service,
+                             memory_budget=memory_budget, flow_control=flow_control)
+    game_server.restore(snapshots)
+    if warm_up:
+        game_server.warm_up(rule_name)
+    server = await game_server.start(host, port)
+    print(messages.SERVER_LISTENING.format(host=host, port=server.sockets[0].getsockname()[1]), flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    from constants import GAMERULES_BY_NAME
+    parser = argparse.ArgumentParser(description='Host Mastermind44 race rooms over TCP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4444, help='0 picks a free port')
+    parser.add_argument('--journal', help='checkpoint live games to this file and resume them from it on start')
+    parser.add_argument('--results', help='append every finished game to this file for analytics.py')
+    add_server_arguments(parser)
+    parser.add_argument('--rule', default='mastermind44', choices=sorted(GAMERULES_BY_NAME.keys()),
+                        help='rule of the rooms, from the rules file named by MASTERMIND_RULES')
+    parser.add_argument('--warm-up', action='store_true', help='build the tables and opening hints of the rule before the first game')
+    args = parser.parse_args()
+    hint_service, budget, flow_control = create_server_limits(args)
+    try:
+        asyncio.run(serve(args.host, args.port, args.journal, args.results, hint_service, budget, flow_control, args.rule, args.warm_up))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,256 @@
+import os
+import struct
+from array import array
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from models import GameRule
+
+# record types of the journal, every record is written as type, payload length, payload
+START_RECORD = 1
+GUESS_RECORD = 2
+END_RECORD = 3
+
+RECORD_HEADER = struct.Struct('<BI')
+RULE_FORMAT = struct.Struct('<?BB?B')
+GUESS_FORMAT = struct.Struct('<BIBB')
+GUESS_RECORD_FORMAT = struct.Struct('<IBIBB')
+SESSION_KEY_FORMAT = struct.Struct('<I')
+RESULT_HEADER = struct.Struct('<IH')
+# a session id or a player name is written as its length in bytes followed by its UTF-8 bytes
+TEXT_LENGTH_FORMAT = struct.Struct('<H')
+NO_REVEAL = 255
+
+# bytes of the token a player of a running game rejoins it with
+RESUME_TOKEN_BYTES = 8
+
+# one guess of the history as (player index, guess code space index, black, white)
+HistoryEntry = Tuple[int, int, int, int]
+
+
+class GameSnapshot:
+    """ GameSnapshot class represents everything needed to resume a game: the rule, the players, the final code, the guesses so far
+    and the position revealed to every player in Mastermind44. Codes are kept as their code space index """
+
+    def __init__(self, session_id: str, game_rule: GameRule, player_names: List[str], final_code: int,
+                 revealed_positions: Optional[List[Optional[int]]] = None, history: Optional[List[HistoryEntry]] = None,
+                 resume_tokens: Optional[List[bytes]] = None) -> None:
+        super().__init__()
+        self.__session_id: str = session_id
+        self.__game_rule: GameRule = game_rule
+        self.__player_names: List[str] = player_names
+        self.__final_code: int = final_code
+        self.__revealed_positions: List[Optional[int]] = revealed_positions or [None] * len(player_names)
+        self.__history: List[HistoryEntry] = history or []
+        # secret of every player to rejoin the game with, None for games that are not rejoined over the network
+        self.__resume_tokens: Optional[List[bytes]] = resume_tokens
+
+    def add_guess(self, player_index: int, guess: int, black: int, white: int) -> None:
+        self.__history.append((player_index, guess, black, white))
+
+    def get_session_id(self) -> str:
+        return self.__session_id
+
+    def get_game_rule(self) -> GameRule:
+        return self.__game_rule
+
+    def get_player_names(self) -> List[str]:
+        return self.__player_names
+
+    def get_final_code(self) -> int:
+        return self.__final_code
+
+    def get_revealed_positions(self) -> List[Optional[int]]:
+        return self.__revealed_positions
+
+    def get_history(self) -> List[HistoryEntry]:
+        return self.__history
+
+    def get_resume_tokens(self) -> Optional[List[bytes]]:
+        return self.__resume_tokens
+
+    def encode(self, include_tokens: bool = True) -> bytes:
+        """ :param: include_tokens: whether the resume tokens are kept, they are left out of a finished game
+        :return: the compact binary form of the snapshot, the resume tokens follow the history when there are some """
+        rule = self.__game_rule
+        parts = [GameSnapshot.__encode_text(self.__session_id),
+                 RULE_FORMAT.pack(rule.is_computer_code_maker(), rule.get_max_breakers(), rule.get_max_attempts(), rule.allow_blank(),
+                                  rule.get_max_code_peg()),
+                 struct.pack('<IB', self.__final_code, len(self.__player_names))]
+        for player_name, position in zip(self.__player_names, self.__revealed_positions):
+            parts.append(GameSnapshot.__encode_text(player_name))
+            parts.append(struct.pack('<B', NO_REVEAL if position is None else position))
+        parts.append(struct.pack('<H', len(self.__history)))
+        parts.extend(GUESS_FORMAT.pack(*entry) for entry in self.__history)
+        if include_tokens and self.__resume_tokens is not None:
+            parts.append(struct.pack('<B', len(self.__resume_tokens)))
+            parts.extend(self.__resume_tokens)
+        return b''.join(parts)
+
+    @staticmethod
+    def decode(data: bytes) -> "GameSnapshot":
+        """ :return: the snapshot of the binary form made by encode """
+        session_id, offset = GameSnapshot.__decode_text(data, 0)
+        is_computer_code_maker, max_breakers, max_attempts, allow_blank, max_code_peg = RULE_FORMAT.unpack_from(data, offset)
+        offset += RULE_FORMAT.size
+        final_code, player_count = struct.unpack_from('<IB', data, offset)
+        offset += 5
+        player_names, revealed_positions = [], []
+        for i in range(player_count):
+            player_name, offset = GameSnapshot.__decode_text(data, offset)
+            position = data[offset]
+            offset += 1
+            player_names.append(player_name)
+            revealed_positions.append(None if position == NO_REVEAL else position)
+        history_count, = struct.unpack_from('<H', data, offset)
+        offset += 2
+        history = [GUESS_FORMAT.unpack_from(data, offset + i * GUESS_FORMAT.size) for i in range(history_count)]
+        offset += history_count * GUESS_FORMAT.size
+        resume_tokens = None
+        if offset < len(data):
+            resume_tokens = [data[offset + 1 + i * RESUME_TOKEN_BYTES:offset + 1 + (i + 1) * RESUME_TOKEN_BYTES]
+                             for i in range(data[offset])]
+        game_rule = GameRule(is_computer_code_maker, max_breakers, max_attempts, allow_blank, max_code_peg)
+        return GameSnapshot(session_id, game_rule, player_names, final_code, revealed_positions, history, resume_tokens)
+
+    @staticmethod
+    def __encode_text(text: str) -> bytes:
+        encoded = text.encode()
+        return TEXT_LENGTH_FORMAT.pack(len(encoded)) + encoded
+
+    @staticmethod
+    def __decode_text(data: bytes, offset: int) -> Tuple[str, int]:
+        length, = TEXT_LENGTH_FORMAT.unpack_from(data, offset)
+        offset += TEXT_LENGTH_FORMAT.size
+        return data[offset:offset + length].decode(), offset + length
+
+
+class SnapshotJournal:
+    """ SnapshotJournal class checkpoints live games to an append-only file. A game is written in full once when it starts, then
+    every guess only appends a 16 byte record, and a finished game appends an end record. Opening the journal replays it into
+    the snapshots of every live game and rewrites the file with only those """
+
+    def __init__(self, path: str, sync: bool = False) -> None:
+        super().__init__()
+        self.__path: str = path
+        self.__sync: bool = sync
+        self.__file: Optional[BinaryIO] = None
+        self.__session_keys: Dict[str, int] = {}
+        self.__next_session_key: int = 0
+
+    @staticmethod
+    def open(path: str, sync: bool = False) -> Tuple["SnapshotJournal", Dict[str, GameSnapshot]]:
+        """ read back the live games of the journal and start a compacted journal holding them
+        :param: path: the journal file, sync: whether every record is forced to disk
+        :return: the journal to keep checkpointing into, and the snapshots of the live games by session id """
+        snapshots = SnapshotJournal.load(path) if os.path.exists(path) else {}
+        journal = SnapshotJournal(path, sync)
+        journal.__compact(list(snapshots.values()))
+        return journal, snapshots
+
+    @staticmethod
+    def load(path: str) -> Dict[str, GameSnapshot]:
+        """ :return: the snapshots of every game of the journal that did not end, by session id. A record cut short by a crash
+        is ignored """
+        snapshots_by_key: Dict[int, GameSnapshot] = {}
+        with open(path, 'rb') as journal_file:
+            data = journal_file.read()
+        offset = 0
+        while offset + RECORD_HEADER.size <= len(data):
+            record_type, length = RECORD_HEADER.unpack_from(data, offset)
+            payload = data[offset + RECORD_HEADER.size:offset + RECORD_HEADER.size + length]
+            if len(payload) < length:
+                break
+            offset += RECORD_HEADER.size + length
+            session_key, = SESSION_KEY_FORMAT.unpack_from(payload, 0)
+            if record_type == START_RECORD:
+                snapshots_by_key[session_key] = GameSnapshot.decode(payload[SESSION_KEY_FORMAT.size:])
+            elif record_type == GUESS_RECORD and session_key in snapshots_by_key:
+                snapshots_by_key[session_key].add_guess(*GUESS_RECORD_FORMAT.unpack(payload)[1:])
+            elif record_type == END_RECORD:
+                snapshots_by_key.pop(session_key, None)
+        return {snapshot.get_session_id(): snapshot for snapshot in snapshots_by_key.values()}
+
+    def record_start(self, snapshot: GameSnapshot) -> None:
+        """ checkpoint a whole game, used when it starts """
+        session_key = self.__next_session_key
+        self.__next_session_key += 1
+        self.__session_keys[snapshot.get_session_id()] = session_key
+        self.__write(START_RECORD, SESSION_KEY_FORMAT.pack(session_key) + snapshot.encode())
+
+    def record_guess(self, session_id: str, player_index: int, guess: int, black: int, white: int) -> None:
+        """ checkpoint one guess of a started game """
+        self.__write(GUESS_RECORD, GUESS_RECORD_FORMAT.pack(self.__session_keys[session_id], player_index, guess, black, white))
+
+    def record_end(self, session_id: str) -> None:
+        """ mark the game as over, it is not restored anymore """
+        session_key = self.__session_keys.pop(session_id, None)
+        if session_key is not None:
+            self.__write(END_RECORD, SESSION_KEY_FORMAT.pack(session_key))
+
+    def get_live_session_count(self) -> int:
+        return len(self.__session_keys)
+
+    def __compact(self, snapshots: List[GameSnapshot]) -> None:
+        """ replace the journal file by the start records of the given games only """
+        temporary_path = self.__path + '.tmp'
+        self.__file = open(temporary_path, 'wb')
+        for snapshot in snapshots:
+            self.record_start(snapshot)
+        self.__file.flush()
+        os.fsync(self.__file.fileno())
+        self.__file.close()
+        os.replace(temporary_path, self.__path)
+        self.__file = open(self.__path, 'ab', buffering=0)
+
+    def __write(self, record_type: int, payload: bytes) -> None:
+        # one unbuffered write per record, so a crash loses at most the record being written
+        self.__file.write(RECORD_HEADER.pack(record_type, len(payload)) + payload)
+        if self.__sync:
+            os.fsync(self.__file.fileno())
+
+    def close(self) -> None:
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+
+
+class ResultLog:
+    """ ResultLog class appends every finished game to a file of results, for the analytics to stream over later. A result is the
+    snapshot of the finished game followed by how many milliseconds every guess of its history took """
+
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        self.__file: BinaryIO = open(path, 'ab', buffering=0)
+
+    def record(self, snapshot: GameSnapshot, latencies: List[int]) -> None:
+        """ append a finished game
+        :param: snapshot: the game with its whole history, latencies: milliseconds of every guess of the history, in order """
+        encoded = snapshot.encode(include_tokens=False)
+        self.__file.write(RESULT_HEADER.pack(len(encoded), len(latencies)) + encoded + array('I', latencies).tobytes())
+
+    @staticmethod
+    def read(path: str, chunk_size: int = 1 << 20) -> Iterator[Tuple[GameSnapshot, List[int]]]:
+        """ stream the games of a result file one at a time, only a chunk of the file is held in memory. A result cut short by a
+        crash ends the stream
+        :return: the snapshot and the guess latencies of every game, in the order they finished """
+        with open(path, 'rb') as result_file:
+            data, offset, needed = b'', 0, RESULT_HEADER.size
+            while True:
+                if len(data) - offset < needed:
+                    chunk = result_file.read(max(chunk_size, needed))
+                    if not chunk:
+                        return
+                    data, offset = data[offset:] + chunk, 0
+                    continue
+                snapshot_length, latency_count = RESULT_HEADER.unpack_from(data, offset)
+                needed = RESULT_HEADER.size + snapshot_length + 4 * latency_count
+                if len(data) - offset < needed:
+                    continue
+                start = offset + RESULT_HEADER.size
+                latencies = array('I')
+                latencies.frombytes(data[start + snapshot_length:offset + needed])
+                yield GameSnapshot.decode(data[start:start + snapshot_length]), latencies.tolist()
+                offset, needed = offset + needed, RESULT_HEADER.size
+
+    def close(self) -> None:
+        self.__file.close()
@@ -0,0 +1,262 @@
+import copy
+import itertools
+import random
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple, Type
+
+from codespace import CodeSpace
+from hints import SUGGESTION_BUDGET, CandidateTracker
+from models import GameRule, Peg
+from prior import SecretPrior
+from scoring import CodeValues, score
+from scoring_backends import ScoringBackend, get_backend
+
+Feedback = Tuple[int, int]
+
+
+class BreakerStrategy(ABC):
+    """ BreakerStrategy interface for a computer code breaker, guesses and feedback are given as code space indexes and
+    (black, white) counts so strategies can be played at full speed without building Code objects """
+
+    # whether the strategy always plays the same guess in the same position, which lets a verifier walk its decision tree
+    DETERMINISTIC: bool = False
+
+    def __init__(self, game_rule: GameRule, rng: random.Random) -> None:
+        super().__init__()
+        self._game_rule: GameRule = game_rule
+        self._rng: random.Random = rng
+        self._tracker: CandidateTracker = CandidateTracker(game_rule)
+
+    @abstractmethod
+    def next_guess(self) -> int:
+        """ :return: the code space index of the next guess """
+        pass
+
+    def observe(self, guess: int, feedback: Feedback) -> None:
+        """ narrow down the possible codes with the feedback of the last guess """
+        self._tracker.add_feedback_index(guess, feedback[0], feedback[1])
+
+    def reveal_peg(self, position: int, peg: Peg) -> None:
+        """ narrow down the possible codes with a peg revealed by the game """
+        self._tracker.reveal_peg(position, peg)
+
+    def learn_secret(self, secret: int) -> None:
+        """ called with the code space index of the secret once a game is over, strategies that learn from the makers use it """
+        pass
+
+    def fork(self) -> "BreakerStrategy":
+        """ :return: a copy of the strategy in its current position, which then observes feedback on its own """
+        strategy = copy.copy(self)
+        strategy._tracker = self._tracker.copy()
+        return strategy
+
+    def get_candidate_count(self) -> int:
+        return self._tracker.get_candidate_count()
+
+    def get_candidates(self) -> List[int]:
+        """ :return: the code space indexes of the codes still possible """
+        return self._tracker.get_candidates()
+
+
+class FirstConsistentBreaker(BreakerStrategy):
+    """ FirstConsistentBreaker class always guesses the first code that is still possible """
+
+    DETERMINISTIC = True
+
+    def next_guess(self) -> int:
+        return self._tracker.get_candidates()[0]
+
+
+class RandomConsistentBreaker(BreakerStrategy):
+    """ RandomConsistentBreaker class guesses a random code among the codes that are still possible """
+
+    def next_guess(self) -> int:
+        return self._rng.choice(self._tracker.get_candidates())
+
+
+class MinimaxBreaker(BreakerStrategy):
+    """ MinimaxBreaker class guesses the code that leaves the smallest worst-case number of possible codes, it always plays the
+    same guess in the same position so repeated positions are answered by the partition cache """
+
+    DETERMINISTIC = True
+
+    def next_guess(self) -> int:
+        return self._tracker.suggest_index()
+
+
+class PriorBreaker(BreakerStrategy):
+    """ PriorBreaker class weights the possible codes by a SecretPrior learned from the secrets of past games, and guesses the code
+    that leaves the smallest expected weight of possible codes. Against makers that do not pick uniformly, like people, it needs
+    fewer guesses than the uniform strategies. The weight of every code and the guesses played are kept for the breakers of the
+    same prior and code shape until the prior starts a new epoch, so a move costs no weight computation and repeated positions
+    like the opening are as cheap as the cached moves of MinimaxBreaker """
+
+    # upper bound of scored (guess, candidate) pairs per move, every pair also adds its weight in Python so it is well below the one
+    # of hints, which keeps a move as cheap as one of MinimaxBreaker
+    BUDGET: int = SUGGESTION_BUDGET // 16
+
+    # per prior and blank flag, the epoch they were made in, the guess of every position by candidates fingerprint, and the weight
+    # of every code by code space index. Priors are shared per code length, the blank flag tells apart the spaces of that length
+    __epochs: Dict[Tuple[int, bool], Tuple[int, Dict[bytes, int], List[float]]] = {}
+
+    def __init__(self, game_rule: GameRule, rng: random.Random, prior: Optional[SecretPrior] = None) -> None:
+        super().__init__(game_rule, rng)
+        self.__prior: SecretPrior = prior if prior is not None else SecretPrior.shared(game_rule.get_max_code_peg())
+        self.__scoring: ScoringBackend = get_backend(game_rule)
+        self.__max_code_peg: int = game_rule.get_max_code_peg()
+        self.__allow_blank: bool = game_rule.allow_blank()
+
+    def next_guess(self) -> int:
+        candidates = self._tracker.get_candidates()
+        book, weights = self.__get_epoch()
+        if len(candidates) <= 2:
+            return max(candidates, key=weights.__getitem__)
+        guess = book.get(self._tracker.get_fingerprint())
+        if guess is not None:
+            return guess
+        pool = candidates
+        pool_size = max(1, PriorBreaker.BUDGET // len(candidates))
+        if len(candidates) > pool_size:
+            # the most likely codes are always tried, the rest of the pool is sampled
+            likely = sorted(candidates, key=weights.__getitem__, reverse=True)[:pool_size // 2]
+            pool = likely + self._rng.sample(candidates, pool_size - len(likely))
+        code_space = self._tracker.get_code_space()
+        all_values = code_space.get_all_values()
+        all_counts = code_space.get_all_counts()
+        candidate_values = [all_values[index] for index in candidates]
+        candidate_counts = [all_counts[index] for index in candidates]
+        candidate_weights = [weights[index] for index in candidates]
+        best_index, best_mass = pool[0], None
+        for guess_index in pool:
+            masses: Dict[Feedback, float] = {}
+            for feedback, weight in zip(self.__scoring.score_batch(all_values[guess_index], candidate_values, candidate_counts),
+                                        candidate_weights):
+                masses[feedback] = masses.get(feedback, 0.0) + weight
+            # the weight left when the guess wins is nothing, so likely guesses are favoured
+            expected_mass = sum(mass * mass for feedback, mass in masses.items() if feedback[0] != self.__max_code_peg)
+            if best_mass is None or expected_mass < best_mass:
+                best_index, best_mass = guess_index, expected_mass
+        book[self._tracker.get_fingerprint()] = best_index
+        return best_index
+
+    def learn_secret(self, secret: int) -> None:
+        self.__prior.observe_secret(self._tracker.get_code_space().decode_index(secret))
+
+    def __get_epoch(self) -> Tuple[Dict[bytes, int], List[float]]:
+        """ :return: the book and the code weights of the current epoch of the prior, made again when a new epoch started """
+        key = (id(self.__prior), self.__allow_blank)
+        epoch, book, weights = PriorBreaker.__epochs.get(key, (None, None, None))
+        if epoch != self.__prior.get_epoch():
+            book, weights = {}, self.__prior.weights(self._tracker.get_code_space().get_all_values())
+            PriorBreaker.__epochs[key] = (self.__prior.get_epoch(), book, weights)
+        return book, weights
+
+
+class TeamBreaker(BreakerStrategy):
+    """ TeamBreaker class plays every computer breaker of a Mastermind44 team from one shared candidate index. The pegs revealed
+    to each teammate and the feedback of every guess of the team narrow down the same index, so it is filtered once per guess
+    instead of once per teammate, and every guess is the one expected to tell the whole team the most """
+
+    DETERMINISTIC = True
+
+    def next_guess(self) -> int:
+        return self._tracker.suggest_informative_index()
+
+
+class MakerStrategy(ABC):
+    """ MakerStrategy interface for a computer code maker that answers guesses with (black, white) feedback """
+
+    def __init__(self, game_rule: GameRule, rng: random.Random) -> None:
+        super().__init__()
+        self._code_space: CodeSpace = CodeSpace.of(game_rule)
+        self._rng: random.Random = rng
+
+    @abstractmethod
+    def respond(self, guess: int) -> Feedback:
+        """ :return: the feedback to the guess given by its code space index """
+        pass
+
+
+class SecretMaker(MakerStrategy, ABC):
+    """ SecretMaker class represents a maker that commits to one secret before the first guess """
+
+    def __init__(self, game_rule: GameRule, rng: random.Random) -> None:
+        super().__init__(game_rule, rng)
+        self._secret: int = self._pick_secret()
+
+    @abstractmethod
+    def _pick_secret(self) -> int:
+        pass
+
+    def respond(self, guess: int) -> Feedback:
+        all_values = self._code_space.get_all_values()
+        return score(all_values[guess], all_values[self._secret])
+
+
+class RandomMaker(SecretMaker):
+    """ RandomMaker class picks the secret uniformly like ComputerCodeMaker """
+
+    def _pick_secret(self) -> int:
+        return self._rng.randrange(self._code_space.size())
+
+
+class BiasedMaker(SecretMaker):
+    """ BiasedMaker class picks secrets the way people tend to, favouring a few colours and avoiding repeated pegs """
+
+    # relative weight of every peg value, in PEG_ORDER
+    PEG_WEIGHTS: List[float] = [4.0, 1.0, 2.0, 3.0, 2.0, 1.0, 0.5]
+    REPEAT_PENALTY: float = 0.25
+
+    __cumulative_weights: Dict[int, List[float]] = {}
+
+    def _pick_secret(self) -> int:
+        cumulative_weights = BiasedMaker.__cumulative_weights.get(id(self._code_space))
+        if cumulative_weights is None:
+            cumulative_weights = BiasedMaker.__cumulative_weights[id(self._code_space)] = list(itertools.accumulate(
+                self.__weight(values) for values in self._code_space.get_all_values()))
+        return self._rng.choices(range(self._code_space.size()), cum_weights=cumulative_weights)[0]
+
+    @staticmethod
+    def __weight(values: CodeValues) -> float:
+        weight = BiasedMaker.REPEAT_PENALTY ** (len(values) - len(set(values)))
+        for value in values:
+            weight *= BiasedMaker.PEG_WEIGHTS[value]
+        return weight
+
+
+class AdversarialMaker(MakerStrategy):
+    """ AdversarialMaker class never commits to a secret, it answers every guess with the feedback that keeps the most codes
+    possible, so it is always consistent with some secret while making the breaker work as hard as it can """
+
+    def __init__(self, game_rule: GameRule, rng: random.Random) -> None:
+        super().__init__(game_rule, rng)
+        self.__candidates: List[int] = list(range(self._code_space.size()))
+        self.__scoring: ScoringBackend = get_backend(game_rule)
+
+    def respond(self, guess: int) -> Feedback:
+        all_values = self._code_space.get_all_values()
+        all_counts = self._code_space.get_all_counts()
+        guess_values = all_values[guess]
+        partition: Dict[Feedback, List[int]] = {}
+        candidate_values = [all_values[index] for index in self.__candidates]
+        candidate_counts = [all_counts[index] for index in self.__candidates]
+        for index, feedback in zip(self.__candidates, self.__scoring.score_batch(guess_values, candidate_values, candidate_counts)):
+            partition.setdefault(feedback, []).append(index)
+        # a winning answer is only given when nothing else is left
+        feedback = max(partition, key=lambda key: (len(partition[key]), key[0] != len(guess_values)))
+        self.__candidates = partition[feedback]
+        return feedback
+
+
+BREAKER_STRATEGIES: Dict[str, Type[BreakerStrategy]] = {
+    'first-consistent': FirstConsistentBreaker,
+    'random-consistent': RandomConsistentBreaker,
+    'minimax': MinimaxBreaker,
+    'prior': PriorBreaker,
+}
+
+MAKER_STRATEGIES: Dict[str, Type[MakerStrategy]] = {
+    'random': RandomMaker,
+    'biased': BiasedMaker,
+    'adversarial': AdversarialMaker,
+}
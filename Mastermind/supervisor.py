@@ -0,0 +1,415 @@
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import sys
+from typing import Dict, List, Optional, Set, Tuple
+
+import messages
+from constants import MASTERMIND_GAMERULE
+from flow_control import INPUT_BUFFER_BYTES, FlowControl
+from hint_service import HintService
+from memory import MemoryBudget
+from models import GameRule
+from server import ClientSession, GameServer, ServerRoom, add_server_arguments, create_server_limits, get_server_arguments
+from snapshot import GameSnapshot, ResultLog, SnapshotJournal
+
+SUPERVISOR_SCRIPT = os.path.abspath(__file__)
+
+# the first line of a connection decides its worker, a client that sends no full line in time or a too long one is dropped
+FIRST_LINE_TIMEOUT = 30.0
+MAX_FIRST_LINE = 1024
+
+# seconds the supervisor waits for draining workers to finish their games before it stops them
+DRAIN_TIMEOUT = 600.0
+
+# largest message on the control socket between the supervisor and a worker, a handed over connection carries its pending line
+CONTROL_MESSAGE_SIZE = 1 << 17
+
+
+def get_room_id(line: str) -> str:
+    """ :return: the room a protocol line joins or watches, read the same way the GameServer does, empty for other lines """
+    command, _, argument = line.partition(' ')
+    command = command.upper()
+    if command == 'JOIN':
+        return argument.partition(' ')[0]
+    if command == 'WATCH':
+        return argument.strip()
+    return ''
+
+
+class WorkerServer(GameServer):
+    """ WorkerServer class is the GameServer of one worker process of the supervisor. It gets its connections from the supervisor
+    together with the room they join, hosts the rooms placed on it, and hands a connection back to the supervisor when its client
+    joins or watches a room that is not here. Clients wait for the reply to JOIN or WATCH before sending more, as the protocol
+    clients do, so nothing is left behind when a connection moves """
+
+    def __init__(self, control: socket.socket, game_rule: GameRule = MASTERMIND_GAMERULE, journal: Optional[SnapshotJournal] = None,
+                 results: Optional[ResultLog] = None, hint_service: Optional[HintService] = None,
+                 memory_budget: Optional[MemoryBudget] = None, flow_control: Optional[FlowControl] = None) -> None:
+        super().__init__(game_rule, journal=journal, results=results, hint_service=hint_service, memory_budget=memory_budget,
+                         flow_control=flow_control)
+        self.__control: socket.socket = control
+        self.__placed_rooms: Set[str] = set()
+        # sessions that leave this worker for another one, with the JOIN or WATCH line to replay there
+        self.__moving: Dict[ClientSession, str] = {}
+        # whether the line handled next is the first one of a connection the supervisor routed here, which is never sent back
+        self.__routed: bool = False
+        self.__last_sequence: int = 0
+        self.__draining: bool = False
+        self.__tasks: Set[asyncio.Future] = set()
+        self.__stopped: Optional[asyncio.Future] = None
+
+    def restore(self, snapshots: Dict[str, GameSnapshot]) -> None:
+        super().restore(snapshots)
+        for room_id in snapshots:
+            self.__placed_rooms.add(room_id)
+            self.__control.send(b'OPENED ' + room_id.encode())
+
+    async def serve_control(self) -> None:
+        """ take connections and orders from the supervisor until the worker is drained or the supervisor is gone """
+        loop = asyncio.get_running_loop()
+        self.__stopped = loop.create_future()
+        loop.add_reader(self.__control.fileno(), self.__read_control)
+        try:
+            await self.__stopped
+        finally:
+            loop.remove_reader(self.__control.fileno())
+
+    def __read_control(self) -> None:
+        try:
+            data, fds, _, _ = socket.recv_fds(self.__control, CONTROL_MESSAGE_SIZE, 1, socket.MSG_DONTWAIT)
+        except BlockingIOError:
+            return
+        except ConnectionError:
+            data, fds = b'', []
+        if not data:
+            self.__stop()
+            return
+        kind, _, rest = data.partition(b' ')
+        if kind == b'CONN':
+            sequence, room_id, received = rest.split(b' ', 2)
+            self.__last_sequence = int(sequence)
+            if room_id != b'-':
+                self.__placed_rooms.add(room_id.decode())
+            task = asyncio.ensure_future(self.__accept(fds[0], received))
+            self.__tasks.add(task)
+            task.add_done_callback(self.__tasks.discard)
+        elif kind == b'DRAIN':
+            self.__draining = True
+            self.__stop_when_idle()
+
+    async def __accept(self, fd: int, received: bytes) -> None:
+        reader, writer = await asyncio.open_connection(sock=socket.socket(fileno=fd), limit=INPUT_BUFFER_BYTES)
+        # the received lines are handled before the client coroutine first waits, so the flag only covers the routed line. A
+        # room the supervisor does not know is watched here and not found, instead of going back and forth
+        self.__routed = True
+        await self._handle_client(reader, writer, received)
+
+    def handle_line(self, session: ClientSession, line: str) -> bool:
+        routed, self.__routed = self.__routed, False
+        room_id = get_room_id(line)
+        if (not routed and room_id and session.get_room() is None and room_id not in self._rooms
+                and room_id not in self.__placed_rooms):
+            self.__moving[session] = line
+            return False
+        return super().handle_line(session, line)
+
+    def _remove_room(self, room: ServerRoom) -> None:
+        super()._remove_room(room)
+        self.__placed_rooms.discard(room.get_room_id())
+        self.__control.send('CLOSED {} {}'.format(self.__last_sequence, room.get_room_id()).encode())
+
+    def _disconnect(self, session: ClientSession) -> None:
+        line = self.__moving.pop(session, None)
+        if line is not None:
+            client = session.get_writer().get_extra_info('socket')
+            socket.send_fds(self.__control, [b'MOVE ' + line.encode() + b'\n'], [client.fileno()])
+        else:
+            self.__control.send(b'LEFT')
+        super()._disconnect(session)
+        self.__stop_when_idle()
+
+    def __stop_when_idle(self) -> None:
+        if self.__draining and not self._sessions:
+            self.__stop()
+
+    def __stop(self) -> None:
+        if self.__stopped is not None and not self.__stopped.done():
+            self.__stopped.set_result(None)
+
+
+class WorkerHandle:
+    """ WorkerHandle class represents one worker process as the supervisor sees it: its control socket and its load """
+
+    def __init__(self, index: int, process: asyncio.subprocess.Process, control: socket.socket) -> None:
+        super().__init__()
+        self.__index: int = index
+        self.__process: asyncio.subprocess.Process = process
+        self.__control: socket.socket = control
+        self.__session_count: int = 0
+        self.__room_count: int = 0
+        self.__draining: bool = False
+
+    def get_index(self) -> int:
+        return self.__index
+
+    def get_process(self) -> asyncio.subprocess.Process:
+        return self.__process
+
+    def get_control(self) -> socket.socket:
+        return self.__control
+
+    def add_session(self) -> None:
+        self.__session_count += 1
+
+    def remove_session(self) -> None:
+        self.__session_count -= 1
+
+    def add_room(self) -> None:
+        self.__room_count += 1
+
+    def remove_room(self) -> None:
+        self.__room_count -= 1
+
+    def get_load(self) -> Tuple[int, int]:
+        """ :return: the connected sessions and the placed rooms of the worker, fewer is less loaded """
+        return self.__session_count, self.__room_count
+
+    def drain(self) -> None:
+        self.__draining = True
+        self.__control.send(b'DRAIN')
+
+    def is_draining(self) -> bool:
+        return self.__draining
+
+
+class Supervisor:
+    """ Supervisor class runs worker processes behind one listening port. It reads the first line of every connection and hands
+    the socket over to the worker hosting the room that line joins, placing a new room on the least loaded worker, so the state
+    of a room lives in exactly one process and workers share nothing. Draining workers finish their games but get no new room """
+
+    def __init__(self, worker_count: int, journal_path: Optional[str] = None, results_path: Optional[str] = None,
+                 warm_up: bool = False, rule_name: str = 'mastermind44', worker_arguments: Optional[List[str]] = None) -> None:
+        super().__init__()
+        # name of the rule of the rooms of every worker, in the rules file
+        self.__rule_name: str = rule_name
+        # options of server.add_server_arguments every worker is started with
+        self.__worker_arguments: List[str] = worker_arguments or []
+        self.__journal_path: Optional[str] = journal_path
+        self.__results_path: Optional[str] = results_path
+        # whether every worker warms up its rule when it starts, a worker started again after a crash reads the opening book back
+        self.__warm_up: bool = warm_up
+        self.__workers: List[Optional[WorkerHandle]] = [None] * worker_count
+        # worker index of every placed room and the sequence of the last connection sent to it for that room
+        self.__placements: Dict[str, Tuple[int, int]] = {}
+        self.__sequence: int = 0
+        self.__draining: bool = False
+        self.__tasks: Set[asyncio.Future] = set()
+        self.__accepting: Optional[asyncio.Future] = None
+
+    async def serve(self, host: str, port: int) -> None:
+        """ start the workers and route connections until shut down, then wait for the drained workers to finish """
+        loop = asyncio.get_running_loop()
+        for index in range(len(self.__workers)):
+            await self.__start_worker(index)
+        listener = socket.create_server((host, port))
+        listener.setblocking(False)
+        print(messages.SERVER_LISTENING.format(host=host, port=listener.getsockname()[1]), flush=True)
+        print(messages.SUPERVISOR_WORKERS.format(count=len(self.__workers)), flush=True)
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signal_number, self.shutdown)
+        self.__accepting = asyncio.ensure_future(self.__accept(listener))
+        try:
+            await self.__accepting
+        except asyncio.CancelledError:
+            pass
+        finally:
+            listener.close()
+        processes = [worker.get_process() for worker in self.__workers if worker is not None]
+        if processes:
+            await asyncio.wait([asyncio.ensure_future(process.wait()) for process in processes], timeout=DRAIN_TIMEOUT)
+        for process in processes:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+
+    def shutdown(self) -> None:
+        """ stop taking connections and drain every worker """
+        if self.__draining:
+            return
+        self.__draining = True
+        print(messages.SUPERVISOR_DRAINING.format(count=len([worker for worker in self.__workers if worker is not None])), flush=True)
+        for index in range(len(self.__workers)):
+            self.drain_worker(index)
+        if self.__accepting is not None:
+            self.__accepting.cancel()
+
+    def drain_worker(self, index: int) -> None:
+        """ let the worker finish the games of its rooms without placing new rooms on it, it exits once its last client left """
+        worker = self.__workers[index]
+        if worker is not None and not worker.is_draining():
+            worker.drain()
+
+    def get_placements(self) -> Dict[str, int]:
+        return {room_id: index for room_id, (index, sequence) in self.__placements.items()}
+
+    async def __start_worker(self, index: int) -> None:
+        parent, child = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        arguments = [sys.executable, SUPERVISOR_SCRIPT, '--worker-fd', str(child.fileno()), '--rule', self.__rule_name]
+        arguments += self.__worker_arguments
+        if self.__journal_path is not None:
+            arguments += ['--journal', '{}.{}'.format(self.__journal_path, index)]
+        if self.__results_path is not None:
+            arguments += ['--results', '{}.{}'.format(self.__results_path, index)]
+        if self.__warm_up:
+            arguments.append('--warm-up')
+        process = await asyncio.create_subprocess_exec(*arguments, pass_fds=[child.fileno()])
+        child.close()
+        worker = self.__workers[index] = WorkerHandle(index, process, parent)
+        asyncio.get_running_loop().add_reader(parent.fileno(), self.__read_control, worker)
+        self.__track(asyncio.ensure_future(self.__watch_worker(worker)))
+
+    async def __watch_worker(self, worker: WorkerHandle) -> None:
+        """ forget the worker once its process exits and start a new one in its place unless it was drained """
+        return_code = await worker.get_process().wait()
+        asyncio.get_running_loop().remove_reader(worker.get_control().fileno())
+        worker.get_control().close()
+        for room_id in [room_id for room_id, (index, sequence) in self.__placements.items() if index == worker.get_index()]:
+            del self.__placements[room_id]
+        self.__workers[worker.get_index()] = None
+        if not worker.is_draining() and not self.__draining:
+            print(messages.SUPERVISOR_WORKER_EXITED.format(index=worker.get_index(), code=return_code), flush=True)
+            await self.__start_worker(worker.get_index())
+
+    async def __accept(self, listener: socket.socket) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            client, _ = await loop.sock_accept(listener)
+            self.__track(asyncio.ensure_future(self.__route(client)))
+
+    async def __route(self, client: socket.socket) -> None:
+        """ read the first line of a new connection and hand the connection to its worker """
+        try:
+            received = await asyncio.wait_for(self.__read_first_line(client), FIRST_LINE_TIMEOUT)
+            if received is not None:
+                self.__dispatch(client, received)
+        except (asyncio.TimeoutError, OSError):
+            pass
+        finally:
+            client.close()
+
+    @staticmethod
+    async def __read_first_line(client: socket.socket) -> Optional[bytes]:
+        """ :return: everything the client sent up to and including its first line, None when it left or sent a too long line """
+        loop = asyncio.get_running_loop()
+        received = b''
+        while b'\n' not in received:
+            data = await loop.sock_recv(client, MAX_FIRST_LINE)
+            if not data or len(received) + len(data) > MAX_FIRST_LINE:
+                return None
+            received += data
+        return received
+
+    def __dispatch(self, client: socket.socket, received: bytes) -> None:
+        """ send the connection to the worker of the room its first line joins, placing the room when it is new """
+        line = received.split(b'\n', 1)[0].decode(errors='replace').strip()
+        room_id = get_room_id(line)
+        placement = self.__placements.get(room_id) if room_id else None
+        worker = self.__workers[placement[0]] if placement is not None else None
+        if worker is None:
+            workers = [worker for worker in self.__workers if worker is not None and not worker.is_draining()]
+            worker = min(workers, key=WorkerHandle.get_load, default=None)
+            if worker is None:
+                return
+            if line.partition(' ')[0].upper() == 'JOIN' and room_id:
+                worker.add_room()
+            else:
+                room_id = ''
+        self.__sequence += 1
+        if room_id:
+            self.__placements[room_id] = (worker.get_index(), self.__sequence)
+        worker.add_session()
+        header = 'CONN {} {} '.format(self.__sequence, room_id or '-').encode()
+        socket.send_fds(worker.get_control(), [header + received], [client.fileno()])
+
+    def __read_control(self, worker: WorkerHandle) -> None:
+        try:
+            data, fds, _, _ = socket.recv_fds(worker.get_control(), CONTROL_MESSAGE_SIZE, 1, socket.MSG_DONTWAIT)
+        except BlockingIOError:
+            return
+        except ConnectionError:
+            data, fds = b'', []
+        if not data:
+            asyncio.get_running_loop().remove_reader(worker.get_control().fileno())
+            return
+        kind, _, rest = data.partition(b' ')
+        if kind == b'LEFT':
+            worker.remove_session()
+        elif kind == b'MOVE':
+            worker.remove_session()
+            client = socket.socket(fileno=fds[0])
+            try:
+                self.__dispatch(client, rest)
+            finally:
+                client.close()
+        elif kind == b'CLOSED':
+            sequence, room_id = rest.split(b' ', 1)
+            placement = self.__placements.get(room_id.decode())
+            # a connection for the room may have been sent after the worker closed it, then the room opens again there
+            if placement is not None and placement[0] == worker.get_index() and placement[1] <= int(sequence):
+                del self.__placements[room_id.decode()]
+                worker.remove_room()
+        elif kind == b'OPENED':
+            self.__placements[rest.decode()] = (worker.get_index(), 0)
+            worker.add_room()
+
+    def __track(self, task: asyncio.Future) -> None:
+        self.__tasks.add(task)
+        task.add_done_callback(self.__tasks.discard)
+
+
+async def run_worker(control_fd: int, journal_path: Optional[str] = None, results_path: Optional[str] = None,
+                     warm_up: bool = False, rule_name: str = 'mastermind44', hint_service: Optional[HintService] = None,
+                     memory_budget: Optional[MemoryBudget] = None, flow_control: Optional[FlowControl] = None) -> None:
+    """ serve the connections the supervisor hands over on the control socket until drained """
+    from constants import GAMERULES_BY_NAME
+    journal, snapshots = SnapshotJournal.open(journal_path) if journal_path is not None else (None, {})
+    results = ResultLog(results_path) if results_path is not None else None
+    worker_server = WorkerServer(socket.socket(fileno=control_fd), GAMERULES_BY_NAME[rule_name], journal=journal, results=results,
+                                 hint_service=hint_service, memory_budget=memory_budget, flow_control=flow_control)
+    worker_server.restore(snapshots)
+    if warm_up:
+        worker_server.warm_up(rule_name)
+    try:
+        await worker_server.serve_control()
+    finally:
+        if journal is not None:
+            journal.close()
+        if results is not None:
+            results.close()
+
+
+if __name__ == "__main__":
+    from constants import GAMERULES_BY_NAME
+    parser = argparse.ArgumentParser(description='Host Mastermind44 race rooms over TCP with one worker process per core.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4444, help='0 picks a free port')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--journal', help='checkpoint live games, every worker to this path followed by its number')
+    parser.add_argument('--results', help='append finished games, every worker to this path followed by its number')
+    parser.add_argument('--rule', default='mastermind44', choices=sorted(GAMERULES_BY_NAME.keys()),
+                        help='rule of the rooms of every worker, from the rules file named by MASTERMIND_RULES')
+    parser.add_argument('--warm-up', action='store_true', help='every worker builds the tables and opening hints of the rule first')
+    add_server_arguments(parser)
+    parser.add_argument('--worker-fd', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker_fd is not None:
+        # the terminal interrupt reaches the whole process group, the supervisor drains its workers instead
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        hint_service, budget, flow_control = create_server_limits(args)
+        asyncio.run(run_worker(args.worker_fd, args.journal, args.results, args.warm_up, args.rule, hint_service, budget, flow_control))
+    else:
+        asyncio.run(Supervisor(args.workers, args.journal, args.results, args.warm_up, args.rule,
+                               get_server_arguments(args)).serve(args.host, args.port))
@@ -0,0 +1,52 @@
+import random
+
+import pytest
+
+from analytics import OnlineHistogram, P2Quantile, StreamingSummary
+
+
+def exact_quantile(values, quantile):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(quantile * len(ordered)))]
+
+
+def test_quantile_is_none_before_any_value():
+    assert P2Quantile(0.5).get_value() is None
+
+
+def test_quantile_is_exact_below_five_values():
+    estimator = P2Quantile(0.5)
+    for value in (7, 1, 4):
+        estimator.add(value)
+    assert estimator.get_value() == 4
+
+
+@pytest.mark.parametrize('quantile', [0.5, 0.9, 0.99])
+def test_quantile_estimate_is_close_on_a_long_stream(quantile):
+    rng = random.Random(3)
+    values = [rng.gauss(100.0, 15.0) for _ in range(20000)]
+    estimator = P2Quantile(quantile)
+    for value in values:
+        estimator.add(value)
+    assert estimator.get_value() == pytest.approx(exact_quantile(values, quantile), abs=2.0)
+
+
+def test_quantile_follows_a_sorted_stream():
+    estimator = P2Quantile(0.9)
+    for value in range(1000):
+        estimator.add(value)
+    assert estimator.get_value() == pytest.approx(900, abs=10)
+
+
+def test_histogram_counts_and_quantiles():
+    histogram = OnlineHistogram()
+    for value in [3, 4, 4, 5, 5, 5, 6, 6, 7, 12]:
+        histogram.add(value)
+    assert histogram.get_counts() == {3: 1, 4: 2, 5: 3, 6: 2, 7: 1, 12: 1}
+    assert histogram.get_total() == 10
+    assert histogram.get_mean() == pytest.approx(5.7)
+    assert set(histogram.get_quantiles()) == {'p50', 'p90', 'p99'}
+
+
+def test_summary_of_an_empty_stream():
+    assert StreamingSummary().to_dict() == {'count': 0, 'mean': None, 'p50': None, 'p90': None, 'p99': None}
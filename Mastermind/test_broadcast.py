@@ -0,0 +1,60 @@
+from broadcast import DROP_SLOW, SKIP_SLOW, Broadcaster
+
+
+class FakeTransport:
+
+    def __init__(self) -> None:
+        self.pending = 0
+
+    def get_write_buffer_size(self) -> int:
+        return self.pending
+
+
+class FakeWriter:
+    """ stands for the StreamWriter of a connection, it keeps what is written and reports a settable pending size """
+
+    def __init__(self) -> None:
+        self.transport = FakeTransport()
+        self.written = []
+
+    def write(self, data: bytes) -> None:
+        self.written.append(data)
+
+    def is_closing(self) -> bool:
+        return False
+
+
+def test_encoded_event_is_shared_by_every_subscriber():
+    broadcaster = Broadcaster()
+    writers = [FakeWriter() for _ in range(3)]
+    for index, writer in enumerate(writers):
+        broadcaster.subscribe(index, writer)
+    data = b'GUESSED a 1 RRRRR 0 0\n'
+    broadcaster.publish_bytes(data)
+    assert all(writer.written[0] is data for writer in writers)
+    assert broadcaster.get_subscriber_keys() == [0, 1, 2]
+
+
+def test_slow_subscriber_is_dropped():
+    dropped = []
+    broadcaster = Broadcaster(max_pending_bytes=10, slow_policy=DROP_SLOW)
+    slow, fast = FakeWriter(), FakeWriter()
+    broadcaster.subscribe('slow', slow, dropped.append)
+    broadcaster.subscribe('fast', fast)
+    slow.transport.pending = 11
+    broadcaster.publish('event')
+    assert len(dropped) == 1
+    assert broadcaster.get_subscriber_keys() == ['fast']
+    assert fast.written == [b'event\n']
+
+
+def test_slow_subscriber_skips_events_then_catches_up():
+    broadcaster = Broadcaster(max_pending_bytes=10, slow_policy=SKIP_SLOW)
+    writer = FakeWriter()
+    broadcaster.subscribe('slow', writer)
+    writer.transport.pending = 11
+    broadcaster.publish('one')
+    broadcaster.publish('two')
+    writer.transport.pending = 0
+    broadcaster.publish('three')
+    assert writer.written == [b'SKIPPED 2\n', b'three\n']
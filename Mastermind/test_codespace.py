@@ -0,0 +1,25 @@
+import random
+
+from codespace import CodeSpace
+
+
+def test_single_draw_does_not_enumerate_the_space(monkeypatch):
+    def enumerate_space(space):
+        raise AssertionError('the space was enumerated for one code')
+    monkeypatch.setattr(CodeSpace, 'get_all_values', enumerate_space)
+    space = CodeSpace(7, True)
+    values, = space.sample_values(1, random.Random(5))
+    assert space.decode_index(space.encode_values(values)) == values
+    assert values == space.decode_index(random.Random(5).randrange(space.size()))
+
+
+def test_bulk_draw_uses_the_enumerated_space():
+    space = CodeSpace(4, False)
+    drawn = space.sample_values(space.size(), random.Random(5))
+    assert drawn == random.Random(5).choices(space.get_all_values(), k=space.size())
+
+
+def test_index_round_trip():
+    space = CodeSpace(5, True)
+    for index in random.Random(2).sample(range(space.size()), 200):
+        assert space.encode_values(space.decode_index(index)) == index
@@ -0,0 +1,81 @@
+import flow_control
+from flow_control import MAX_REFUSALS_IN_A_ROW, FlowControl, TokenBucket
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def install_clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(flow_control.time, 'monotonic', clock)
+    return clock
+
+
+def test_bucket_lets_a_burst_through_then_refills_at_its_rate(monkeypatch):
+    clock = install_clock(monkeypatch)
+    bucket = TokenBucket(2.0, 4.0)
+    for line in range(4):
+        assert bucket.has(1.0)
+        bucket.take(1.0)
+    assert not bucket.has(1.0)
+    clock.now += 0.5
+    assert bucket.has(1.0)
+    bucket.take(1.0)
+    assert not bucket.has(1.0)
+
+
+def test_bucket_does_not_fill_past_its_burst(monkeypatch):
+    clock = install_clock(monkeypatch)
+    bucket = TokenBucket(2.0, 4.0)
+    clock.now += 60.0
+    assert bucket.has(4.0)
+    assert not bucket.has(4.5)
+
+
+def test_session_limit_refuses_lines_over_the_rate(monkeypatch):
+    install_clock(monkeypatch)
+    control = FlowControl(session_rate=1.0, session_burst=2.0, max_loop_lag=0)
+    assert control.admit('s1', 'a', 'GUESS') is None
+    assert control.admit('s1', 'a', 'GUESS') is None
+    assert control.admit('s1', 'a', 'GUESS') is not None
+    assert control.admit('s1', 'a', 'QUIT') is None
+    assert control.admit('s2', 'a', 'GUESS') is None
+    assert control.get_stats()['session_limited'] == 1
+
+
+def test_address_limit_is_shared_by_its_sessions(monkeypatch):
+    install_clock(monkeypatch)
+    control = FlowControl(session_rate=0, address_rate=1.0, address_burst=2.0, max_loop_lag=0)
+    assert control.admit('s1', 'a', 'GUESS') is None
+    assert control.admit('s2', 'a', 'GUESS') is None
+    assert control.admit('s3', 'a', 'GUESS') is not None
+    assert control.admit('s3', 'b', 'GUESS') is None
+    assert control.get_stats()['address_limited'] == 1
+
+
+def test_session_refused_in_a_row_is_flooding(monkeypatch):
+    install_clock(monkeypatch)
+    control = FlowControl(session_rate=1.0, session_burst=1.0, max_loop_lag=0)
+    control.admit('s1', 'a', 'GUESS')
+    for line in range(MAX_REFUSALS_IN_A_ROW):
+        assert not control.is_flooding('s1')
+        control.admit('s1', 'a', 'GUESS')
+    assert control.is_flooding('s1')
+    control.remove_session('s1')
+    assert not control.is_flooding('s1')
+
+
+def test_lag_sheds_new_work_but_not_a_running_race(monkeypatch):
+    install_clock(monkeypatch)
+    monkeypatch.setattr(flow_control.LoopLagMonitor, 'get_lag', lambda monitor: 1.0)
+    control = FlowControl(max_loop_lag=0.1)
+    assert control.admit('s1', 'a', 'JOIN') is not None
+    assert control.admit('s1', 'a', 'JOIN', continues_race=True) is None
+    assert control.admit('s1', 'a', 'GUESS') is None
+    assert control.get_stats()['shed'] == 1
@@ -0,0 +1,84 @@
+import pytest
+
+import memory
+from hint_service import Hint, HintService
+from memory import MemoryAccountant, MemoryBudget
+from models import GameRule
+from partition_cache import PartitionCache
+
+RSS = 100 * memory.MIB
+ENTRY_BYTES = 1000
+SIZES = (((0, 0), 3),)
+
+
+class FakeCache:
+
+    def __init__(self, entries):
+        self.entries = entries
+
+    def get_memory_size(self):
+        return self.entries * ENTRY_BYTES
+
+    def get_stats(self):
+        return {'entries': self.entries}
+
+    def trim(self, max_entries):
+        evicted = max(0, self.entries - max_entries)
+        self.entries -= evicted
+        return evicted
+
+
+def create_accountant(monkeypatch, cache, max_bytes):
+    monkeypatch.setattr(memory, 'MEMORY_CHECK_SECONDS', 0.0)
+    monkeypatch.setattr(memory, 'read_rss', lambda: RSS)
+    accountant = MemoryAccountant(MemoryBudget(max_bytes))
+    accountant.add_cache('partition', cache)
+    return accountant
+
+
+def test_trim_keeps_the_partition_cache_capacity():
+    cache = PartitionCache(max_entries=4)
+    fingerprint = PartitionCache.fingerprint([1, 2], 4, False)
+    for guess in range(4):
+        cache.put(fingerprint, guess, SIZES)
+    assert cache.trim(1) == 3
+    for guess in range(4, 8):
+        cache.put(fingerprint, guess, SIZES)
+    assert cache.get_stats()['entries'] == 4
+
+
+def test_trim_keeps_the_hint_service_capacity():
+    service = HintService(max_entries=3)
+    game_rule = GameRule(True, 1, 12, False, 4)
+    for position in range(3):
+        service.preload(game_rule, (0, position), Hint(0, 1, 0.0))
+    assert service.trim(0) == 3
+    for position in range(3):
+        service.preload(game_rule, (0, position), Hint(0, 1, 0.0))
+    assert service.get_stats()['entries'] == 3
+    service.close()
+
+
+def test_freed_cache_memory_ends_the_refusal_although_rss_stays(monkeypatch):
+    cache = FakeCache(10)
+    accountant = create_accountant(monkeypatch, cache, RSS - 3 * ENTRY_BYTES)
+    assert not accountant.check()
+    assert cache.entries == 5
+    assert not accountant.check()
+    assert cache.entries == 5
+
+
+def test_eviction_that_frees_nothing_is_not_repeated(monkeypatch):
+    cache = FakeCache(0)
+    accountant = create_accountant(monkeypatch, cache, RSS // 2)
+    assert accountant.check()
+    assert accountant.check()
+    assert accountant.report()['process']['evictions'] == 0
+
+
+def test_session_bytes_are_estimated_from_a_sample():
+    rooms = {'r{}'.format(index): [bytearray(1000)] for index in range(1000)}
+    accountant = MemoryAccountant(sessions=lambda: rooms)
+    exact = sum(memory.get_deep_size(room) for room in rooms.values())
+    assert accountant.get_session_bytes() == pytest.approx(exact, rel=0.05)
+    assert MemoryAccountant().get_session_bytes() == 0
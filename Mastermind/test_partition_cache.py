@@ -0,0 +1,35 @@
+import os
+
+from partition_cache import PartitionCache
+
+SIZES = (((0, 0), 3), ((1, 0), 2))
+
+
+def test_fingerprint_depends_on_code_shape():
+    candidates = [0, 5, 9]
+    assert PartitionCache.fingerprint(candidates, 4, False) != PartitionCache.fingerprint(candidates, 5, False)
+    assert PartitionCache.fingerprint(candidates, 5, False) != PartitionCache.fingerprint(candidates, 5, True)
+    assert PartitionCache.fingerprint(candidates, 4, False) == PartitionCache.fingerprint(list(candidates), 4, False)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PartitionCache(max_entries=2)
+    fingerprint = PartitionCache.fingerprint([1, 2], 4, False)
+    cache.put(fingerprint, 1, SIZES)
+    cache.put(fingerprint, 2, SIZES)
+    cache.get(fingerprint, 1)
+    cache.put(fingerprint, 3, SIZES)
+    assert cache.get(fingerprint, 2) is None
+    assert cache.get(fingerprint, 1) == SIZES
+
+
+def test_close_keeps_the_entries_in_memory(tmp_path):
+    spill_path = os.path.join(str(tmp_path), 'partitions')
+    fingerprint = PartitionCache.fingerprint([1, 2], 4, False)
+    cache = PartitionCache(spill_path=spill_path)
+    cache.put(fingerprint, 7, SIZES)
+    cache.close()
+    reopened = PartitionCache(spill_path=spill_path)
+    assert reopened.get(fingerprint, 7) == SIZES
+    assert reopened.get_stats()['disk_hits'] == 1
+    reopened.close()
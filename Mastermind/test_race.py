@@ -0,0 +1,59 @@
+import pytest
+
+from constants import MASTERMIND_GAMERULE
+from models import Code
+from race import RaceRoomRegistry
+from utils import MasterMindException
+
+FINAL_CODE = Code.parse('RGLYW', MASTERMIND_GAMERULE)
+MISS = Code.parse('BBBBB', MASTERMIND_GAMERULE)
+
+
+def create_room(player_names, podium_size=1):
+    return RaceRoomRegistry().create_room('r1', MASTERMIND_GAMERULE, FINAL_CODE, player_names, podium_size)
+
+
+def test_winners_are_ranked_in_arrival_order():
+    room = create_room(['a', 'b', 'c'], podium_size=2)
+    assert room.submit_guess('b', FINAL_CODE).get_rank() == 1
+    assert not room.is_finished()
+    assert room.submit_guess('a', MISS).get_rank() is None
+    assert room.submit_guess('c', FINAL_CODE).get_rank() == 2
+    assert room.is_finished()
+    assert [winner.get_player_name() for winner in room.get_winners()] == ['b', 'c']
+
+
+def test_winner_cannot_take_a_second_place():
+    room = create_room(['a', 'b'], podium_size=2)
+    room.submit_guess('a', FINAL_CODE)
+    with pytest.raises(MasterMindException):
+        room.submit_guess('a', FINAL_CODE)
+    assert [winner.get_player_name() for winner in room.get_winners()] == ['a']
+    assert not room.is_finished()
+
+
+def test_race_ends_when_every_player_used_all_attempts():
+    room = create_room(['a', 'b'])
+    for attempt in range(MASTERMIND_GAMERULE.get_max_attempts()):
+        room.submit_guess('a', MISS)
+        room.submit_guess('b', MISS)
+    assert room.is_finished()
+    with pytest.raises(MasterMindException):
+        room.submit_guess('a', MISS)
+
+
+def test_unknown_player_is_refused():
+    room = create_room(['a'])
+    with pytest.raises(MasterMindException):
+        room.submit_guess('z', MISS)
+
+
+def test_race_does_not_wait_for_a_player_who_left():
+    room = create_room(['a', 'b', 'c'])
+    for attempt in range(MASTERMIND_GAMERULE.get_max_attempts()):
+        room.submit_guess('a', MISS)
+        room.submit_guess('b', MISS)
+    assert not room.is_finished()
+    assert not room.finish_if_done(['a', 'b', 'c'])
+    assert room.finish_if_done(['a', 'b'])
+    assert room.is_finished()
@@ -0,0 +1,66 @@
+import json
+import os
+
+import pytest
+
+from rules import DEFAULT_RULES_PATH, RuleRegistry
+from utils import MasterMindException
+
+TEAM_RULE = {'name': 'team', 'key': 'T', 'title': 'Team', 'game': 'mastermind44-team', 'computer_code_maker': True,
+             'max_breakers': 4, 'max_attempts': 5, 'allow_blank': True, 'max_code_peg': 5}
+
+
+def write_rules(tmp_path, *rules):
+    path = os.path.join(str(tmp_path), 'rules.json')
+    with open(path, 'w') as rules_file:
+        json.dump({'rules': list(rules)}, rules_file)
+    return path
+
+
+def test_default_rules_load():
+    registry = RuleRegistry.load(DEFAULT_RULES_PATH)
+    assert registry.get('mastermind44').get_game_rule().get_max_breakers() == 4
+    assert registry.get_by_key('c').get_name() == 'mastermind44'
+
+
+def test_valid_rule_loads(tmp_path):
+    registry = RuleRegistry.load(write_rules(tmp_path, TEAM_RULE))
+    assert registry.get('team').get_game_type() == 'mastermind44-team'
+
+
+@pytest.mark.parametrize('field', ['max_breakers', 'max_attempts', 'max_code_peg'])
+def test_field_below_one_is_refused(tmp_path, field):
+    with pytest.raises(MasterMindException, match=field):
+        RuleRegistry.load(write_rules(tmp_path, dict(TEAM_RULE, **{field: 0})))
+
+
+def test_more_breakers_than_pegs_is_refused(tmp_path):
+    with pytest.raises(MasterMindException, match='max_breakers'):
+        RuleRegistry.load(write_rules(tmp_path, dict(TEAM_RULE, max_breakers=6)))
+
+
+def test_mistyped_field_is_refused(tmp_path):
+    with pytest.raises(MasterMindException, match='allow_blank'):
+        RuleRegistry.load(write_rules(tmp_path, dict(TEAM_RULE, allow_blank='yes')))
+
+
+def test_name_used_twice_is_refused(tmp_path):
+    with pytest.raises(MasterMindException, match='unique'):
+        RuleRegistry.load(write_rules(tmp_path, TEAM_RULE, dict(TEAM_RULE, key='U')))
+
+
+@pytest.mark.parametrize('field', ['max_attempts', 'max_code_peg'])
+def test_field_over_its_snapshot_byte_is_refused(tmp_path, field):
+    with pytest.raises(MasterMindException, match=field):
+        RuleRegistry.load(write_rules(tmp_path, dict(TEAM_RULE, **{field: 256})))
+
+
+@pytest.mark.parametrize('max_code_peg, allow_blank', [(12, True), (13, False)])
+def test_code_space_over_the_code_index_is_refused(tmp_path, max_code_peg, allow_blank):
+    with pytest.raises(MasterMindException, match='codes'):
+        RuleRegistry.load(write_rules(tmp_path, dict(TEAM_RULE, max_code_peg=max_code_peg, allow_blank=allow_blank)))
+
+
+def test_largest_code_space_loads(tmp_path):
+    registry = RuleRegistry.load(write_rules(tmp_path, dict(TEAM_RULE, max_code_peg=12, allow_blank=False, max_attempts=255)))
+    assert registry.get('team').get_game_rule().get_max_code_peg() == 12
@@ -0,0 +1,14 @@
+import pytest
+
+from scoring_backends import SCORING_BACKENDS, check_conformance, create_backend
+
+# code shapes as (pegs, blank), with and without blanks and around the size limit of the table backend
+SHAPES = [(3, False), (4, False), (4, True), (5, False), (5, True), (6, False)]
+
+
+@pytest.mark.parametrize('name', sorted(SCORING_BACKENDS))
+@pytest.mark.parametrize('max_code_peg, allow_blank', SHAPES)
+def test_backend_scores_like_the_reference(name, max_code_peg, allow_blank):
+    if not SCORING_BACKENDS[name].is_available(max_code_peg, allow_blank):
+        pytest.skip('{} is not available for codes of {} pegs'.format(name, max_code_peg))
+    assert check_conformance(create_backend(name, max_code_peg, allow_blank), pair_count=500) == []
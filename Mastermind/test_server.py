@@ -0,0 +1,46 @@
+import argparse
+
+from server import MAX_NAME_BYTES, ClientSession, GameServer, add_server_arguments, get_server_arguments
+
+
+class FakeTransport:
+
+    def get_write_buffer_size(self) -> int:
+        return 0
+
+
+class FakeWriter:
+    """ stands for the StreamWriter of a connection, it keeps what is written """
+
+    def __init__(self) -> None:
+        self.transport = FakeTransport()
+        self.written = []
+
+    def write(self, data: bytes) -> None:
+        self.written.append(data)
+
+    def is_closing(self) -> bool:
+        return False
+
+    def get_extra_info(self, name):
+        return ('127.0.0.1', 4000) if name == 'peername' else None
+
+
+def test_join_with_a_name_too_long_is_refused():
+    server = GameServer()
+    session = ClientSession(FakeWriter())
+    assert server.handle_line(session, 'JOIN r1 ' + 'x' * (MAX_NAME_BYTES + 1))
+    assert session.get_writer().written[-1].startswith(b'ERROR')
+    assert server.handle_line(session, 'JOIN ' + 'r' * (MAX_NAME_BYTES + 1) + ' alice')
+    assert session.get_writer().written[-1].startswith(b'ERROR')
+    assert server.get_room_count() == 0
+    assert server.handle_line(session, 'JOIN r1 alice')
+    assert server.get_room_count() == 1
+
+
+def test_server_options_are_passed_on_with_their_values():
+    parser = argparse.ArgumentParser()
+    add_server_arguments(parser)
+    args = parser.parse_args(['--memory-budget', '512', '--session-rate', '0', '--hint-ttl', '1.5', '--tracemalloc'])
+    assert vars(parser.parse_args(get_server_arguments(args))) == vars(args)
+    assert '--cache-budget' not in get_server_arguments(args)
@@ -0,0 +1,66 @@
+import os
+
+from constants import MASTERMIND_GAMERULE
+from snapshot import GameSnapshot, ResultLog, SnapshotJournal
+
+TOKENS = [b'\x01' * 8, b'\x02' * 8]
+
+
+def create_snapshot(session_id='r1', resume_tokens=None):
+    return GameSnapshot(session_id, MASTERMIND_GAMERULE, ['a', 'b'], 1234, [0, 3], [(0, 17, 1, 2), (1, 900, 0, 0)], resume_tokens)
+
+
+def assert_same_game(snapshot, other):
+    assert other.get_session_id() == snapshot.get_session_id()
+    assert other.get_game_rule().get_max_code_peg() == snapshot.get_game_rule().get_max_code_peg()
+    assert other.get_game_rule().allow_blank() == snapshot.get_game_rule().allow_blank()
+    assert other.get_player_names() == snapshot.get_player_names()
+    assert other.get_final_code() == snapshot.get_final_code()
+    assert other.get_revealed_positions() == snapshot.get_revealed_positions()
+    assert [tuple(entry) for entry in other.get_history()] == snapshot.get_history()
+
+
+def test_encode_round_trip():
+    snapshot = create_snapshot(resume_tokens=TOKENS)
+    decoded = GameSnapshot.decode(snapshot.encode())
+    assert_same_game(snapshot, decoded)
+    assert decoded.get_resume_tokens() == TOKENS
+
+
+def test_tokens_are_left_out_on_request():
+    snapshot = create_snapshot(resume_tokens=TOKENS)
+    assert GameSnapshot.decode(snapshot.encode(include_tokens=False)).get_resume_tokens() is None
+    assert GameSnapshot.decode(create_snapshot().encode()).get_resume_tokens() is None
+
+
+def test_journal_restores_live_games_only(tmp_path):
+    path = os.path.join(str(tmp_path), 'journal')
+    journal, snapshots = SnapshotJournal.open(path)
+    assert snapshots == {}
+    journal.record_start(create_snapshot('live', TOKENS))
+    journal.record_start(create_snapshot('ended'))
+    journal.record_guess('live', 1, 55, 0, 1)
+    journal.record_end('ended')
+    journal.close()
+    journal, snapshots = SnapshotJournal.open(path)
+    journal.close()
+    assert list(snapshots) == ['live']
+    assert snapshots['live'].get_history()[-1] == (1, 55, 0, 1)
+    assert snapshots['live'].get_resume_tokens() == TOKENS
+
+
+def test_result_log_streams_games_without_tokens(tmp_path):
+    path = os.path.join(str(tmp_path), 'results')
+    results = ResultLog(path)
+    results.record(create_snapshot('g1', TOKENS), [120, 80])
+    results.record(create_snapshot('g2'), [5, 6])
+    results.close()
+    games = list(ResultLog.read(path, chunk_size=16))
+    assert [(snapshot.get_session_id(), latencies) for snapshot, latencies in games] == [('g1', [120, 80]), ('g2', [5, 6])]
+    assert_same_game(create_snapshot('g1'), games[0][0])
+    assert games[0][0].get_resume_tokens() is None
+
+
+def test_long_names_round_trip():
+    snapshot = GameSnapshot('r' * 300, MASTERMIND_GAMERULE, ['é' * 200, 'b'], 1234)
+    assert_same_game(snapshot, GameSnapshot.decode(snapshot.encode()))
@@ -0,0 +1,181 @@
+import argparse
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from codespace import CodeSpace
+from constants import GAMERULES_BY_NAME
+from distributed import Coordinator, add_coordinator_arguments, create_coordinator, run_tasks
+from strategies import BREAKER_STRATEGIES, MAKER_STRATEGIES
+
+# a breaker that has not found the code after this many guesses is stopped
+MAX_GUESSES = 64
+
+
+class MatchResult:
+    """ MatchResult class represents the accumulated outcome of the games played by one breaker against one maker on one rule """
+
+    def __init__(self, breaker_name: str, maker_name: str, rule_name: str) -> None:
+        super().__init__()
+        self.__breaker_name: str = breaker_name
+        self.__maker_name: str = maker_name
+        self.__rule_name: str = rule_name
+        self.__games: int = 0
+        self.__solved_in_time: int = 0
+        self.__total_guesses: int = 0
+        self.__max_guesses: int = 0
+        self.__cpu_seconds: float = 0.0
+
+    def add_game(self, guesses: int, solved_in_time: bool, cpu_seconds: float) -> None:
+        """ record one played game
+        :param: guesses: number of guesses used, solved_in_time: whether the code was broken within the rule attempts,
+        cpu_seconds: cpu time spent by the breaker and the maker """
+        self.__games += 1
+        self.__solved_in_time += int(solved_in_time)
+        self.__total_guesses += guesses
+        self.__max_guesses = max(self.__max_guesses, guesses)
+        self.__cpu_seconds += cpu_seconds
+
+    def merge(self, other: "MatchResult") -> None:
+        """ add the games of another result of the same pairing """
+        self.__games += other.get_games()
+        self.__solved_in_time += other.get_solved_in_time()
+        self.__total_guesses += other.get_total_guesses()
+        self.__max_guesses = max(self.__max_guesses, other.get_max_guesses())
+        self.__cpu_seconds += other.get_cpu_seconds()
+
+    def get_key(self) -> Tuple[str, str, str]:
+        return self.__breaker_name, self.__maker_name, self.__rule_name
+
+    def get_breaker_name(self) -> str:
+        return self.__breaker_name
+
+    def get_maker_name(self) -> str:
+        return self.__maker_name
+
+    def get_rule_name(self) -> str:
+        return self.__rule_name
+
+    def get_games(self) -> int:
+        return self.__games
+
+    def get_solved_in_time(self) -> int:
+        return self.__solved_in_time
+
+    def get_total_guesses(self) -> int:
+        return self.__total_guesses
+
+    def get_max_guesses(self) -> int:
+        return self.__max_guesses
+
+    def get_cpu_seconds(self) -> float:
+        return self.__cpu_seconds
+
+    def get_mean_guesses(self) -> float:
+        return self.__total_guesses / self.__games if self.__games else 0.0
+
+    def get_cpu_ms_per_move(self) -> float:
+        return 1000 * self.__cpu_seconds / self.__total_guesses if self.__total_guesses else 0.0
+
+
+def play_games(breaker_name: str, maker_name: str, rule_name: str, game_count: int, seed: str) -> MatchResult:
+    """ play game_count games of one breaker against one maker, this is the unit of work handed to the pool workers
+    :param: breaker_name, maker_name: registered strategy names, rule_name: name of the game rule, game_count: number of games,
+    seed: seed of the random stream of this task
+    :return: the MatchResult of the games """
+    game_rule = GAMERULES_BY_NAME[rule_name]
+    max_code_peg = game_rule.get_max_code_peg()
+    rng = random.Random(seed)
+    result = MatchResult(breaker_name, maker_name, rule_name)
+    for i in range(game_count):
+        maker = MAKER_STRATEGIES[maker_name](game_rule, rng)
+        breaker = BREAKER_STRATEGIES[breaker_name](game_rule, rng)
+        started = time.process_time()
+        guesses = 0
+        while guesses < MAX_GUESSES:
+            guess = breaker.next_guess()
+            feedback = maker.respond(guess)
+            guesses += 1
+            if feedback[0] == max_code_peg:
+                breaker.learn_secret(guess)
+                break
+            breaker.observe(guess, feedback)
+        result.add_game(guesses, guesses <= game_rule.get_max_attempts(), time.process_time() - started)
+    return result
+
+
+class Tournament:
+    """ Tournament class pairs every breaker strategy with every maker strategy on the chosen game rules and plays them over
+    a pool of worker processes """
+
+    def __init__(self, rule_names: List[str], game_count: int, games_per_task: int = 10, workers: Optional[int] = None,
+                 seed: int = 0, breaker_names: Optional[List[str]] = None, maker_names: Optional[List[str]] = None) -> None:
+        super().__init__()
+        self._rule_names: List[str] = rule_names
+        self._game_count: int = game_count
+        self._games_per_task: int = games_per_task
+        self._workers: Optional[int] = workers
+        self._seed: int = seed
+        self._breaker_names: List[str] = breaker_names or list(BREAKER_STRATEGIES.keys())
+        self._maker_names: List[str] = maker_names or list(MAKER_STRATEGIES.keys())
+
+    def _create_tasks(self) -> List[Tuple[str, str, str, int, str]]:
+        """ split every pairing into small tasks, the biggest code spaces first. Idle workers take the next task from the shared
+        queue of the pool, so a long match never leaves the other cores waiting behind it """
+        tasks = []
+        for rule_name in self._rule_names:
+            for breaker_name in self._breaker_names:
+                for maker_name in self._maker_names:
+                    for first_game in range(0, self._game_count, self._games_per_task):
+                        game_count = min(self._games_per_task, self._game_count - first_game)
+                        seed = '{}/{}/{}/{}/{}'.format(self._seed, rule_name, breaker_name, maker_name, first_game)
+                        tasks.append((breaker_name, maker_name, rule_name, game_count, seed))
+        tasks.sort(key=lambda task: CodeSpace.of(GAMERULES_BY_NAME[task[2]]).size(), reverse=True)
+        return tasks
+
+    def run(self, coordinator: Optional[Coordinator] = None) -> List[MatchResult]:
+        """ :param: coordinator: work queue to play the tasks on remote workers, the local process pool when None
+        :return: one merged MatchResult per (breaker, maker, rule), ranked by mean guesses within every rule """
+        results: Dict[Tuple[str, str, str], MatchResult] = {}
+        for task_result in run_tasks([(play_games, task) for task in self._create_tasks()], self._workers, coordinator):
+            key = task_result.get_key()
+            if key in results:
+                results[key].merge(task_result)
+            else:
+                results[key] = task_result
+        return sorted(results.values(), key=lambda result: (result.get_rule_name(), result.get_mean_guesses(), result.get_max_guesses()))
+
+
+def format_table(results: List[MatchResult]) -> str:
+    """ :return: the ranked results as a plain text table """
+    header = '{:<5} {:<14} {:<18} {:<12} {:>6} {:>8} {:>5} {:>8} {:>10}'.format(
+        'rank', 'rule', 'breaker', 'maker', 'games', 'mean', 'max', 'in-time', 'cpu ms/mv')
+    lines = [header, '-' * len(header)]
+    rank, rule_name = 0, None
+    for result in results:
+        rank = rank + 1 if result.get_rule_name() == rule_name else 1
+        rule_name = result.get_rule_name()
+        lines.append('{:<5} {:<14} {:<18} {:<12} {:>6} {:>8.3f} {:>5} {:>8.1%} {:>10.3f}'.format(
+            rank, rule_name, result.get_breaker_name(), result.get_maker_name(), result.get_games(), result.get_mean_guesses(),
+            result.get_max_guesses(), result.get_solved_in_time() / result.get_games(), result.get_cpu_ms_per_move()))
+    return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Play every breaker strategy against every maker strategy and rank them.')
+    parser.add_argument('--rules', nargs='+', default=['original'], choices=sorted(GAMERULES_BY_NAME.keys()))
+    parser.add_argument('--breakers', nargs='+', choices=sorted(BREAKER_STRATEGIES.keys()))
+    parser.add_argument('--makers', nargs='+', choices=sorted(MAKER_STRATEGIES.keys()))
+    parser.add_argument('--games', type=int, default=100, help='games per pairing')
+    parser.add_argument('--games-per-task', type=int, default=10)
+    parser.add_argument('--workers', type=int, help='worker processes, all cores by default')
+    parser.add_argument('--seed', type=int, default=0)
+    add_coordinator_arguments(parser)
+    args = parser.parse_args()
+    tournament = Tournament(args.rules, args.games, args.games_per_task, args.workers, args.seed, args.breakers, args.makers)
+    tournament_coordinator = create_coordinator(args)
+    try:
+        print(format_table(tournament.run(tournament_coordinator)))
+    finally:
+        if tournament_coordinator is not None:
+            tournament_coordinator.close()
@@ -0,0 +1,282 @@
+import argparse
+import heapq
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from codespace import CodeSpace
+from constants import GAMERULES_BY_NAME
+from distributed import Coordinator, add_coordinator_arguments, create_coordinator, run_tasks
+from models import AttemptFeedback, Code, GameRule
+from scoring import PEG_ORDER, decode_code
+from strategies import BREAKER_STRATEGIES, BreakerStrategy
+from tournament import MAX_GUESSES
+
+# deepest secrets listed in a report
+WORST_SECRETS = 10
+
+# secrets per task when the strategy has to be played against every secret on its own
+SECRETS_PER_TASK = 256
+
+# one step of a decision tree path, as (guess code space index, black, white)
+PathStep = Tuple[int, int, int]
+
+
+class VerificationResult:
+    """ VerificationResult class represents how many guesses a breaker strategy needed for every secret of a part of the code
+    space, results of the parts are merged into the result of the whole space """
+
+    def __init__(self, keep_depths: bool = False) -> None:
+        super().__init__()
+        self.__depth_counts: Dict[int, int] = {}
+        # depth of every broken secret, only kept when asked for as it grows with the code space
+        self.__depths: Optional[Dict[int, int]] = {} if keep_depths else None
+        # the deepest secrets as (depth, secret index), kept as a min heap of at most WORST_SECRETS entries
+        self.__worst: List[Tuple[int, int]] = []
+        # secrets still unbroken after MAX_GUESSES guesses
+        self.__unsolved: List[int] = []
+        self.__node_count: int = 0
+
+    def add_secret(self, secret: int, depth: int) -> None:
+        self.__depth_counts[depth] = self.__depth_counts.get(depth, 0) + 1
+        self.__add_worst(depth, secret)
+        if self.__depths is not None:
+            self.__depths[secret] = depth
+
+    def add_unsolved(self, secrets: List[int]) -> None:
+        self.__unsolved.extend(secrets)
+
+    def add_node(self) -> None:
+        self.__node_count += 1
+
+    def merge(self, other: "VerificationResult") -> None:
+        for depth, count in other.__depth_counts.items():
+            self.__depth_counts[depth] = self.__depth_counts.get(depth, 0) + count
+        for depth, secret in other.__worst:
+            self.__add_worst(depth, secret)
+        self.__unsolved.extend(other.__unsolved)
+        self.__node_count += other.__node_count
+        if self.__depths is not None and other.__depths is not None:
+            self.__depths.update(other.__depths)
+
+    def __add_worst(self, depth: int, secret: int) -> None:
+        if len(self.__worst) < WORST_SECRETS:
+            heapq.heappush(self.__worst, (depth, secret))
+        elif (depth, secret) > self.__worst[0]:
+            heapq.heapreplace(self.__worst, (depth, secret))
+
+    def get_depth_counts(self) -> Dict[int, int]:
+        return dict(sorted(self.__depth_counts.items()))
+
+    def get_worst_secrets(self) -> List[Tuple[int, int]]:
+        """ :return: the deepest secrets as (depth, secret index), deepest first """
+        return sorted(self.__worst, reverse=True)
+
+    def get_unsolved(self) -> List[int]:
+        return self.__unsolved
+
+    def get_depths(self) -> Optional[Dict[int, int]]:
+        """ :return: the depth of every broken secret by secret index, None unless the result keeps depths """
+        return self.__depths
+
+    def get_secret_count(self) -> int:
+        return sum(self.__depth_counts.values()) + len(self.__unsolved)
+
+    def get_max_depth(self) -> int:
+        return max(self.__depth_counts, default=0)
+
+    def get_node_count(self) -> int:
+        """ :return: how many positions of the decision tree were expanded, 0 when the secrets were played one by one """
+        return self.__node_count
+
+
+class ScoringTable:
+    """ ScoringTable class holds the Code object of every code of a rule, so positions are partitioned with AttemptFeedback.evaluate
+    itself and the verifier proves the strategy against the exact feedback the game gives """
+
+    def __init__(self, game_rule: GameRule) -> None:
+        super().__init__()
+        self.__codes: List[Code] = [decode_code(values) for values in CodeSpace.of(game_rule).get_all_values()]
+
+    def feedback(self, guess: int, secret: int) -> AttemptFeedback:
+        return AttemptFeedback.evaluate(self.__codes[guess], self.__codes[secret])
+
+    def partition(self, guess: int, secrets: List[int]) -> Dict[Tuple[int, int], List[int]]:
+        """ :return: the secrets grouped by the feedback they give to the guess """
+        guess_code, codes = self.__codes[guess], self.__codes
+        partition: Dict[Tuple[int, int], List[int]] = {}
+        for secret in secrets:
+            feedback = AttemptFeedback.evaluate(guess_code, codes[secret])
+            partition.setdefault((feedback.get_black_count(), feedback.get_white_count()), []).append(secret)
+        return partition
+
+
+def start_position(breaker_name: str, game_rule: GameRule, reveal: Optional[Tuple[int, int]], path: List[PathStep],
+                   rng: random.Random) -> BreakerStrategy:
+    """ :return: a new strategy brought to the position of the decision tree reached by the revealed peg and the path """
+    strategy = BREAKER_STRATEGIES[breaker_name](game_rule, rng)
+    if reveal is not None:
+        strategy.reveal_peg(reveal[0], PEG_ORDER[reveal[1]])
+    for guess, black, white in path:
+        strategy.observe(guess, (black, white))
+    return strategy
+
+
+def walk_tree(strategy: BreakerStrategy, depth: int, table: ScoringTable, max_code_peg: int, result: VerificationResult) -> None:
+    """ expand the decision tree of a deterministic strategy below its current position, every secret still possible there is
+    broken at the depth of the leaf that holds it """
+    candidates = strategy.get_candidates()
+    if depth >= MAX_GUESSES:
+        result.add_unsolved(list(candidates))
+        return
+    result.add_node()
+    guess = strategy.next_guess()
+    for (black, white), secrets in table.partition(guess, candidates).items():
+        if black == max_code_peg:
+            result.add_secret(secrets[0], depth + 1)
+            continue
+        child = strategy.fork()
+        child.observe(guess, (black, white))
+        walk_tree(child, depth + 1, table, max_code_peg, result)
+
+
+def verify_subtree(breaker_name: str, rule_name: str, reveal: Optional[Tuple[int, int]], path: List[PathStep],
+                   seed: str, keep_depths: bool = False) -> VerificationResult:
+    """ verify the part of the decision tree below one position, this is the unit of work handed to the pool workers """
+    game_rule = GAMERULES_BY_NAME[rule_name]
+    result = VerificationResult(keep_depths)
+    if path and path[-1][1] == game_rule.get_max_code_peg():
+        # the last guess of the path already broke the code
+        result.add_secret(path[-1][0], len(path))
+        return result
+    strategy = start_position(breaker_name, game_rule, reveal, path, random.Random(seed))
+    walk_tree(strategy, len(path), ScoringTable(game_rule), game_rule.get_max_code_peg(), result)
+    return result
+
+
+def verify_secrets(breaker_name: str, rule_name: str, reveal_position: Optional[int], first: int, last: int,
+                   seed: str, keep_depths: bool = False) -> VerificationResult:
+    """ play the strategy against the secrets first to last - 1 one at a time, for strategies without a fixed decision tree.
+    Every secret gets its own random stream so the run is reproducible """
+    game_rule = GAMERULES_BY_NAME[rule_name]
+    code_space = CodeSpace.of(game_rule)
+    table = ScoringTable(game_rule)
+    max_code_peg = game_rule.get_max_code_peg()
+    result = VerificationResult(keep_depths)
+    for secret in range(first, last):
+        reveal = None if reveal_position is None else (reveal_position, code_space.decode_index(secret)[reveal_position])
+        strategy = start_position(breaker_name, game_rule, reveal, [], random.Random('{}/{}'.format(seed, secret)))
+        for depth in range(1, MAX_GUESSES + 1):
+            guess = strategy.next_guess()
+            feedback = table.feedback(guess, secret)
+            if feedback.get_black_count() == max_code_peg:
+                result.add_secret(secret, depth)
+                break
+            strategy.observe(guess, (feedback.get_black_count(), feedback.get_white_count()))
+        else:
+            result.add_unsolved([secret])
+    return result
+
+
+class StrategyVerifier:
+    """ StrategyVerifier class plays a breaker strategy against every secret of a game rule and reports how many guesses each
+    secret took. The decision tree of a deterministic strategy is walked once, sharded by the positions after its first guess,
+    other strategies are played against every secret in shards of SECRETS_PER_TASK. With reveal, like in Mastermind44, every
+    position is verified with every peg revealed to the breaker """
+
+    def __init__(self, breaker_name: str, rule_name: str, reveal: bool = False, workers: Optional[int] = None, seed: int = 0,
+                 keep_depths: bool = False) -> None:
+        super().__init__()
+        self._breaker_name: str = breaker_name
+        self._rule_name: str = rule_name
+        self._reveal: bool = reveal
+        self._workers: Optional[int] = workers
+        self._seed: int = seed
+        self._keep_depths: bool = keep_depths
+
+    def _create_tasks(self) -> List[Tuple[Callable[..., VerificationResult], tuple, int]]:
+        """ :return: the tasks as (function, arguments, secret count), the biggest first """
+        game_rule = GAMERULES_BY_NAME[self._rule_name]
+        code_space = CodeSpace.of(game_rule)
+        seed = '{}/{}/{}'.format(self._seed, self._rule_name, self._breaker_name)
+        positions: List[Optional[int]] = list(range(game_rule.get_max_code_peg())) if self._reveal else [None]
+        tasks = []
+        if not BREAKER_STRATEGIES[self._breaker_name].DETERMINISTIC:
+            for position in positions:
+                for first in range(0, code_space.size(), SECRETS_PER_TASK):
+                    last = min(code_space.size(), first + SECRETS_PER_TASK)
+                    tasks.append((verify_secrets, (self._breaker_name, self._rule_name, position, first, last, seed, self._keep_depths),
+                                  last - first))
+            return tasks
+        table = ScoringTable(game_rule)
+        roots: List[Optional[Tuple[int, int]]] = [None]
+        if self._reveal:
+            roots = [(position, value) for position in positions for value in range(len(PEG_ORDER))]
+        for reveal in roots:
+            strategy = start_position(self._breaker_name, game_rule, reveal, [], random.Random(seed))
+            if strategy.get_candidate_count() == 0:
+                continue
+            guess = strategy.next_guess()
+            for (black, white), secrets in table.partition(guess, strategy.get_candidates()).items():
+                tasks.append((verify_subtree, (self._breaker_name, self._rule_name, reveal, [(guess, black, white)], seed, self._keep_depths),
+                              len(secrets)))
+        tasks.sort(key=lambda task: task[2], reverse=True)
+        return tasks
+
+    def run(self, progress: Optional[Callable[[int, int, float], None]] = None,
+            coordinator: Optional[Coordinator] = None) -> Tuple[VerificationResult, float]:
+        """ :param: progress: called after every task with (verified secrets, total secrets, elapsed seconds), coordinator: work
+        queue to verify the tasks on remote workers, the local process pool when None
+        :return: the merged result and the total run time in seconds """
+        started = time.perf_counter()
+        tasks = self._create_tasks()
+        total = sum(task[2] for task in tasks)
+        result = VerificationResult(self._keep_depths)
+        for task_result in run_tasks([(function, arguments) for function, arguments, secret_count in tasks], self._workers, coordinator):
+            result.merge(task_result)
+            if progress is not None:
+                progress(result.get_secret_count(), total, time.perf_counter() - started)
+        return result, time.perf_counter() - started
+
+
+def print_progress(done: int, total: int, elapsed: float) -> None:
+    print('\r{}/{} secrets, {:.1f} s'.format(done, total, elapsed), end='', file=sys.stderr)
+    if done == total:
+        print(file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Prove that a breaker strategy breaks every secret of a game rule in time.')
+    parser.add_argument('--rule', default='original', choices=sorted(GAMERULES_BY_NAME.keys()))
+    parser.add_argument('--breaker', default='minimax', choices=sorted(BREAKER_STRATEGIES.keys()))
+    parser.add_argument('--reveal', action='store_true', help='verify with one peg revealed to the breaker, like Mastermind44')
+    parser.add_argument('--workers', type=int, help='worker processes, all cores by default')
+    parser.add_argument('--seed', type=int, default=0)
+    add_coordinator_arguments(parser)
+    args = parser.parse_args()
+    rule = GAMERULES_BY_NAME[args.rule]
+    verifier_coordinator = create_coordinator(args)
+    try:
+        verification, elapsed_seconds = StrategyVerifier(args.breaker, args.rule, args.reveal, args.workers,
+                                                         args.seed).run(print_progress, verifier_coordinator)
+    finally:
+        if verifier_coordinator is not None:
+            verifier_coordinator.close()
+    secret_space = CodeSpace.of(rule)
+    # with reveal every secret is played once per revealed position
+    print('{} on {}{}: {} games in {:.1f} s'.format(args.breaker, args.rule, ' with a revealed peg' if args.reveal else '',
+                                                     verification.get_secret_count(), elapsed_seconds))
+    if verification.get_node_count():
+        print('decision tree of {} positions'.format(verification.get_node_count()))
+    print('{:>6} {:>10}'.format('depth', 'games'))
+    for solve_depth, secret_total in verification.get_depth_counts().items():
+        print('{:>6} {:>10}{}'.format(solve_depth, secret_total, '  over the limit' if solve_depth > rule.get_max_attempts() else ''))
+    print('worst secrets: ' + ', '.join('{} ({})'.format(decode_code(secret_space.decode_index(secret)), solve_depth)
+                                        for solve_depth, secret in verification.get_worst_secrets()))
+    late = sum(secret_total for solve_depth, secret_total in verification.get_depth_counts().items() if solve_depth > rule.get_max_attempts())
+    late += len(verification.get_unsolved())
+    if late:
+        print('NOT PROVEN: {} games are not won within {} attempts'.format(late, rule.get_max_attempts()))
+        sys.exit(1)
+    print('PROVEN: every secret is broken within {} attempts'.format(rule.get_max_attempts()))
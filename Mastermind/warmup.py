@@ -0,0 +1,127 @@
+import argparse
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import messages
+from codespace import BLANK_VALUE, COLOUR_VALUES, CodeSpace
+from difficulty import DifficultyTable, get_table_path
+from hint_service import Hint, compute_hint, get_position_key
+from models import GameRule
+from rules import RuleVariant, get_rule_registry
+from scoring_backends import get_backend
+
+
+class OpeningBook:
+    """ OpeningBook class holds the hints of the positions a game of a code shape starts from: before any guess, and after each
+    peg that may be revealed to a player. It is built once and kept next to the difficulty tables, so a warm-up after the first
+    one only reads it """
+
+    # books built or read in this process by code shape
+    __loaded: Dict[Tuple[int, bool], "OpeningBook"] = {}
+    __lock: threading.Lock = threading.Lock()
+
+    def __init__(self, hints: Dict[Optional[Tuple[int, int]], Hint]) -> None:
+        super().__init__()
+        self.__hints: Dict[Optional[Tuple[int, int]], Hint] = hints
+
+    @staticmethod
+    def get_path(max_code_peg: int, allow_blank: bool) -> str:
+        """ :return: the file of the opening book of codes of that shape, in the directory of the difficulty tables """
+        return os.path.join(os.path.dirname(get_table_path(max_code_peg, allow_blank)),
+                            'openings-{}{}.json'.format(max_code_peg, '-blank' if allow_blank else ''))
+
+    @staticmethod
+    def of(game_rule: GameRule) -> "OpeningBook":
+        """ :return: the book of the code shape of the game rule, read from its file or built and written there, once per process """
+        key = (game_rule.get_max_code_peg(), game_rule.allow_blank())
+        with OpeningBook.__lock:
+            book = OpeningBook.__loaded.get(key)
+            if book is None:
+                path = OpeningBook.get_path(*key)
+                book = OpeningBook.read(path)
+                if book is None:
+                    book = OpeningBook.build(game_rule)
+                    book.write(path)
+                OpeningBook.__loaded[key] = book
+        return book
+
+    @staticmethod
+    def build(game_rule: GameRule) -> "OpeningBook":
+        """ :return: the book of the game rule, every hint computed now """
+        values = COLOUR_VALUES + ([BLANK_VALUE] if game_rule.allow_blank() else [])
+        reveals: List[Optional[Tuple[int, int]]] = [None] + [(position, value) for position in range(game_rule.get_max_code_peg())
+                                                             for value in values]
+        return OpeningBook({reveal: compute_hint(game_rule, get_position_key(game_rule, reveal, ())) for reveal in reveals})
+
+    @staticmethod
+    def read(path: str) -> Optional["OpeningBook"]:
+        """ :return: the book of the file, None when there is none or it cannot be read, it is then built again """
+        try:
+            with open(path) as book_file:
+                entries = json.load(book_file)['openings']
+            return OpeningBook({tuple(entry['reveal']) if entry['reveal'] is not None else None:
+                                Hint(entry['guess'], entry['candidates'], entry['compute_seconds']) for entry in entries})
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def write(self, path: str) -> None:
+        """ write the book through a temporary file, a reader never sees half of it """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entries = [{'reveal': list(reveal) if reveal is not None else None, 'guess': hint.get_guess(),
+                    'candidates': hint.get_candidate_count(), 'compute_seconds': round(hint.get_compute_seconds(), 6)}
+                   for reveal, hint in self.__hints.items()]
+        temporary_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(temporary_path, 'w') as book_file:
+            json.dump({'openings': entries}, book_file)
+        os.replace(temporary_path, path)
+
+    def get_hints(self) -> Dict[Optional[Tuple[int, int]], Hint]:
+        """ :return: the hint of every opening position by the (position, value) revealed, None before any reveal """
+        return dict(self.__hints)
+
+
+def warm_up_rule(name: str, game_rule: GameRule, verbose: bool = False) -> OpeningBook:
+    """ build or load everything the first game of the rule would: the enumerated code space, the scoring backend and its
+    feedback table, the difficulty table when it was built, and the opening book
+    :param: name: the name of the rule, game_rule: the rule to warm up, verbose: whether to print how long it took
+    :return: the opening book of the rule """
+    started = time.perf_counter()
+    code_space = CodeSpace.of(game_rule)
+    code_space.get_all_values()
+    code_space.get_all_counts()
+    get_backend(game_rule)
+    if os.path.exists(get_table_path(game_rule.get_max_code_peg(), game_rule.allow_blank())):
+        DifficultyTable.of(game_rule)
+    book = OpeningBook.of(game_rule)
+    if verbose:
+        print(messages.WARM_UP_DONE.format(name=name, seconds=time.perf_counter() - started, codes=code_space.size(),
+                                           openings=len(book.get_hints())), flush=True)
+    return book
+
+
+def warm_up(variants: List[RuleVariant], verbose: bool = False) -> None:
+    """ warm up the variants one after the other
+    :param: variants: the variants to warm up, verbose: whether to print each one """
+    for variant in variants:
+        warm_up_rule(variant.get_name(), variant.get_game_rule(), verbose)
+
+
+def start_warm_up(variants: List[RuleVariant]) -> threading.Thread:
+    """ warm up the variants on a daemon thread, quietly, so the menu is shown and the players are asked their names meanwhile
+    :return: the started thread """
+    thread = threading.Thread(target=warm_up, args=(variants,), name='warm-up', daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    registry = get_rule_registry()
+    parser = argparse.ArgumentParser(description='Build the code spaces, scoring tables and opening books of the game rules.')
+    parser.add_argument('--rules', nargs='+', choices=sorted(variant.get_name() for variant in registry.get_variants()),
+                        help='rules to warm up, by default those marked warm_up in the rules file')
+    args = parser.parse_args()
+    warm_up([registry.get(name) for name in args.rules] if args.rules
+            else [variant for variant in registry.get_variants() if variant.is_warm_up()], True)